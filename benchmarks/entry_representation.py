@@ -0,0 +1,129 @@
+"""
+Benchmark for the lazy, slotted `Entry` representation.
+
+Compares it against `EagerEntry`, a copy of the previous implementation that
+resolved both accounts, their full names and the value string while being
+constructed. For every book size it reports the time and the memory
+allocated to wrap all splits of an account, once when only the date and
+description are read and once when every entry is printed in full.
+
+Run with:
+
+    python -m benchmarks.entry_representation [sizes...]
+"""
+
+# pyright: reportUnknownVariableType=false, reportUnknownMemberType=false
+# pyright: reportUnknownArgumentType=false, reportMissingTypeStubs=false
+
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+import warnings
+from typing import Callable, cast
+
+from piecash import Account, Split
+from piecash.core.transaction import Transaction
+
+from benchmarks.find_duplicates import createBook
+from gnucsh.convenience_types.entry import Entry, TransactionType
+from gnucsh.convenience_types.ledger import openLedger
+
+DEFAULT_SIZES = [1000, 5000, 20000]
+
+
+class EagerEntryAccount:
+    def __init__(self, split: Split):
+        self._split = split
+        self.backingAccount = cast(Account, split.account)
+        self.value = str(split.value)
+        self.description = self.backingAccount.description
+        self.account_path = self.backingAccount.fullname
+
+
+class EagerEntry:
+    """The `Entry` as it was before it became lazy, for comparison."""
+
+    def __init__(self, split: Split):
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            self.backingSplit = split
+            transaction = cast(Transaction, split.transaction)
+            account = cast(Account, split.account)
+            self.description = transaction.description
+            self.date = transaction.post_date
+
+            accountA = EagerEntryAccount(transaction.splits[0])
+            accountB = EagerEntryAccount(transaction.splits[1])
+            if accountA.account_path == account.fullname:
+                self.thisAccount = accountA
+                self.otherAccount = accountB
+                self.type = TransactionType.DEPOSITE
+            else:
+                self.thisAccount = accountB
+                self.otherAccount = accountA
+                self.type = TransactionType.WITHDRAWAL
+            self.value = self.thisAccount.value
+            self.account_path = self.otherAccount.account_path
+
+    __str__ = Entry.__str__
+
+
+def readSummary(entry: Entry | EagerEntry) -> object:
+    return (entry.date, entry.description)
+
+
+def readAll(entry: Entry | EagerEntry) -> object:
+    return str(entry)
+
+
+def measure(
+    file: str,
+    entryClass: Callable[[Split], Entry | EagerEntry],
+    read: Callable[[Entry | EagerEntry], object],
+) -> tuple[float, int]:
+    with openLedger(file) as ledger:
+        checkingAcct = ledger.findAccountByName("Checking")
+        splits = cast(list[Split], checkingAcct.backingAccount.splits)
+        # load the splits, transactions and accounts up front, so only the
+        # cost of the wrapper itself is measured
+        for sp in splits:
+            readAll(EagerEntry(sp))
+
+        tracemalloc.start()
+        start = time.perf_counter()
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            entries = [entryClass(sp) for sp in splits]
+            for entry in entries:
+                read(entry)
+        seconds = time.perf_counter() - start
+        allocated, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return seconds, allocated
+
+
+def main(sizes: list[int]):
+    print(
+        "{:>8} {:>8} {:>8} {:>10} {:>12}".format(
+            "entries", "class", "reads", "seconds", "KiB"
+        )
+    )
+    for size in sizes:
+        file = os.path.join(
+            tempfile.gettempdir(), "bench-entries-{}.gnucash".format(size)
+        )
+        createBook(file, size)
+        for className, entryClass in (("eager", EagerEntry), ("lazy", Entry)):
+            for readName, read in (("summary", readSummary), ("all", readAll)):
+                seconds, allocated = measure(file, entryClass, read)
+                print(
+                    "{:>8} {:>8} {:>8} {:>10.3f} {:>12.1f}".format(
+                        size, className, readName, seconds, allocated / 1024
+                    )
+                )
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES)
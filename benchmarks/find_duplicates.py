@@ -0,0 +1,74 @@
+"""
+Benchmark for `BaseAccount.findDuplicates`.
+
+Builds books of increasing size in which two accounts share a fixed fraction
+of (date, description) pairs, and times the duplicate search on each of them.
+With the indexed matcher the time per entry should stay roughly constant, so
+doubling the book size should roughly double the total time.
+
+Run with:
+
+    python -m benchmarks.find_duplicates [sizes...]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+from gnucsh.convenience_types.ledger import createLedger, openLedger
+
+DEFAULT_SIZES = [500, 1000, 2000, 4000]
+
+
+def createBook(file: str, size: int):
+    """
+    Create a book with `size` entries in both 'Checking' and 'Savings', where
+    every tenth entry of checking has a counterpart in savings.
+    """
+    with createLedger(file) as ledger:
+        rootAcct = ledger.getRootAccount()
+        checkingAcct = rootAcct.createBankAccount("Checking")
+        savingsAcct = rootAcct.createBankAccount("Savings")
+        imbalanceAcct = rootAcct.createBankAccount("Imbalance-EUR")
+        for i in range(size):
+            checkingAcct.addEntry("-1", "transfer {}".format(i), imbalanceAcct)
+            description = (
+                "transfer {}".format(i)
+                if i % 10 == 0
+                else "other {}".format(i)
+            )
+            savingsAcct.addEntry("1", description, imbalanceAcct)
+        ledger.save()
+
+
+def timeFindDuplicates(file: str) -> tuple[float, int]:
+    with openLedger(file) as ledger:
+        checkingAcct = ledger.findAccountByName("Checking")
+        savingsAcct = ledger.findAccountByName("Savings")
+        start = time.perf_counter()
+        pairs = checkingAcct.findDuplicates(savingsAcct)
+        return time.perf_counter() - start, len(pairs)
+
+
+def main(sizes: list[int]):
+    print(
+        "{:>8} {:>8} {:>10} {:>14}".format(
+            "entries", "pairs", "seconds", "us/entry"
+        )
+    )
+    for size in sizes:
+        file = os.path.join(
+            tempfile.gettempdir(), "bench-duplicates-{}.gnucash".format(size)
+        )
+        createBook(file, size)
+        seconds, pairs = timeFindDuplicates(file)
+        print(
+            "{:>8} {:>8} {:>10.3f} {:>14.1f}".format(
+                size, pairs, seconds, seconds / size * 1e6
+            )
+        )
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES)
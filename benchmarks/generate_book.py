@@ -0,0 +1,179 @@
+"""
+Generator for large synthetic books.
+
+The account tree and the book itself are created through piecash. The
+transactions are inserted with plain sqlite statements afterwards, the same
+rows piecash would write, because creating a million of them through the
+ORM would take hours.
+
+Every book contains the bank accounts 'Checking' and 'Savings' and an
+'Imbalance-EUR' account. Part of the transactions are paired between
+checking and savings with the same date and description, both linked to
+imbalance, as `findDuplicates` looks for them. The remaining transactions
+move money between random accounts of the tree.
+
+Run with:
+
+    python -m benchmarks.generate_book FILE TRANSACTIONS [ACCOUNTS]
+"""
+
+import datetime
+import random
+import sqlite3
+import sys
+
+from gnucsh.convenience_types.ledger import createLedger
+
+DESCRIPTIONS = [
+    "Groceries",
+    "Pharmacy",
+    "Rent",
+    "Salary",
+    "Insurance",
+    "Restaurant",
+    "Train ticket",
+    "Online store",
+    "Utilities",
+    "Transfer",
+]
+
+START_DATE = datetime.date(2015, 1, 1)
+DAYS = 10 * 365
+
+
+def generateBook(
+    file: str,
+    transactions: int,
+    accounts: int = 100,
+    depth: int = 3,
+    duplicateRate: float = 0.05,
+    seed: int = 0,
+):
+    """
+    Create a book at `file` with `transactions` transactions spread over
+    `accounts` accounts, nested at most `depth` levels deep. `duplicateRate`
+    is the fraction of the transactions that is part of a checking/savings
+    duplicate pair. The same arguments always create the same book.
+    """
+    rng = random.Random(seed)
+    with createLedger(file) as ledger:
+        rootAcct = ledger.getRootAccount()
+        checkingAcct = rootAcct.createBankAccount("Checking")
+        savingsAcct = rootAcct.createBankAccount("Savings")
+        imbalanceAcct = rootAcct.createBankAccount("Imbalance-EUR")
+        tree = [(rootAcct, 0)]
+        for i in range(accounts):
+            parent, level = rng.choice(
+                [node for node in tree if node[1] < depth]
+            )
+            tree.append(
+                (parent.createExpencesAccount("Account {}".format(i)), level + 1)
+            )
+        ledger.save()
+
+        currencyGuid = rootAcct.backingAccount.commodity.guid
+        accountGuids = [acc.backingAccount.guid for acc, _ in tree[1:]]
+        checkingGuid = checkingAcct.backingAccount.guid
+        savingsGuid = savingsAcct.backingAccount.guid
+        imbalanceGuid = imbalanceAcct.backingAccount.guid
+
+    pairs = int(transactions * duplicateRate / 2)
+    rows = _Rows(rng, currencyGuid)
+    for i in range(pairs):
+        date = _randomDate(rng)
+        description = "{} {}".format(rng.choice(DESCRIPTIONS), i)
+        value = rng.randrange(1, 100000)
+        rows.add(date, description, checkingGuid, imbalanceGuid, -value)
+        rows.add(date, description, savingsGuid, imbalanceGuid, value)
+    for i in range(transactions - 2 * pairs):
+        rows.add(
+            _randomDate(rng),
+            "{} {}".format(rng.choice(DESCRIPTIONS), rng.randrange(1000)),
+            rng.choice([checkingGuid, savingsGuid, *accountGuids]),
+            rng.choice(accountGuids),
+            rng.randrange(-100000, 100000),
+        )
+    rows.write(file)
+
+
+class _Rows:
+    def __init__(self, rng: random.Random, currencyGuid: str):
+        self.rng = rng
+        self.currencyGuid = currencyGuid
+        self.transactions: list[tuple[object, ...]] = []
+        self.splits: list[tuple[object, ...]] = []
+        self.slots: list[tuple[object, ...]] = []
+
+    def add(
+        self,
+        date: datetime.date,
+        description: str,
+        accountGuid: str,
+        otherAccountGuid: str,
+        cents: int,
+    ):
+        txGuid = self._guid()
+        self.transactions.append(
+            (
+                txGuid,
+                self.currencyGuid,
+                "",
+                date.strftime("%Y-%m-%d 10:59:00"),
+                date.strftime("%Y-%m-%d 12:00:00"),
+                description,
+            )
+        )
+        for guid, value in ((accountGuid, cents), (otherAccountGuid, -cents)):
+            self.splits.append(
+                (
+                    self._guid(),
+                    txGuid,
+                    guid,
+                    "",
+                    "",
+                    "n",
+                    None,
+                    value,
+                    100,
+                    value,
+                    100,
+                    None,
+                )
+            )
+        self.slots.append(
+            (txGuid, "date-posted", 10, 0, 0.0, 0, 1, date.strftime("%Y%m%d"))
+        )
+
+    def write(self, file: str):
+        connection = sqlite3.connect(file)
+        with connection:
+            _ = connection.executemany(
+                "INSERT INTO transactions VALUES (?, ?, ?, ?, ?, ?)",
+                self.transactions,
+            )
+            _ = connection.executemany(
+                "INSERT INTO splits VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                self.splits,
+            )
+            _ = connection.executemany(
+                "INSERT INTO slots (obj_guid, name, slot_type, int64_val,"
+                + " double_val, numeric_val_num, numeric_val_denom, gdate_val)"
+                + " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                self.slots,
+            )
+        connection.close()
+
+    def _guid(self) -> str:
+        return "{:032x}".format(self.rng.getrandbits(128))
+
+
+def _randomDate(rng: random.Random) -> datetime.date:
+    return START_DATE + datetime.timedelta(days=rng.randrange(DAYS))
+
+
+if __name__ == "__main__":
+    generateBook(
+        sys.argv[1],
+        int(sys.argv[2]),
+        int(sys.argv[3]) if len(sys.argv) > 3 else 100,
+    )
@@ -0,0 +1,195 @@
+"""
+Benchmark suite for the commands of the CLI on generated books.
+
+For every book size, each command runs once in a fresh process against a
+book made by `benchmarks.generate_book`. The suite records the wall time,
+the peak resident memory of that process and the number of SQL statements
+sent. Commands that change the book run on a copy of it.
+
+Every result is appended to a results file (one JSON object per line,
+`benchmarks/results.jsonl` by default) together with the current git
+commit. The table printed at the end compares each result with the last
+one recorded for another commit.
+
+Run with:
+
+    python -m benchmarks.suite [--results FILE] [sizes...]
+"""
+
+import builtins
+import contextlib
+import datetime
+import json
+import multiprocessing
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Callable
+
+from benchmarks.generate_book import generateBook
+
+DEFAULT_SIZES = [10000, 100000]
+DEFAULT_RESULTS = os.path.join(os.path.dirname(__file__), "results.jsonl")
+
+
+def _listAccounts(book: str):
+    from gnucsh.cli import listAccounts
+
+    listAccounts(book)
+
+
+def _listTransactions(book: str):
+    from gnucsh.cli import listTransactions
+
+    listTransactions(book, "Checking")
+
+
+def _listTransactionsFiltered(book: str):
+    from gnucsh.cli import listTransactions
+
+    listTransactions(book, "Checking", "^Rent")
+
+
+def _changeTransferAccount(book: str):
+    from gnucsh.cli import changeTransferAccount
+
+    changeTransferAccount(book, "Checking", "Imbalance-EUR", "^Groceries")
+
+
+def _unifyDuplicates(book: str):
+    from gnucsh.cli import unifyDuplicates
+
+    unifyDuplicates(book, "Checking", "Savings")
+
+
+OPERATIONS: dict[str, tuple[Callable[[str], None], bool]] = {
+    "listAccounts": (_listAccounts, False),
+    "listTransactions": (_listTransactions, False),
+    "listTransactions --filter": (_listTransactionsFiltered, False),
+    "changeTransferAccount": (_changeTransferAccount, True),
+    "unifyDuplicates": (_unifyDuplicates, True),
+}
+""" Benchmarked commands, and whether they change the book. """
+
+
+def runOperation(name: str, book: str) -> dict[str, Any]:
+    """Run the operation `name` on `book`, meant for a fresh process."""
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+
+    statements = 0
+
+    def countStatement(*args: object):
+        nonlocal statements
+        statements += 1
+
+    event.listen(Engine, "before_cursor_execute", countStatement)
+    builtins.input = lambda _: "y"
+    operation, _ = OPERATIONS[name]
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(
+        devnull
+    ):
+        start = time.perf_counter()
+        operation(book)
+        seconds = time.perf_counter() - start
+    return {
+        "seconds": seconds,
+        # kilobytes on linux
+        "peakRssKiB": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        "statements": statements,
+    }
+
+
+def benchmark(size: int) -> list[dict[str, Any]]:
+    book = os.path.join(
+        tempfile.gettempdir(), "bench-suite-{}.gnucash".format(size)
+    )
+    if not os.path.exists(book):
+        generateBook(book, size)
+
+    results: list[dict[str, Any]] = []
+    context = multiprocessing.get_context("spawn")
+    for name, (_, changesBook) in OPERATIONS.items():
+        target = book
+        if changesBook:
+            target = book + ".copy.gnucash"
+            shutil.copyfile(book, target)
+        with context.Pool(1) as pool:
+            result = pool.apply(runOperation, (name, target))
+        results.append({"size": size, "operation": name, **result})
+    return results
+
+
+def currentCommit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def loadResults(file: str) -> list[dict[str, Any]]:
+    if not os.path.exists(file):
+        return []
+    with open(file) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def main(sizes: list[int], resultsFile: str):
+    commit = currentCommit()
+    previousResults = loadResults(resultsFile)
+    print(
+        "{:>8} {:<28} {:>9} {:>10} {:>10} {:>9}".format(
+            "size", "operation", "seconds", "peak MiB", "sql", "vs prev"
+        )
+    )
+    for size in sizes:
+        for result in benchmark(size):
+            result["commit"] = commit
+            result["date"] = datetime.datetime.now().isoformat(
+                timespec="seconds"
+            )
+            with open(resultsFile, "a") as f:
+                _ = f.write(json.dumps(result) + "\n")
+
+            previous = [
+                r
+                for r in previousResults
+                if r["size"] == size
+                and r["operation"] == result["operation"]
+                and r["commit"] != commit
+            ]
+            change = (
+                "{:+.0%}".format(
+                    result["seconds"] / previous[-1]["seconds"] - 1
+                )
+                if previous
+                else "-"
+            )
+            print(
+                "{:>8} {:<28} {:>9.3f} {:>10.1f} {:>10} {:>9}".format(
+                    size,
+                    result["operation"],
+                    result["seconds"],
+                    result["peakRssKiB"] / 1024,
+                    result["statements"],
+                    change,
+                )
+            )
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    resultsFile = DEFAULT_RESULTS
+    if args[:1] == ["--results"]:
+        resultsFile = args[1]
+        args = args[2:]
+    main([int(arg) for arg in args] or DEFAULT_SIZES, resultsFile)
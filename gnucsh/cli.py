@@ -1,8 +1,34 @@
+import datetime
 import re
+import shlex
+import sys
+import time
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Iterable,
+    Sequence,
+    TextIO,
+)
 
 import click
 
-from gnucsh.convenience_types.ledger import openLedger
+from gnucsh import daemon, profiling
+from gnucsh.export import FORMATS, formatEntry, writeRows
+from gnucsh.snapshot import Snapshot
+
+REPORTS = ["balance", "month", "year"]
+""" Reports accepted by `--report`. """
+
+# the ledger pulls in piecash and SQLAlchemy, which takes longer than most
+# commands. It is only imported once a command actually opens a book, so
+# --help, usage errors and commands answered by the daemon stay fast.
+if TYPE_CHECKING:
+    from gnucsh.convenience_types.entry import Entry
+    from gnucsh.convenience_types.ledger import Ledger
+    from gnucsh.rules import Rules
+    from gnucsh.watermarks import Watermark
 
 
 @click.command()
@@ -21,6 +47,35 @@ from gnucsh.convenience_types.ledger import openLedger
     type=str,
     help="Regex filter. Valid both for listing accounts and transactions.",
 )
+@click.option(
+    "--since",
+    type=click.DateTime(formats=["%Y-%m-%d"]),
+    callback=lambda ctx, param, value: value.date() if value else None,
+    help="Only transactions posted on or after this day (YYYY-MM-DD).",
+)
+@click.option(
+    "--until",
+    type=click.DateTime(formats=["%Y-%m-%d"]),
+    callback=lambda ctx, param, value: value.date() if value else None,
+    help="Only transactions posted on or before this day (YYYY-MM-DD).",
+)
+@click.option(
+    "--limit",
+    type=click.IntRange(min=1),
+    help="List at most this many transactions, and print the cursor of the"
+    + " next page to stderr.",
+)
+@click.option(
+    "--after",
+    type=str,
+    metavar="CURSOR",
+    help="Continue a listing after the page whose cursor is given.",
+)
+@click.option(
+    "--reverse",
+    is_flag=True,
+    help="List the transactions by post date, the newest first.",
+)
 @click.option(
     "-d",
     "--duplicates",
@@ -28,23 +83,404 @@ from gnucsh.convenience_types.ledger import openLedger
     help="Provide an account and search for"
     + " duplicates (same date + description).",
 )
+@click.option(
+    "--incremental",
+    is_flag=True,
+    help="Only process the transactions entered since the last run of the"
+    + " same transfer or duplicates command.",
+)
+@click.option(
+    "--full-rescan",
+    is_flag=True,
+    help="With --incremental, process all transactions again.",
+)
+@click.option(
+    "--scan-duplicates",
+    type=str,
+    metavar="SELECTION",
+    help="Search for duplicates between every two accounts of the"
+    + " selection, an account with its sub-accounts or an account type like"
+    + " BANK, and unify them all at once.",
+)
+@click.option(
+    "--import",
+    "statement",
+    type=click.Path(exists=True, dir_okay=False),
+    help="Add the transactions of a bank statement (CSV, OFX or QIF) that are"
+    + " not in the account yet, linked to the transfer account (by default"
+    + " Imbalance-<currency>).",
+)
+@click.option(
+    "--date-format",
+    type=str,
+    metavar="FORMAT",
+    help="With --import, read the dates of a CSV statement with this strptime"
+    + " format, e.g. %d/%m/%Y. By default the first known format fitting all"
+    + " of them is used.",
+)
+@click.option(
+    "--rules",
+    type=click.Path(exists=True, dir_okay=False),
+    help="Change the transfer account of every transaction (matching the"
+    + " filter) by the first rule of the YAML file whose pattern matches its"
+    + " description.",
+)
+@click.option(
+    "-r",
+    "--report",
+    type=click.Choice(REPORTS),
+    help="Report the balance of every account (or only of the given account"
+    + " and its sub-accounts), or their totals per month or year.",
+)
+@click.option(
+    "--format",
+    type=click.Choice(FORMATS),
+    default="text",
+    help="Output format of the account and transaction listings.",
+)
+@click.option(
+    "-s",
+    "--script",
+    type=click.File("r"),
+    help="Run the commands in the file ('-' for stdin), one per line and"
+    + " written like the arguments after the book, in a single session."
+    + " Changes are applied without asking and saved once at the end.",
+)
+@click.option(
+    "--serve",
+    is_flag=True,
+    help="Keep the book open and run the commands of other gnucsh calls"
+    + " on it, until interrupted.",
+)
+@click.option(
+    "--cache",
+    is_flag=True,
+    envvar="GNUCSH_CACHE",
+    help="Answer listings and the duplicate search from a snapshot of the"
+    + " book, cached next to it and rebuilt whenever the book changed."
+    + " Ignored for books opened by URI.",
+)
+@click.option(
+    "--pool-size",
+    type=click.IntRange(min=1),
+    envvar="GNUCSH_POOL_SIZE",
+    help="Connections kept open to the database of a book opened by URI.",
+)
+@click.option(
+    "--pool-pre-ping",
+    is_flag=True,
+    envvar="GNUCSH_POOL_PRE_PING",
+    help="Check that a pooled connection still works before using it.",
+)
+@click.option(
+    "--profile",
+    is_flag=True,
+    envvar="GNUCSH_PROFILE",
+    help="Print the time, SQL statements and objects of every phase of the"
+    + " command, and its peak memory, to stderr.",
+)
+@click.option(
+    "--profile-report",
+    type=click.Path(dir_okay=False, writable=True),
+    envvar="GNUCSH_PROFILE_REPORT",
+    help="Write the profile as JSON to the given file.",
+)
 def main(
     book_path: str,
     account: str | None,
     transfer: str | None,
     filter: str | None,
+    since: datetime.date | None,
+    until: datetime.date | None,
+    limit: int | None,
+    after: str | None,
+    reverse: bool,
     duplicates: str | None,
+    incremental: bool,
+    full_rescan: bool,
+    scan_duplicates: str | None,
+    statement: str | None,
+    date_format: str | None,
+    rules: str | None,
+    report: str | None,
+    format: str,
+    script: TextIO | None,
+    serve: bool,
+    cache: bool,
+    pool_size: int | None,
+    pool_pre_ping: bool,
+    profile: bool,
+    profile_report: str | None,
 ):
 
-    if account is not None:
+    if daemon.isUri(book_path) and (
+        report is not None or scan_duplicates is not None or incremental
+    ):
+        raise click.UsageError(
+            "--report, --scan-duplicates and --incremental need the path of"
+            + " a book file."
+        )
+    _checkPage(click.get_current_context().params)
+    if statement is not None and account is None:
+        raise click.UsageError("--import needs the account to import into.")
+    if statement is not None and filter is not None:
+        raise click.UsageError("--import adds all new rows, it takes no -f.")
+    if statement is not None and rules is not None:
+        raise click.UsageError(
+            "--import and --rules can not be combined, import first."
+        )
+    if rules is not None and account is None:
+        raise click.UsageError("--rules needs the account to categorize.")
+    if rules is not None and transfer is not None:
+        raise click.UsageError(
+            "--rules takes the transfer accounts from the rules, not from -t."
+        )
+    if serve:
+        if not daemon.SUPPORTED:
+            raise click.UsageError(
+                "--serve needs Unix sockets, which this platform lacks."
+            )
+        _setPool(book_path, pool_size, pool_pre_ping)
+        daemon.serve(book_path)
+        return
+    if profile or profile_report is not None:
+        # the daemon is not profiled, run the command here
+        profiler = profiling.enable()
+        try:
+            with profiling.phase("import"):
+                import gnucsh.convenience_types.ledger  # noqa: F401
+            _runLocal(book_path, click.get_current_context().params)
+        finally:
+            profiling.disable()
+            profileReport = profiler.report()
+            if profile:
+                profiling.printReport(profileReport)
+            if profile_report is not None:
+                profiling.writeReport(profileReport, profile_report)
+        return
+    if (
+        script is None
+        and not cache
+        and report is None
+        and scan_duplicates is None
+        and statement is None
+        and rules is None
+        and not incremental
+        and since is None
+        and until is None
+        and limit is None
+        and after is None
+        and not reverse
+    ):
+        exitCode = daemon.runRemote(
+            book_path,
+            {
+                "account": account,
+                "transfer": transfer,
+                "filter": filter,
+                "duplicates": duplicates,
+                "format": format,
+            },
+        )
+        if exitCode is not None:
+            sys.exit(exitCode)
+
+    _runLocal(book_path, click.get_current_context().params)
+
+
+def _runLocal(bookPath: str, params: dict[str, Any]):
+    """Run the command given by the `params` of `main` in this process."""
+    account: str | None = params["account"]
+    transfer: str | None = params["transfer"]
+    filter: str | None = params["filter"]
+    duplicates: str | None = params["duplicates"]
+    format: str = params["format"]
+    script: TextIO | None = params["script"]
+    # the snapshot is read from the sqlite file
+    cache: bool = params["cache"] and not daemon.isUri(bookPath)
+    incremental: bool = params["incremental"]
+    fullRescan: bool = params["full_rescan"]
+    postedFrom: datetime.date | None = params["since"]
+    postedUntil: datetime.date | None = params["until"]
+    page = _Page(params["limit"], params["after"], params["reverse"])
+    _setPool(bookPath, params["pool_size"], params["pool_pre_ping"])
+
+    if script is not None:
+        runScript(bookPath, script)
+    elif params["report"] is not None:
+        showReport(bookPath, account, params["report"], format, cache)
+    elif params["scan_duplicates"] is not None:
+        unifyAllDuplicates(bookPath, params["scan_duplicates"], cache)
+    elif account is not None and params["statement"] is not None:
+        importStatement(
+            bookPath,
+            account,
+            params["statement"],
+            transfer,
+            params["date_format"],
+        )
+    elif account is not None and params["rules"] is not None:
+        categorize(bookPath, account, params["rules"], filter)
+    elif cache and transfer is None and not incremental and page.isEmpty():
+        with profiling.phase("load snapshot"):
+            snapshot = Snapshot.open(bookPath)
+        if account is None:
+            _listAccountsFromSnapshot(snapshot, filter, format)
+        elif duplicates is not None:
+            unifyDuplicatesFromSnapshot(
+                bookPath,
+                snapshot,
+                account,
+                duplicates,
+                postedFrom,
+                postedUntil,
+            )
+        else:
+            _listTransactionsFromSnapshot(
+                snapshot, account, filter, format, postedFrom, postedUntil
+            )
+    elif account is not None:
+        # listings open the book read-only, only the commands writing to it
+        # add a missing index
+        if (transfer is not None or duplicates is not None) and (
+            postedFrom is not None or postedUntil is not None
+        ):
+            from gnucsh.convenience_types.ledger import ensurePostDateIndex
+
+            ensurePostDateIndex(bookPath)
         if transfer is not None:
-            changeTransferAccount(book_path, account, transfer, filter)
+            changeTransferAccount(
+                bookPath,
+                account,
+                transfer,
+                filter,
+                incremental,
+                fullRescan,
+                postedFrom,
+                postedUntil,
+            )
         elif duplicates is not None:
-            unifyDuplicates(book_path, account, duplicates)
+            unifyDuplicates(
+                bookPath,
+                account,
+                duplicates,
+                incremental,
+                fullRescan,
+                postedFrom,
+                postedUntil,
+            )
         else:
-            listTransactions(book_path, account, filter)
+            listTransactions(
+                bookPath,
+                account,
+                filter,
+                format,
+                postedFrom,
+                postedUntil,
+                page,
+            )
     else:
-        listAccounts(book_path, filter)
+        listAccounts(bookPath, filter, format)
+
+
+def _setPool(bookPath: str, size: int | None, prePing: bool):
+    """Apply the pool settings, if `bookPath` is a URI."""
+    if not daemon.isUri(bookPath):
+        return
+    from gnucsh.convenience_types.ledger import acceptsPoolSize, setPool
+
+    if size is not None and not acceptsPoolSize(bookPath):
+        raise click.UsageError(
+            "SQLAlchemy does not pool the connections to this database,"
+            + " --pool-size can not be used with it."
+        )
+    setPool(size, prePing)
+
+
+def runScript(bookPath: str, script: Iterable[str]):
+    """
+    Run every command of `script` against one ledger session and save it
+    once all of them succeeded. Empty lines and `#` comments are skipped.
+    """
+    from gnucsh.convenience_types.ledger import openLedger
+
+    with openLedger(bookPath) as ledger:
+        for line in script:
+            args = shlex.split(line, comments=True)
+            if not args:
+                continue
+            params = main.make_context("gnucsh", [bookPath, *args]).params
+            if (
+                params["script"] is not None
+                or params["serve"]
+                or params["report"] is not None
+                or params["scan_duplicates"] is not None
+                or params["statement"] is not None
+                or params["rules"] is not None
+                or params["incremental"]
+            ):
+                raise click.UsageError(
+                    "Scripts can only contain single commands."
+                )
+            _checkPage(params)
+            _ = runCommand(
+                ledger,
+                params["account"],
+                params["transfer"],
+                params["filter"],
+                params["duplicates"],
+                params["format"],
+                None,
+                params["since"],
+                params["until"],
+                _Page(params["limit"], params["after"], params["reverse"]),
+            )
+        ledger.save()
+
+
+def runCommand(
+    ledger: "Ledger",
+    account: str | None,
+    transfer: str | None,
+    filter: str | None,
+    duplicates: str | None,
+    format: str,
+    ask: Callable[[str], str] | None,
+    postedFrom: datetime.date | None = None,
+    postedUntil: datetime.date | None = None,
+    page: "_Page | None" = None,
+) -> bool:
+    """
+    Run a single command against `ledger`, like `main` does for the given
+    options. Changes are confirmed with `ask`, or applied right away if it
+    is None. Returns whether the ledger was changed and needs to be saved.
+    """
+    if account is None:
+        _listAccounts(ledger, filter, format)
+    elif transfer is not None:
+        return _changeTransferAccount(
+            ledger,
+            account,
+            transfer,
+            filter,
+            ask,
+            postedFrom=postedFrom,
+            postedUntil=postedUntil,
+        )
+    elif duplicates is not None:
+        return _unifyDuplicates(
+            ledger,
+            account,
+            duplicates,
+            ask,
+            postedFrom=postedFrom,
+            postedUntil=postedUntil,
+        )
+    else:
+        _listTransactions(
+            ledger, account, filter, format, postedFrom, postedUntil, page
+        )
+    return False
 
 
 def changeTransferAccount(
@@ -52,97 +488,763 @@ def changeTransferAccount(
     inputAccount: str,
     newTransferAccountName: str,
     filter: str | None,
+    incremental: bool = False,
+    fullRescan: bool = False,
+    postedFrom: datetime.date | None = None,
+    postedUntil: datetime.date | None = None,
 ):
-    with openLedger(bookPath) as ledger:
-        accountContainingTransactions = ledger.findAccountByName(inputAccount)
-        print("## Account:" + accountContainingTransactions.name)
-        newTransferAccount = ledger.findAccountByName(newTransferAccountName)
+    """
+    With `incremental`, only the entries entered since the last run with the
+    same arguments are changed, unless `fullRescan` is set. With
+    `postedFrom` and `postedUntil`, only the entries posted in that range.
+    """
+    from gnucsh.convenience_types.ledger import openLedger
 
-        foundEntries = (
-            accountContainingTransactions.findEntriesWithDescription(filter)
+    operation = [
+        "transfer",
+        inputAccount,
+        filter,
+        newTransferAccountName,
+        *_dateRange(postedFrom, postedUntil),
+    ]
+    with openLedger(bookPath) as ledger:
+        since, watermark, confirm = _startIncremental(
+            bookPath, ledger, operation, incremental, fullRescan
         )
+        if _changeTransferAccount(
+            ledger,
+            inputAccount,
+            newTransferAccountName,
+            filter,
+            confirm,
+            since,
+            postedFrom,
+            postedUntil,
+        ):
+            _ = ledger.save()
+        if incremental:
+            _finishIncremental(bookPath, operation, watermark, confirm)
 
-        for e in foundEntries:
-            print(e)
 
-        user_input = input(
+def _changeTransferAccount(
+    ledger: "Ledger",
+    inputAccount: str,
+    newTransferAccountName: str,
+    filter: str | None,
+    ask: Callable[[str], str] | None,
+    since: "Watermark | None" = None,
+    postedFrom: datetime.date | None = None,
+    postedUntil: datetime.date | None = None,
+) -> bool:
+    accountContainingTransactions = ledger.findAccountByName(inputAccount)
+    print("## Account:" + accountContainingTransactions.name)
+    newTransferAccount = ledger.findAccountByName(newTransferAccountName)
+
+    foundEntries = accountContainingTransactions.findEntriesWithDescription(
+        filter, since, postedFrom, postedUntil
+    )
+
+    for e in foundEntries:
+        print(e)
+
+    if ask is not None:
+        user_input = ask(
             "Are you sure you want to change the Transfer account "
             + "of the above entries to {}? [Y/n]".format(
                 newTransferAccount.fullname
             )
         )
-        if user_input.lower() == "y":
-            for e in foundEntries:
-                e.otherAccount.setAccount(newTransferAccount.backingAccount)
-            _ = ledger.flush()
-            _ = ledger.save()
+        if user_input.lower() != "y":
+            print("Canceling.")
+            return False
+
+    start = time.perf_counter()
+    with profiling.phase("change"):
+        changed = accountContainingTransactions.changeTransferAccount(
+            foundEntries, newTransferAccount
+        )
+    print(
+        "Changed {} entries in {:.3f}s".format(
+            changed, time.perf_counter() - start
+        )
+    )
+    return True
+
+
+def importStatement(
+    bookPath: str,
+    inputAccount: str,
+    statementFile: str,
+    transferAccountName: str | None = None,
+    dateFormat: str | None = None,
+):
+    """
+    Add the rows of the statement at `statementFile` to `inputAccount`,
+    skipping those already in it (see `BaseAccount.importEntries`). Without
+    `transferAccountName` they are linked to the imbalance account of its
+    currency, which is created if needed. The dates of a CSV statement are
+    read with `dateFormat`, if given.
+    """
+    from gnucsh.convenience_types.ledger import openLedger
+    from gnucsh.statements import readStatement
+
+    with openLedger(bookPath) as ledger:
+        account = ledger.findAccountByName(inputAccount)
+        if transferAccountName is None:
+            transferAccountName = "Imbalance-{}".format(
+                account.backingAccount.commodity.mnemonic
+            )
+            try:
+                transferAccount = ledger.findAccountByName(transferAccountName)
+            except KeyError:
+                transferAccount = ledger.getRootAccount().createBankAccount(
+                    transferAccountName
+                )
         else:
+            transferAccount = ledger.findAccountByName(transferAccountName)
+
+        start = time.perf_counter()
+        added, skipped = account.importEntries(
+            readStatement(statementFile, dateFormat), transferAccount
+        )
+        ledger.save()
+        print(
+            "Imported {} entries ({} already in the book) in {:.3f}s".format(
+                added, skipped, time.perf_counter() - start
+            )
+        )
+
+
+def categorize(
+    bookPath: str, inputAccount: str, rulesFile: str, filter: str | None
+):
+    """
+    Change the transfer account of the entries of `inputAccount` matching
+    `filter` by the rules of `rulesFile` (see `gnucsh.rules`), all in one
+    save once confirmed.
+    """
+    from gnucsh.convenience_types.ledger import openLedger
+    from gnucsh.rules import loadRules
+
+    rules = loadRules(rulesFile)
+    with openLedger(bookPath) as ledger:
+        if _categorize(ledger, inputAccount, rules, filter, input):
+            ledger.save()
+
+
+def _categorize(
+    ledger: "Ledger",
+    inputAccount: str,
+    rules: "Rules",
+    filter: str | None,
+    ask: Callable[[str], str] | None,
+) -> bool:
+    accountContainingTransactions = ledger.findAccountByName(inputAccount)
+    print("## Account:" + accountContainingTransactions.name)
+    # fail on an unknown account before anything is changed
+    targetAccounts = {
+        name: ledger.findAccountByName(name) for name in set(rules.accounts)
+    }
+
+    foundEntries = accountContainingTransactions.findEntriesWithDescription(
+        filter
+    )
+    entriesByAccount: dict[str, list["Entry"]] = {}
+    with profiling.phase("classify"):
+        for e in foundEntries:
+            rule = rules.classify(e.description)
+            if rule is not None:
+                entriesByAccount.setdefault(rules.accounts[rule], []).append(e)
+    if len(entriesByAccount) < 1:
+        print("no entries matched the rules")
+        return False
+
+    for name, entries in entriesByAccount.items():
+        print("########## -> " + targetAccounts[name].fullname)
+        for e in entries:
+            print(e)
+
+    if ask is not None:
+        user_input = ask(
+            "Are you sure you want to change the Transfer account of the"
+            + " above entries? [Y/n]"
+        )
+        if user_input.lower() != "y":
             print("Canceling.")
+            return False
+
+    start = time.perf_counter()
+    changed = 0
+    with profiling.phase("change"):
+        for name, entries in entriesByAccount.items():
+            changed += accountContainingTransactions.changeTransferAccount(
+                entries, targetAccounts[name]
+            )
+    print(
+        "Changed {} entries in {:.3f}s".format(
+            changed, time.perf_counter() - start
+        )
+    )
+    return True
 
 
 def unifyDuplicates(
-    bookPath: str, mainAccountName: str, otherAccountName: str
+    bookPath: str,
+    mainAccountName: str,
+    otherAccountName: str,
+    incremental: bool = False,
+    fullRescan: bool = False,
+    postedFrom: datetime.date | None = None,
+    postedUntil: datetime.date | None = None,
 ):
+    """
+    With `incremental`, only duplicates involving an entry entered since the
+    last run with the same accounts are unified, unless `fullRescan` is set.
+    With `postedFrom` and `postedUntil`, only entries posted in that range
+    are compared.
+    """
+    from gnucsh.convenience_types.ledger import openLedger
+
+    operation = [
+        "duplicates",
+        mainAccountName,
+        otherAccountName,
+        *_dateRange(postedFrom, postedUntil),
+    ]
     with openLedger(bookPath) as ledger:
-        mainAccount = ledger.findAccountByName(mainAccountName)
-        otherAccount = ledger.findAccountByName(otherAccountName)
+        since, watermark, confirm = _startIncremental(
+            bookPath, ledger, operation, incremental, fullRescan
+        )
+        if _unifyDuplicates(
+            ledger,
+            mainAccountName,
+            otherAccountName,
+            confirm,
+            since,
+            postedFrom,
+            postedUntil,
+        ):
+            ledger.save()
+        if incremental:
+            _finishIncremental(bookPath, operation, watermark, confirm)
 
-        duplicates = mainAccount.findDuplicates(otherAccount)
-        if len(duplicates) < 1:
-            print("no duplicates found")
-            return
 
-        for mainEntry, otherEntry in duplicates:
-            print("----------")
-            print("+ main: " + str(mainEntry))
-            print("- other:" + str(otherEntry))
+def _unifyDuplicates(
+    ledger: "Ledger",
+    mainAccountName: str,
+    otherAccountName: str,
+    ask: Callable[[str], str] | None,
+    since: "Watermark | None" = None,
+    postedFrom: datetime.date | None = None,
+    postedUntil: datetime.date | None = None,
+) -> bool:
+    mainAccount = ledger.findAccountByName(mainAccountName)
+    otherAccount = ledger.findAccountByName(otherAccountName)
+
+    with profiling.phase("find duplicates"):
+        duplicates = mainAccount.findDuplicates(
+            otherAccount, since, postedFrom, postedUntil
+        )
+    if len(duplicates) < 1:
+        print("no duplicates found")
+        return False
 
-        user_input = input(
+    for mainEntry, otherEntry in duplicates:
+        print("----------")
+        print("+ main: " + str(mainEntry))
+        print("- other:" + str(otherEntry))
+
+    if ask is not None:
+        user_input = ask(
             "Are you sure you want to link the main entries to the"
             + " '{}' and remove the 'other' entries? [Y/n]".format(
                 otherAccount.fullname
             )
         )
+        if user_input.lower() != "y":
+            return False
 
-        if user_input.lower() == "y":
-            for mainEntry, otherEntry in mainAccount.findDuplicates(
-                otherAccount
-            ):
-                mainEntry.otherAccount.setAccount(otherAccount.backingAccount)
-                otherAccount.removeEntry(otherEntry)
-            ledger.save()
+    with profiling.phase("unify"):
+        mainAccount.unifyDuplicates(duplicates, otherAccount)
+    return True
 
 
-def listAccounts(bookPath: str, filter: str | None = None):
-    if filter is None:
-        print("### All Accounts ###")
-    else:
-        print("### Listing Accounts matching '" + filter + "' ###")
+def _dateRange(
+    postedFrom: datetime.date | None, postedUntil: datetime.date | None
+) -> list[str]:
+    """The date range as part of the operation a watermark is kept for."""
+    if postedFrom is None and postedUntil is None:
+        return []
+    return [
+        postedFrom.isoformat() if postedFrom is not None else "",
+        postedUntil.isoformat() if postedUntil is not None else "",
+    ]
+
+
+class _Confirmation:
+    """Asks with `input`, and remembers whether a change was declined."""
+
+    declined = False
+
+    def __call__(self, question: str) -> str:
+        answer = input(question)
+        self.declined = answer.lower() != "y"
+        return answer
+
+
+def _startIncremental(
+    bookPath: str,
+    ledger: "Ledger",
+    operation: Sequence[str | None],
+    incremental: bool,
+    fullRescan: bool,
+) -> tuple["Watermark | None", "Watermark | None", _Confirmation]:
+    """
+    With `incremental`, the stored watermark of `operation` to start from
+    (unless `fullRescan`), and the watermark of everything in the book now,
+    to store afterwards.
+    """
+    from gnucsh import watermarks
+
+    if not incremental:
+        return None, None, _Confirmation()
+    since = watermarks.load(bookPath, operation) if not fullRescan else None
+    if since is not None:
+        print(
+            "## Only entries entered after {}".format(
+                since.enterDate.strftime("%Y-%m-%d %H:%M:%S")
+            )
+        )
+    return since, ledger.getWatermark(since), _Confirmation()
+
+
+def _finishIncremental(
+    bookPath: str,
+    operation: Sequence[str | None],
+    watermark: "Watermark | None",
+    confirm: _Confirmation,
+):
+    """Store the watermark, unless the change was declined."""
+    from gnucsh import watermarks
+
+    if watermark is not None and not confirm.declined:
+        watermarks.save(bookPath, operation, watermark)
+
+
+def unifyDuplicatesFromSnapshot(
+    bookPath: str,
+    snapshot: Snapshot,
+    mainAccountName: str,
+    otherAccountName: str,
+    postedFrom: datetime.date | None = None,
+    postedUntil: datetime.date | None = None,
+):
+    """
+    Like `unifyDuplicates`, but searching the duplicates in `snapshot`. The
+    book is only opened once the change is confirmed.
+    """
+    mainAccount = snapshot.findAccount(mainAccountName)
+    otherAccount = snapshot.findAccount(otherAccountName)
+
+    with profiling.phase("find duplicates"):
+        duplicates = snapshot.findDuplicates(
+            mainAccount, otherAccount, postedFrom, postedUntil
+        )
+    if len(duplicates) < 1:
+        print("no duplicates found")
+        return
+
+    for mainRow, otherRow in duplicates:
+        print("----------")
+        print("+ main: " + formatEntry(*snapshot.entryRow(mainRow)))
+        print("- other:" + formatEntry(*snapshot.entryRow(otherRow)))
+
+    user_input = input(
+        "Are you sure you want to link the main entries to the"
+        + " '{}' and remove the 'other' entries? [Y/n]".format(
+            snapshot.accounts[otherAccount][1]
+        )
+    )
+    if user_input.lower() != "y":
+        return
+
+    from gnucsh.convenience_types.ledger import openLedger
 
     with openLedger(bookPath) as ledger:
-        for acc in ledger.getAllAccounts():
-            if filter is None:
-                print(acc.fullname)
-            else:
-                if re.search(filter, acc.fullname):
-                    print(acc.fullname)
+        mainBaseAccount = ledger.findAccountByName(mainAccountName)
+        otherBaseAccount = ledger.findAccountByName(otherAccountName)
+        mainEntries = {
+            e.backingSplit.guid: e for e in mainBaseAccount.getEntries()
+        }
+        otherEntries = {
+            e.backingSplit.guid: e for e in otherBaseAccount.getEntries()
+        }
+        with profiling.phase("unify"):
+            mainBaseAccount.unifyDuplicates(
+                [
+                    (
+                        mainEntries[snapshot.splitGuid(mainRow)],
+                        otherEntries[snapshot.splitGuid(otherRow)],
+                    )
+                    for mainRow, otherRow in duplicates
+                ],
+                otherBaseAccount,
+            )
+        ledger.save()
+
+
+def unifyAllDuplicates(bookPath: str, selection: str, cache: bool = False):
+    """
+    Search duplicates between every two accounts of `selection` (see
+    `selectAccounts`) and unify all of them in one save once confirmed.
+    """
+    from gnucsh.duplicates import scanDuplicates, selectAccounts
+
+    with profiling.phase("load snapshot"):
+        snapshot = Snapshot.open(bookPath, cache)
+    accounts = selectAccounts(snapshot, selection)
+
+    with profiling.phase("find duplicates"):
+        duplicates = scanDuplicates(snapshot, accounts)
+    if len(duplicates) < 1:
+        print("no duplicates found")
+        return
+
+    pairsByAccounts: dict[tuple[int, int], list[tuple[int, int]]] = {}
+    for mainRow, otherRow in duplicates:
+        pairsByAccounts.setdefault(
+            (snapshot.account(mainRow), snapshot.account(otherRow)), []
+        ).append((mainRow, otherRow))
+
+    for (mainAccount, otherAccount), pairs in pairsByAccounts.items():
+        print(
+            "########## {} <-> {}".format(
+                snapshot.accounts[mainAccount][1],
+                snapshot.accounts[otherAccount][1],
+            )
+        )
+        for mainRow, otherRow in pairs:
+            print("----------")
+            print("+ main: " + formatEntry(*snapshot.entryRow(mainRow)))
+            print("- other:" + formatEntry(*snapshot.entryRow(otherRow)))
+
+    user_input = input(
+        "Are you sure you want to link each main entry to the account of its"
+        + " 'other' entry and remove the {} 'other' entries? [Y/n]".format(
+            len(duplicates)
+        )
+    )
+    if user_input.lower() != "y":
+        return
+
+    from gnucsh.convenience_types.ledger import openLedger
+
+    with openLedger(bookPath) as ledger:
+        baseAccounts = {
+            acc: ledger.findAccountByName(snapshot.accounts[acc][1])
+            for accounts in pairsByAccounts
+            for acc in accounts
+        }
+        # load all entries before changing any, loading flushes the session
+        entries = {
+            e.backingSplit.guid: e
+            for baseAccount in baseAccounts.values()
+            for e in baseAccount.getEntries()
+        }
+        with profiling.phase("unify"):
+            for (mainAccount, otherAccount), pairs in pairsByAccounts.items():
+                baseAccounts[mainAccount].unifyDuplicates(
+                    [
+                        (
+                            entries[snapshot.splitGuid(mainRow)],
+                            entries[snapshot.splitGuid(otherRow)],
+                        )
+                        for mainRow, otherRow in pairs
+                    ],
+                    baseAccounts[otherAccount],
+                )
+        ledger.save()
+
+
+def listAccounts(
+    bookPath: str, filter: str | None = None, format: str = "text"
+):
+    from gnucsh.convenience_types.ledger import openLedger
+
+    with openLedger(bookPath, readonly=True) as ledger:
+        _listAccounts(ledger, filter, format)
+
+
+def _listAccounts(ledger: "Ledger", filter: str | None, format: str):
+    accounts = ledger.getAllAccounts()
+    if filter is not None:
+        with profiling.phase("filter"):
+            accounts = [
+                acc for acc in accounts if re.search(filter, acc.fullname)
+            ]
+
+    with profiling.phase("render"):
+        if format != "text":
+            writeRows(
+                sys.stdout,
+                format,
+                ["account", "name", "type"],
+                (
+                    (acc.fullname, acc.name, acc.backingAccount.type)
+                    for acc in accounts
+                ),
+            )
+            return
+
+        if filter is None:
+            print("### All Accounts ###")
+        else:
+            print("### Listing Accounts matching '" + filter + "' ###")
+
+        for acc in accounts:
+            print(acc.fullname)
+
+
+def _listAccountsFromSnapshot(
+    snapshot: Snapshot, filter: str | None, format: str
+):
+    accounts = snapshot.accounts
+    if filter is not None:
+        with profiling.phase("filter"):
+            accounts = [acc for acc in accounts if re.search(filter, acc[1])]
+
+    with profiling.phase("render"):
+        if format != "text":
+            writeRows(
+                sys.stdout,
+                format,
+                ["account", "name", "type"],
+                (acc[1:] for acc in accounts),
+            )
+            return
+
+        if filter is None:
+            print("### All Accounts ###")
+        else:
+            print("### Listing Accounts matching '" + filter + "' ###")
+
+        for acc in accounts:
+            print(acc[1])
+
+
+class _Page:
+    """The `--limit`, `--after` and `--reverse` options of a listing."""
+
+    limit: int | None
+    after: str | None
+    reverse: bool
+
+    def __init__(self, limit: int | None, after: str | None, reverse: bool):
+        self.limit = limit
+        self.after = after
+        self.reverse = reverse
+
+    def isEmpty(self) -> bool:
+        """Whether the whole listing is wanted, in the order of the book."""
+        return self.limit is None and self.after is None and not self.reverse
+
+
+_PAGED_ONLY_BY_LISTINGS = {
+    "transfer": "--transfer",
+    "duplicates": "--duplicates",
+    "rules": "--rules",
+    "statement": "--import",
+    "report": "--report",
+    "scan_duplicates": "--scan-duplicates",
+}
+""" Parameters of `main` the page options do not apply to. """
+
+
+def _checkPage(params: dict[str, Any]):
+    """Reject the page options for commands other than listings."""
+    page = _Page(params["limit"], params["after"], params["reverse"])
+    for name, option in _PAGED_ONLY_BY_LISTINGS.items():
+        if not page.isEmpty() and params[name] is not None:
+            raise click.UsageError(
+                "--limit, --after and --reverse only page listings of"
+                + " transactions, not {}.".format(option)
+            )
 
 
 def listTransactions(
-    bookPath: str, accountName: str, filter: str | None = None
+    bookPath: str,
+    accountName: str,
+    filter: str | None = None,
+    format: str = "text",
+    postedFrom: datetime.date | None = None,
+    postedUntil: datetime.date | None = None,
+    page: _Page | None = None,
 ):
-    with openLedger(bookPath) as ledger:
-        accountToList = ledger.findAccountByName(accountName)
+    from gnucsh.convenience_types.ledger import openLedger
 
+    with openLedger(bookPath, readonly=True) as ledger:
+        _listTransactions(
+            ledger, accountName, filter, format, postedFrom, postedUntil, page
+        )
+
+
+def _listTransactions(
+    ledger: "Ledger",
+    accountName: str,
+    filter: str | None,
+    format: str,
+    postedFrom: datetime.date | None = None,
+    postedUntil: datetime.date | None = None,
+    page: _Page | None = None,
+):
+    accountToList = ledger.findAccountByName(accountName)
+
+    if page is not None and not page.isEmpty():
+        entries, cursor = accountToList.findEntriesPage(
+            filter,
+            page.limit,
+            page.after,
+            page.reverse,
+            postedFrom,
+            postedUntil,
+        )
+        with profiling.phase("render"):
+            if format != "text":
+                writeRows(
+                    sys.stdout,
+                    format,
+                    ["date", "value", "description", "account"],
+                    (
+                        (e.date, e.value, e.description, e.account_path)
+                        for e in entries
+                    ),
+                )
+            else:
+                print(
+                    "###  Account:'{}'  filter:'{}'  ###".format(
+                        accountToList.name, str(filter)
+                    )
+                )
+                for entry in entries:
+                    print(entry)
+        if cursor is not None:
+            # not part of the listing, which may be parsed
+            print("Next page: --after {}".format(cursor), file=sys.stderr)
+        return
+
+    if format != "text":
+        index = ledger.getAccountIndex()
+        # the rows are streamed, so this includes loading them
+        with profiling.phase("export"):
+            writeRows(
+                sys.stdout,
+                format,
+                ["date", "value", "description", "account"],
+                (
+                    (
+                        date,
+                        value,
+                        description,
+                        index.fullname(index.byGuid[otherGuid]),
+                    )
+                    for date, value, description, otherGuid in (
+                        accountToList.iterEntryRows(
+                            filter, postedFrom, postedUntil
+                        )
+                    )
+                ),
+            )
+        return
+
+    entries = accountToList.findEntriesWithDescription(
+        filter, None, postedFrom, postedUntil
+    )
+    with profiling.phase("render"):
         print(
             "###  Account:'{}'  filter:'{}'  ###".format(
                 accountToList.name, str(filter)
             )
         )
 
-        for entry in accountToList.findEntriesWithDescription(filter):
+        for entry in entries:
             print(entry)
 
 
+def _listTransactionsFromSnapshot(
+    snapshot: Snapshot,
+    accountName: str,
+    filter: str | None,
+    format: str,
+    postedFrom: datetime.date | None = None,
+    postedUntil: datetime.date | None = None,
+):
+    accountToList = snapshot.findAccount(accountName)
+    rows = snapshot.iterEntryRows(
+        accountToList, filter, postedFrom, postedUntil
+    )
+
+    with profiling.phase("render"):
+        if format != "text":
+            writeRows(
+                sys.stdout,
+                format,
+                ["date", "value", "description", "account"],
+                rows,
+            )
+            return
+
+        print(
+            "###  Account:'{}'  filter:'{}'  ###".format(
+                snapshot.accounts[accountToList][2], str(filter)
+            )
+        )
+        for row in rows:
+            print(formatEntry(*row))
+
+
+def showReport(
+    bookPath: str,
+    accountName: str | None,
+    report: str,
+    format: str,
+    cache: bool = False,
+):
+    """
+    Print the `report` (one of `REPORTS`) of all accounts, or of the account
+    `accountName` and its sub-accounts.
+    """
+    with profiling.phase("import"):
+        from gnucsh.report import SplitArrays, balanceRows, periodRows
+
+    with profiling.phase("load snapshot"):
+        snapshot = Snapshot.open(bookPath, cache)
+        arrays = SplitArrays(snapshot)
+
+    accounts = list(range(len(snapshot.accounts)))
+    if accountName is not None:
+        accounts = snapshot.subtree(snapshot.findAccount(accountName))
+
+    rows: list[tuple[str, ...]]
+    with profiling.phase("report"):
+        if report == "balance":
+            header = ["account", "balance", "total"]
+            rows = list(balanceRows(arrays, accounts))
+        else:
+            header = [report, "account", "total", "balance"]
+            rows = list(periodRows(arrays, accounts, report))
+
+    with profiling.phase("render"):
+        if format != "text":
+            writeRows(sys.stdout, format, header, rows)
+            return
+
+        print("###  Report:'{}'  ###".format(report))
+        for row in rows:
+            if report == "balance":
+                print("{:<60} {:>14} {:>14}".format(*row))
+            else:
+                print("{:<8} {:<60} {:>14} {:>14}".format(*row))
+
+
 if __name__ == "__main__":
     main()
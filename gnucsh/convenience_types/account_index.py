@@ -0,0 +1,78 @@
+# pyright: reportUnknownVariableType=false, reportUnknownMemberType=false
+# pyright: reportUnknownArgumentType=false, reportMissingTypeStubs=false
+
+import warnings
+from typing import cast
+
+from piecash import Account
+from sqlalchemy.orm import Session
+
+
+class AccountIndex:
+    """
+    All accounts of a book, loaded with a single query and indexed by guid,
+    name and full name. The full names are computed once from the loaded
+    rows, instead of walking up the parents of every account separately.
+    """
+
+    accounts: list[Account]
+    """ All accounts except the root accounts, in the order of the book. """
+
+    byGuid: dict[str, Account]
+    byName: dict[str, Account]
+    """ The first account with a given name, like `Book.accounts(name=..)`. """
+    byFullname: dict[str, Account]
+
+    fullnames: dict[str, str]
+    """ Full name of every account, by guid. """
+
+    def __init__(self, session: Session):
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            allAccounts = cast(list[Account], session.query(Account).all())
+
+        self.byGuid = {acc.guid: acc for acc in allAccounts}
+        self.fullnames = {}
+        self.accounts = []
+        self.byName = {}
+        self.byFullname = {}
+        for acc in allAccounts:
+            if acc.parent_guid is None:
+                continue
+            self.accounts.append(acc)
+            self.byName.setdefault(acc.name, acc)
+            self.byFullname[self.fullname(acc)] = acc
+
+    def fullname(self, account: Account) -> str:
+        """Same as `Account.fullname`, but memoized for the whole tree."""
+        known = self.fullnames.get(account.guid)
+        if known is not None:
+            return known
+
+        # collect the parents that are not known yet, and resolve them from
+        # the top down
+        unknown: list[Account] = []
+        parentName = ""
+        current: Account | None = account
+        while current is not None:
+            known = self.fullnames.get(current.guid)
+            if known is not None:
+                parentName = known
+                break
+            unknown.append(current)
+            current = (
+                self.byGuid.get(current.parent_guid)
+                if current.parent_guid is not None
+                else None
+            )
+
+        for acc in reversed(unknown):
+            if acc.parent_guid is None:
+                name = ""
+            elif parentName:
+                name = "{}:{}".format(parentName, acc.name)
+            else:
+                name = acc.name
+            self.fullnames[acc.guid] = name
+            parentName = name
+        return parentName
@@ -1,16 +1,46 @@
 # pyright: reportUnknownVariableType=false, reportUnknownMemberType=false
 # pyright: reportMissingTypeStubs=false, reportUnknownArgumentType=false
 
+import datetime
 import re
+import uuid
 import warnings
-from typing import cast
+from collections import Counter
+from typing import Any, Iterable, Iterator, cast
 
-from piecash import Account, Split
+from piecash import Account, GncValidationError, Split
 from piecash.core.transaction import Decimal, Transaction
+from piecash.kvp import KVP_Type, Slot
 from piecash.sa_extra import DeclarativeBase
+from sqlalchemy import and_, event, func, or_
+from sqlalchemy.orm import aliased, contains_eager, selectinload
+from sqlalchemy.orm.attributes import set_committed_value
 from typing_extensions import Self
 
+from gnucsh import profiling
 from gnucsh.convenience_types.entry import Entry
+from gnucsh.watermarks import Watermark
+
+BULK_CHUNK_SIZE = 500
+""" Maximum number of guids bound in a single bulk statement. """
+
+PAGE_WALK_MIN_SPLITS = 10000
+"""
+Splits an account needs before its pages and date ranges are read through
+the index on the post date.
+"""
+
+ITER_CHUNK_SIZE = 1000
+""" Entries read from the database at once by `iterEntries`. """
+
+INSERT_BATCH_SIZE = 5000
+""" Transactions written by a single bulk INSERT, by default. """
+
+STREAM_BATCH_SIZE = 1000
+"""
+Rows fetched at once by queries over all splits of an account, which are
+read through a server-side cursor on database servers.
+"""
 
 
 class BaseAccount:
@@ -25,9 +55,11 @@ class BaseAccount:
     fullname: str
     name: str
 
-    def __init__(self, piecashAccount: Account):
+    def __init__(self, piecashAccount: Account, fullname: str | None = None):
         self.backingAccount = piecashAccount
-        self.fullname = piecashAccount.fullname
+        self.fullname = (
+            fullname if fullname is not None else piecashAccount.fullname
+        )
         self.name = piecashAccount.name
 
     def createBankAccount(self, name: str):
@@ -48,6 +80,43 @@ class BaseAccount:
                 )
             )
 
+    def createAccounts(
+        self,
+        specs: Iterable[tuple[str, str]],
+        batchSize: int = INSERT_BATCH_SIZE,
+    ) -> list["BaseAccount"]:
+        """
+        Create a sub-account for every (name, type) of `specs`, like
+        `createAccount`, and return them in the same order.
+
+        The accounts are flushed every `batchSize` accounts, so piecash
+        validates them in batches instead of all at once on the next save.
+        """
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            session = cast(DeclarativeBase, self.backingAccount).book.session
+            commodity = self.backingAccount.commodity
+            accounts: list[BaseAccount] = []
+            for name, type in specs:
+                accounts.append(
+                    BaseAccount(
+                        Account(
+                            parent=self.backingAccount,
+                            name=name,
+                            type=type,
+                            commodity=commodity,
+                        ),
+                        (
+                            "{}:{}".format(self.fullname, name)
+                            if self.backingAccount.type != "ROOT"
+                            else name
+                        ),
+                    )
+                )
+                if len(accounts) % batchSize == 0:
+                    session.flush()
+            return accounts
+
     def addEntry(self, value: str, description: str, base: Self):
         with warnings.catch_warnings():
             warnings.simplefilter("ignore")
@@ -61,44 +130,784 @@ class BaseAccount:
                 ],
             )
 
-    def findEntriesWithDescription(self, matcher: str | None) -> list[Entry]:
-        foundEntries: list[Entry] = []
-        for e in self.getEntries():
-            if matcher is None:
-                foundEntries.append(e)
-            else:
-                if re.search(matcher, e.description) is not None:
-                    foundEntries.append(e)
-        return foundEntries
+    def addEntries(
+        self,
+        entries: Iterable[tuple[str, str, Self]],
+        batchSize: int = INSERT_BATCH_SIZE,
+    ) -> int:
+        """
+        Add an entry for every (value, description, counter account) of
+        `entries`, like `addEntry`, and return their number.
+
+        Instead of building a transaction and its splits through piecash,
+        the rows are written with bulk INSERT statements of `batchSize`
+        transactions. The changes are part of the current database
+        transaction and are written on the next save.
+        """
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            session = cast(DeclarativeBase, self.backingAccount).book.session
+            flushPending(session)
+            batch = _InsertBatch(
+                session, self.backingAccount.commodity, batchSize
+            )
+            today = datetime.date.today()
+            added = 0
+            for value, description, base in entries:
+                batch.add(
+                    today,
+                    Decimal(value),
+                    description,
+                    self.backingAccount,
+                    base.backingAccount,
+                )
+                added += 1
+            batch.write()
+            return added
+
+    def importEntries(
+        self,
+        rows: Iterable[tuple[datetime.date, Decimal, str]],
+        counterAccount: Self,
+        batchSize: int = INSERT_BATCH_SIZE,
+    ) -> tuple[int, int]:
+        """
+        Add an entry for every (date, value, description) of `rows` that is
+        not in this account yet, with `counterAccount` as transfer account,
+        and return the number of added and of skipped rows.
+
+        A row is skipped once for every entry of this account with the same
+        date, value and description, so an overlapping statement can be
+        imported again. The rows are consumed as they come and written with
+        bulk INSERT statements of `batchSize` transactions, the same rows
+        `addEntry` would write. The changes are part of the current database
+        transaction and are written on the next save.
+        """
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            session = cast(DeclarativeBase, self.backingAccount).book.session
+            flushPending(session)
+            with profiling.phase("load index"):
+                existing = Counter(
+                    (date, Decimal(num) / denom, description)
+                    for date, num, denom, description in session.query(
+                        Transaction.post_date,
+                        Split._value_num,
+                        Split._value_denom,
+                        Transaction.description,
+                    )
+                    .join(Split.transaction)
+                    .filter(Split.account_guid == self.backingAccount.guid)
+                    .execution_options(stream_results=True)
+                    .yield_per(STREAM_BATCH_SIZE)
+                )
+
+            batch = _InsertBatch(
+                session, self.backingAccount.commodity, batchSize
+            )
+            added = skipped = 0
+            for date, value, description in rows:
+                key = (date, value, description)
+                if existing[key] > 0:
+                    existing[key] -= 1
+                    skipped += 1
+                    continue
+                batch.add(
+                    date,
+                    value,
+                    description,
+                    self.backingAccount,
+                    counterAccount.backingAccount,
+                )
+                added += 1
+            batch.write()
+            return added, skipped
+
+    def findEntriesWithDescription(
+        self,
+        matcher: str | None,
+        since: Watermark | None = None,
+        postedFrom: datetime.date | None = None,
+        postedUntil: datetime.date | None = None,
+    ) -> list[Entry]:
+        """
+        Return the entries whose description matches the regex `matcher`, or
+        all entries if it is None. With `since`, only the entries of
+        transactions the watermark does not cover are returned. With
+        `postedFrom` and `postedUntil`, only those posted in that range
+        (both days included).
+
+        The match runs inside the database query, so only the matching
+        entries are loaded.
+        """
+        criteria = []
+        if matcher is not None:
+            # fail with the usual error for invalid patterns, instead of a
+            # generic one raised from within the database
+            _ = re.compile(matcher)
+            criteria.append(Transaction.description.regexp_match(matcher))
+        if since is not None:
+            criteria.append(_enteredAfter(since))
+        return self._loadEntries(
+            *criteria, postedFrom=postedFrom, postedUntil=postedUntil
+        )
+
+    def iterEntriesWithDescription(
+        self,
+        matcher: str | None,
+        postedFrom: datetime.date | None = None,
+        postedUntil: datetime.date | None = None,
+        chunkSize: int = ITER_CHUNK_SIZE,
+    ) -> Iterator[Entry]:
+        """
+        Stream the entries `findEntriesWithDescription` would return, ordered
+        by post date and split guid.
+
+        They are read in pages of `chunkSize` entries (see
+        `findEntriesPage`) instead of all at once. The session only keeps
+        weak references to unchanged objects, so the splits and transactions
+        of the entries the caller no longer references are freed, and memory
+        stays flat however long the history of the account is.
+        """
+        cursor = None
+        while True:
+            entries, cursor = self.findEntriesPage(
+                matcher, chunkSize, cursor, False, postedFrom, postedUntil
+            )
+            yield from entries
+            if cursor is None:
+                return
+
+    def iterEntries(self, chunkSize: int = ITER_CHUNK_SIZE) -> Iterator[Entry]:
+        """Stream an `Entry` for every split of this account."""
+        return self.iterEntriesWithDescription(None, chunkSize=chunkSize)
+
+    def iterEntryRows(
+        self,
+        matcher: str | None,
+        postedFrom: datetime.date | None = None,
+        postedUntil: datetime.date | None = None,
+    ) -> Iterator[tuple[datetime.date, str, str, str]]:
+        """
+        Stream the date, value, description and transfer account guid of the
+        entries matching `matcher` and posted in the range, like
+        `findEntriesWithDescription`.
+
+        The columns are read straight from the database in batches (through a
+        server-side cursor on database servers), without loading the splits
+        and transactions or creating `Entry` objects.
+        Transactions with more than two splits yield a row for every other
+        split.
+        """
+        if matcher is not None:
+            _ = re.compile(matcher)
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            session = cast(DeclarativeBase, self.backingAccount).book.session
+            flushPending(session)
+            otherSplit = aliased(Split)
+            query = (
+                session.query(
+                    Transaction.post_date,
+                    Split._value_num,
+                    Split._value_denom,
+                    Transaction.description,
+                    otherSplit.account_guid,
+                )
+                .select_from(Split)
+                .join(Split.transaction)
+                .join(
+                    otherSplit,
+                    and_(
+                        otherSplit.transaction_guid == Split.transaction_guid,
+                        otherSplit.guid != Split.guid,
+                    ),
+                )
+                .filter(
+                    self._accountCriterion(
+                        self._walksRange(postedFrom, postedUntil)
+                    ),
+                    *_postedBetween(postedFrom, postedUntil),
+                )
+            )
+            if matcher is not None:
+                query = query.filter(
+                    Transaction.description.regexp_match(matcher)
+                )
+            query = query.execution_options(stream_results=True).yield_per(
+                STREAM_BATCH_SIZE
+            )
+            for date, num, denom, description, otherGuid in query:
+                # same as str(Split.value)
+                yield date, str(Decimal(num) / denom), description, otherGuid
 
     def removeEntry(self, entry: Entry):
         cast(DeclarativeBase, self.backingAccount).book.delete(
             entry.backingSplit.transaction
         )
 
+    def unifyDuplicates(
+        self, duplicates: list[tuple[Entry, Entry]], otherAccount: Self
+    ):
+        """
+        Link the main entry of every pair returned by `findDuplicates` to
+        `otherAccount` and remove the duplicated entry from it.
+
+        All relinks and deletes are collected into a single unit of work that
+        is only written out on the next save. Validating and deleting the
+        transactions on save reads their splits and slots, which are loaded
+        here for all pairs at once, so the save costs a fixed number of
+        statements instead of a few per pair.
+        """
+        session = cast(DeclarativeBase, self.backingAccount).book.session
+        guids = [
+            entry.backingSplit.transaction_guid
+            for pair in duplicates
+            for entry in pair
+        ]
+        with session.no_autoflush:
+            for start in range(0, len(guids), BULK_CHUNK_SIZE):
+                end = start + BULK_CHUNK_SIZE
+                transactions = (
+                    session.query(Transaction)
+                    .filter(Transaction.guid.in_(guids[start:end]))
+                    .options(
+                        selectinload(Transaction.slots),
+                        selectinload(Transaction.splits).selectinload(
+                            Split.slots
+                        ),
+                    )
+                    .all()
+                )
+                # validation reads the transaction of every changed or
+                # deleted split. Set it on the split, a deleted transaction
+                # is no longer found in the session by then. The splits also
+                # keep the loaded transactions alive until the save.
+                for transaction in transactions:
+                    for split in transaction.splits:
+                        set_committed_value(split, "transaction", transaction)
+                    # deleting a slot looks for the frame it is in, the
+                    # slots of transactions and splits are in none
+                    for slot in [
+                        *transaction.slots,
+                        *(sl for sp in transaction.splits for sl in sp.slots),
+                    ]:
+                        set_committed_value(slot, "parent", None)
+            for mainEntry, otherEntry in duplicates:
+                mainEntry.otherAccount.setAccount(otherAccount.backingAccount)
+                otherAccount.removeEntry(otherEntry)
+
+    def changeTransferAccount(
+        self, entries: list[Entry], newTransferAccount: Self
+    ) -> int:
+        """
+        Link every entry of `entries` to `newTransferAccount`, the same as
+        calling `entry.otherAccount.setAccount` on each of them, and return
+        the number of changed splits.
+
+        Splits which piecash would accept without adjusting them are
+        rewritten with a few set-based UPDATE statements. Splits of another
+        currency than the new account still go through the ORM, so piecash
+        validates and converts them as before. The changes are part of the
+        current database transaction and are written on the next save.
+        """
+        newAccount = newTransferAccount.backingAccount
+        if newAccount.placeholder != 0:
+            raise GncValidationError(
+                "Account '{}' used in the transaction is a placeholder".format(
+                    newAccount
+                )
+            )
+
+        bulkSplits: list[Split] = []
+        changed = 0
+        for e in entries:
+            split = e.otherAccount.backingSplit
+            if split.account_guid == newAccount.guid:
+                continue
+            transaction = cast(Transaction, split.transaction)
+            if (
+                transaction.currency == newAccount.commodity
+                and split.quantity == split.value
+            ):
+                bulkSplits.append(split)
+            else:
+                e.otherAccount.setAccount(newAccount)
+                changed += 1
+        if not bulkSplits:
+            return changed
+
+        session = cast(DeclarativeBase, self.backingAccount).book.session
+        # write pending changes first, they would otherwise overwrite the
+        # bulk update when flushed later
+        session.flush()
+        oldAccounts = {split.account for split in bulkSplits}
+        guids = [split.guid for split in bulkSplits]
+        for start in range(0, len(guids), BULK_CHUNK_SIZE):
+            end = start + BULK_CHUNK_SIZE
+            changed += (
+                session.query(Split)
+                .filter(Split.guid.in_(guids[start:end]))
+                .update(
+                    {Split.account_guid: newAccount.guid},
+                    synchronize_session=False,
+                )
+            )
+
+        # the session does not know about the update, let it reload the
+        # changed rows and the split lists of the involved accounts
+        for split in bulkSplits:
+            session.expire(split, ["account_guid", "account"])
+        for acc in (*oldAccounts, newAccount):
+            session.expire(acc, ["splits"])
+        for e in entries:
+            e.otherAccount.forgetAccount()
+        return changed
+
     def getEntries(self) -> list[Entry]:
+        """
+        Return an `Entry` for every split of this account.
+
+        The splits are loaded together with their transactions, the sibling
+        splits and the accounts of those, so the resulting entries can be
+        fully read without sending another query per entry.
+        """
+        return self._loadEntries()
+
+    def findEntriesPage(
+        self,
+        matcher: str | None,
+        limit: int | None,
+        after: str | None = None,
+        reverse: bool = False,
+        postedFrom: datetime.date | None = None,
+        postedUntil: datetime.date | None = None,
+    ) -> tuple[list[Entry], str | None]:
+        """
+        Return a page of at most `limit` of the entries that
+        `findEntriesWithDescription` would find, ordered by post date and
+        split guid (the newest first with `reverse`), and the cursor of the
+        next page, or None if this is the last one. The page starts after
+        the entry whose cursor is `after`.
+
+        The page is selected in the database with a keyset on the post date
+        and the guid. For accounts with at least `PAGE_WALK_MIN_SPLITS`
+        splits, the database walks the index on the post date until the page
+        is full, so its cost depends on the size of the page and not on the
+        size of the account.
+        """
+        criteria = [self._pageStart(after, reverse)]
+        if matcher is not None:
+            _ = re.compile(matcher)
+            criteria.append(Transaction.description.regexp_match(matcher))
+        if reverse:
+            orderBy = [Transaction.post_date.desc(), Split.guid.desc()]
+        else:
+            orderBy = [Transaction.post_date, Split.guid]
+        entries = self._loadEntries(
+            *criteria,
+            postedFrom=postedFrom,
+            postedUntil=postedUntil,
+            orderBy=orderBy,
+            limit=limit + 1 if limit is not None else None,
+            byPostDate=limit is not None
+            and self._hasSplits(PAGE_WALK_MIN_SPLITS),
+        )
+        if limit is None or len(entries) <= limit:
+            return entries, None
+        return entries[:limit], entries[limit - 1].backingSplit.guid
+
+    def _pageStart(self, after: str | None, reverse: bool) -> Any:
+        """
+        Criterion for the splits after the one with the guid `after`, or for
+        all splits, in the order of a page. Both are a range on the post
+        date, which SQLite can read from its index.
+        """
+        session = cast(DeclarativeBase, self.backingAccount).book.session
+        # aliased, so they are not correlated with the splits of the page
+        cursorTransaction = aliased(Transaction)
+        cursorSplit = aliased(Split)
+        if after is None:
+            bound = session.query(
+                (func.max if reverse else func.min)(
+                    cursorTransaction._post_date
+                )
+            ).scalar_subquery()
+            if reverse:
+                return Transaction._post_date <= bound
+            return Transaction._post_date >= bound
+
+        found = session.query(Split.guid).filter(Split.guid == after).first()
+        if found is None:
+            raise KeyError(
+                "Could not find the entry of cursor '{}'".format(after)
+            )
+        # the post date as stored, instead of converted to a date and back
+        bound = (
+            session.query(cursorTransaction._post_date)
+            .join(cursorSplit, cursorTransaction.splits)
+            .filter(cursorSplit.guid == after)
+            .scalar_subquery()
+        )
+        if reverse:
+            return and_(
+                Transaction._post_date <= bound,
+                or_(Transaction._post_date < bound, Split.guid < after),
+            )
+        return and_(
+            Transaction._post_date >= bound,
+            or_(Transaction._post_date > bound, Split.guid > after),
+        )
+
+    def _hasSplits(self, count: int) -> bool:
+        """Whether this account has at least `count` splits."""
+        session = cast(DeclarativeBase, self.backingAccount).book.session
+        # counting at most `count` of them, so this stays cheap
+        splits = (
+            session.query(Split.guid)
+            .filter(Split.account_guid == self.backingAccount.guid)
+            .limit(count)
+            .subquery()
+        )
+        return (
+            session.query(func.count()).select_from(splits).scalar() >= count
+        )
+
+    def _walksRange(
+        self,
+        postedFrom: datetime.date | None,
+        postedUntil: datetime.date | None,
+    ) -> bool:
+        """
+        Whether the entries posted in the range are read through the index on
+        the post date, instead of the one on the account. Only worth it for
+        accounts too big to read whole.
+        """
+        return (
+            postedFrom is not None or postedUntil is not None
+        ) and self._hasSplits(PAGE_WALK_MIN_SPLITS)
+
+    def _loadEntries(
+        self,
+        *criteria: Any,
+        postedFrom: datetime.date | None = None,
+        postedUntil: datetime.date | None = None,
+        orderBy: list[Any] | None = None,
+        limit: int | None = None,
+        byPostDate: bool = False,
+    ) -> list[Entry]:
+        with warnings.catch_warnings(), profiling.phase("load entries"):
+            warnings.simplefilter("ignore")
+            session = cast(DeclarativeBase, self.backingAccount).book.session
+            flushPending(session)
+            _loadAccounts(session)
+            query = (
+                session.query(Split)
+                .join(Split.transaction)
+                .filter(
+                    self._accountCriterion(
+                        byPostDate or self._walksRange(postedFrom, postedUntil)
+                    ),
+                    *_postedBetween(postedFrom, postedUntil),
+                )
+                .options(
+                    contains_eager(Split.transaction)
+                    .selectinload(Transaction.splits)
+                    .joinedload(Split.account)
+                )
+            )
+            if criteria:
+                query = query.filter(*criteria)
+            if orderBy is not None:
+                query = query.order_by(*orderBy)
+            if limit is not None:
+                query = query.limit(limit)
+            splits = cast(list[Split], query.all())
+
         with warnings.catch_warnings():
             warnings.simplefilter("ignore")
-            entries: list[Entry] = []
-            for sp in cast(list[Split], self.backingAccount.splits):
-                # "split" means an entry in the log. Convert it to a more
-                # convenient helper class.
-                entries.append(Entry(sp))
+            with profiling.phase("build entries"):
+                entries: list[Entry] = []
+                for sp in splits:
+                    # "split" means an entry in the log. Convert it to a more
+                    # convenient helper class.
+                    entries.append(Entry(sp))
+            profiling.count("Entry", len(entries))
             return entries
 
-    def findDuplicates(self, otherAccount: Self):
+    def findDuplicates(
+        self,
+        otherAccount: Self,
+        since: Watermark | None = None,
+        postedFrom: datetime.date | None = None,
+        postedUntil: datetime.date | None = None,
+    ) -> list[tuple[Entry, Entry]]:
+        """
+        Find pairs of entries (one from this account, one from the other)
+        that share a date and description, but are not linked to each other
+        yet. With `since`, only pairs with at least one entry of a
+        transaction the watermark does not cover are returned. With
+        `postedFrom` and `postedUntil`, only entries posted in that range
+        are compared.
+
+        The other account's entries are bucketed by (date, description) once,
+        so every entry of this account only needs to be compared against the
+        handful of candidates sharing its key instead of the whole account.
+        """
+        criteria = []
+        if since is not None:
+            # only entries sharing a description with a new entry can be
+            # part of a new pair
+            descriptions = self._newDescriptions(
+                otherAccount, since, postedFrom, postedUntil
+            )
+            if not descriptions:
+                return []
+            criteria.append(Transaction.description.in_(descriptions))
+        mainEntries = self._loadEntries(
+            *criteria, postedFrom=postedFrom, postedUntil=postedUntil
+        )
+        otherEntries = otherAccount._loadEntries(
+            *criteria, postedFrom=postedFrom, postedUntil=postedUntil
+        )
+
+        otherEntriesByKey: dict[tuple[datetime.date, str], list[Entry]] = {}
+        for otherEntry in otherEntries:
+            otherEntriesByKey.setdefault(
+                (otherEntry.date, otherEntry.description), []
+            ).append(otherEntry)
+
         foundPairs: list[tuple[Entry, Entry]] = []
-        mainAccountEntries = self.getEntries()
-        otherAccountEntries = otherAccount.getEntries()
-        for mainEntry in mainAccountEntries:
-            for otherEntry in otherAccountEntries:
+        for mainEntry in mainEntries:
+            candidates = otherEntriesByKey.get(
+                (mainEntry.date, mainEntry.description)
+            )
+            if candidates is None:
+                continue
+            for otherEntry in candidates:
                 if (
-                    mainEntry.date == otherEntry.date
-                    and mainEntry.description == otherEntry.description
-                    and mainEntry.otherAccount.backingAccount
+                    mainEntry.otherAccount.backingAccount
                     != otherEntry.thisAccount.backingAccount
                     and otherEntry.otherAccount.backingAccount
                     != mainEntry.thisAccount.backingAccount
+                    and (
+                        since is None
+                        or not _isCovered(mainEntry, since)
+                        or not _isCovered(otherEntry, since)
+                    )
                 ):
                     foundPairs.append((mainEntry, otherEntry))
         return foundPairs
+
+    def _accountCriterion(self, byPostDate: bool) -> Any:
+        """
+        Criterion for the splits of this account, for a query selecting them
+        `byPostDate` (by a range or in the order of the post date) or not.
+        """
+        if not byPostDate:
+            return Split.account_guid == self.backingAccount.guid
+        # without statistics, SQLite always prefers the index on the account
+        # and scans its whole history. Comparing an expression instead of
+        # the column makes it use the index on post_date, so the cost
+        # depends on the number of transactions in the range or page.
+        return Split.account_guid.concat("") == self.backingAccount.guid
+
+    def _newDescriptions(
+        self,
+        otherAccount: Self,
+        since: Watermark,
+        postedFrom: datetime.date | None,
+        postedUntil: datetime.date | None,
+    ) -> list[str]:
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            session = cast(DeclarativeBase, self.backingAccount).book.session
+            flushPending(session)
+            query = (
+                session.query(Transaction.description)
+                .join(Transaction.splits)
+                .filter(
+                    Split.account_guid.in_(
+                        [
+                            self.backingAccount.guid,
+                            otherAccount.backingAccount.guid,
+                        ]
+                    ),
+                    _enteredAfter(since),
+                    *_postedBetween(postedFrom, postedUntil),
+                )
+                .distinct()
+            )
+            return [description for (description,) in query]
+
+
+class _InsertBatch:
+    """
+    New transactions in `currency` between two accounts of it, written with
+    one INSERT per table every `batchSize` transactions.
+    """
+
+    def __init__(self, session: Any, currency: Any, batchSize: int):
+        self.session = session
+        self.currency = currency
+        self.batchSize = batchSize
+        self.enterDate = datetime.datetime.now(datetime.timezone.utc).replace(
+            microsecond=0
+        )
+        self.accounts: set[Account] = set()
+        self.transactions: list[dict[str, Any]] = []
+        self.splits: list[dict[str, Any]] = []
+        self.slots: list[dict[str, Any]] = []
+
+    def add(
+        self,
+        date: datetime.date,
+        value: Decimal,
+        description: str,
+        account: Account,
+        otherAccount: Account,
+    ):
+        """Add a transaction moving `value` from `otherAccount`."""
+        for acc in (account, otherAccount):
+            if acc not in self.accounts:
+                if acc.placeholder != 0:
+                    raise GncValidationError(
+                        "Account '{}' used in the transaction is a "
+                        "placeholder".format(acc)
+                    )
+                if acc.commodity != self.currency:
+                    raise GncValidationError(
+                        "Account '{}' is not in {}".format(
+                            acc.fullname, self.currency.mnemonic
+                        )
+                    )
+                self.accounts.add(acc)
+        num = value * self.currency.fraction
+        if num != num.to_integral_value():
+            raise GncValidationError(
+                "Value {} of '{}' has more decimals than {} allows".format(
+                    value, description, self.currency.mnemonic
+                )
+            )
+
+        txGuid = uuid.uuid4().hex
+        self.transactions.append(
+            {
+                "guid": txGuid,
+                "currency_guid": self.currency.guid,
+                "num": "",
+                "post_date": date,
+                "enter_date": self.enterDate,
+                "description": description,
+            }
+        )
+        for acc, splitNum in ((account, int(num)), (otherAccount, -int(num))):
+            self.splits.append(
+                {
+                    "guid": uuid.uuid4().hex,
+                    "tx_guid": txGuid,
+                    "account_guid": acc.guid,
+                    "memo": "",
+                    "action": "",
+                    "reconcile_state": "n",
+                    "reconcile_date": None,
+                    "value_num": splitNum,
+                    "value_denom": self.currency.fraction,
+                    "quantity_num": splitNum,
+                    "quantity_denom": self.currency.fraction,
+                    "lot_guid": None,
+                }
+            )
+        # piecash keeps the post date in a slot as well
+        self.slots.append(
+            {
+                "obj_guid": txGuid,
+                "name": "date-posted",
+                "slot_type": KVP_Type.KVP_TYPE_GDATE,
+                "int64_val": 0,
+                "double_val": 0.0,
+                "numeric_val_num": 0,
+                "numeric_val_denom": 1,
+                "gdate_val": date,
+            }
+        )
+        if len(self.transactions) >= self.batchSize:
+            self.write()
+
+    def write(self):
+        """Insert the pending transactions."""
+        if not self.transactions:
+            return
+        with profiling.phase("insert"):
+            for table, rows in (
+                (Transaction.__table__, self.transactions),
+                (Split.__table__, self.splits),
+                (Slot.__table__, self.slots),
+            ):
+                _ = self.session.execute(table.insert(), rows)
+        self.transactions, self.splits, self.slots = [], [], []
+        # the session does not know about the inserted rows
+        for acc in self.accounts:
+            self.session.expire(acc, ["splits"])
+
+
+def flushPending(session: Any):
+    """
+    Write out the pending changes of `session`, if it has any. piecash
+    disables autoflush, so queries only return new entries like the
+    `Account.splits` relation would after this.
+    """
+    if session.new or session.dirty or session.deleted:
+        session.flush()
+
+
+_ACCOUNTS_KEY = "gnucsh.accounts"
+""" Key of the accounts `_loadAccounts` keeps in the `info` of a session. """
+
+
+def _loadAccounts(session: Any):
+    """
+    Load all accounts once per database transaction of `session`, and keep
+    them referenced. The full account names are built by walking up the
+    parents, which are then found in the session instead of queried
+    separately.
+    """
+    if _ACCOUNTS_KEY in session.info:
+        return
+    if not event.contains(session, "after_commit", _forgetAccounts):
+        # committing expires the accounts, load them again afterwards
+        event.listen(session, "after_commit", _forgetAccounts)
+        event.listen(session, "after_rollback", _forgetAccounts)
+    session.info[_ACCOUNTS_KEY] = session.query(Account).all()
+
+
+def _forgetAccounts(session: Any):
+    _ = session.info.pop(_ACCOUNTS_KEY, None)
+
+
+def _enteredAfter(since: Watermark) -> Any:
+    """Criterion for the transactions `since` does not cover."""
+    return or_(
+        Transaction.enter_date > since.enterDate,
+        and_(
+            Transaction.enter_date == since.enterDate,
+            Transaction.guid.notin_(since.guids),
+        ),
+    )
+
+
+def _postedBetween(
+    postedFrom: datetime.date | None, postedUntil: datetime.date | None
+) -> list[Any]:
+    """Criteria for the transactions posted in the range."""
+    criteria = []
+    if postedFrom is not None:
+        criteria.append(Transaction.post_date >= postedFrom)
+    if postedUntil is not None:
+        criteria.append(Transaction.post_date <= postedUntil)
+    return criteria
+
+
+def _isCovered(entry: Entry, since: Watermark) -> bool:
+    transaction = cast(Transaction, entry.backingSplit.transaction)
+    return since.covers(transaction.enter_date, transaction.guid)
@@ -9,28 +9,70 @@ from piecash.core.account import Account
 from piecash.core.transaction import CallableList, Split, Transaction
 from typing_extensions import override
 
+from gnucsh import profiling
+from gnucsh.export import formatEntry
+
 
 class EntryAccount:
-    description: str
-    value: str
-    account_path: str
+    """
+    One side of an `Entry`. The values derived from the backing split and
+    account are only computed when first accessed.
+    """
+
+    __slots__ = ("_split", "_backingAccount", "_value", "_account_path")
 
-    backingAccount: Account
     _split: Split
+    _backingAccount: Account | None
+    _value: str | None
+    _account_path: str | None
 
     def __init__(self, split: Split):
         self._split = split
-        self.backingAccount = cast(Account, split.account)
-
-        self.value = str(split.value)
-        self.description = self.backingAccount.description
-        self.account_path = self.backingAccount.fullname
+        self._backingAccount = None
+        self._value = None
+        self._account_path = None
+
+    @property
+    def backingSplit(self) -> Split:
+        return self._split
+
+    @property
+    def backingAccount(self) -> Account:
+        if self._backingAccount is None:
+            self._backingAccount = cast(Account, self._split.account)
+        return self._backingAccount
+
+    @property
+    def value(self) -> str:
+        if self._value is None:
+            self._value = str(self._split.value)
+        return self._value
+
+    @property
+    def description(self) -> str:
+        return self.backingAccount.description
+
+    @property
+    def account_path(self) -> str:
+        if self._account_path is None:
+            self._account_path = self.backingAccount.fullname
+        return self._account_path
 
     def setAccountPath(self, newPath: str):
         self.backingAccount.name = newPath
+        self._account_path = None
 
     def setAccount(self, acc: Account):
         self._split.account = acc
+        self.forgetAccount()
+
+    def forgetAccount(self):
+        """
+        Drop the cached account, so it is read again after the split was
+        changed in the database directly.
+        """
+        self._backingAccount = None
+        self._account_path = None
 
 
 class TransactionType:
@@ -39,46 +81,90 @@ class TransactionType:
 
 
 class Entry:
-    """A class representing a simplified entry in the Ledger."""
+    """
+    A class representing a simplified entry in the Ledger.
 
-    date: datetime.date
+    Only the date and description are read when the entry is created. Both
+    accounts of the entry, and everything derived from them, are resolved on
+    first access and cached afterwards.
+    """
 
-    value: str
-    """ How much money $$$ """
+    __slots__ = (
+        "backingSplit",
+        "date",
+        "description",
+        "_thisAccount",
+        "_otherAccount",
+        "_type",
+    )
+
+    date: datetime.date
 
     description: str
     """ The text provided with the transaction. """
 
-    account_path: str
-    """ Account to, or from which, the is being sent. """
-
-    type: int
-    """ If it's a DEPOSITE or a WITHDRAWAL. Also represented in the value being
-    positive or negative. """
-
-    thisAccount: EntryAccount
-    """
-    For withdrawls, thisAccount is the source account. For deposits,
-    thisAccount is the target of the transaction.
-    """
-
-    otherAccount: EntryAccount
-    """
-    For withdrawls, otherAccount where the money is going. For deposits,
-    otherAccount is where the money is coming from.
-    """
-
     backingSplit: Split
 
+    _thisAccount: EntryAccount | None
+    _otherAccount: EntryAccount | None
+    _type: int | None
+
     def __init__(self, split: Split):
+        self.backingSplit = split
+        transaction = cast(Transaction, split.transaction)
+
+        self.description = transaction.description
+        self.date = transaction.post_date
+
+        self._thisAccount = None
+        self._otherAccount = None
+        self._type = None
+
+    @property
+    def thisAccount(self) -> EntryAccount:
+        """
+        For withdrawls, thisAccount is the source account. For deposits,
+        thisAccount is the target of the transaction.
+        """
+        if self._thisAccount is None:
+            self._resolveAccounts()
+        return cast(EntryAccount, self._thisAccount)
+
+    @property
+    def otherAccount(self) -> EntryAccount:
+        """
+        For withdrawls, otherAccount where the money is going. For deposits,
+        otherAccount is where the money is coming from.
+        """
+        if self._otherAccount is None:
+            self._resolveAccounts()
+        return cast(EntryAccount, self._otherAccount)
+
+    @property
+    def type(self) -> int:
+        """If it's a DEPOSITE or a WITHDRAWAL. Also represented in the value
+        being positive or negative."""
+        if self._type is None:
+            self._resolveAccounts()
+        return cast(int, self._type)
+
+    @property
+    def value(self) -> str:
+        """How much money $$$"""
+        # take the positive value in the first entry
+        return self.thisAccount.value
+
+    @property
+    def account_path(self) -> str:
+        """Account to, or from which, the is being sent."""
+        # use the second account's path to describe where it whent
+        return self.otherAccount.account_path
+
+    def _resolveAccounts(self):
         with warnings.catch_warnings():
             warnings.simplefilter("ignore")
-            self.backingSplit = split
-            transaction = cast(Transaction, split.transaction)
-            account = cast(Account, split.account)
-
-            self.description = transaction.description
-            self.date = transaction.post_date
+            transaction = cast(Transaction, self.backingSplit.transaction)
+            account = cast(Account, self.backingSplit.account)
 
             # I don't think I will need it, but I don't want to have errors go
             # unnoticed
@@ -96,50 +182,32 @@ class Entry:
             # second where from it was withdrawn.
             accountA = EntryAccount(entrySplits[0])
             accountB = EntryAccount(entrySplits[1])
+            profiling.count("EntryAccount", 2)
 
             # it is more convenient to represent the transactions as having a
             # thisAccount, and an otherAccount. That way, we don't have to
             # check which is which all the time.
 
-            # if the path is the same as the first entry, this was a deposite.
-            if accountA.account_path == account.fullname:
-                self.thisAccount = accountA
-                self.otherAccount = accountB
-                self.type = TransactionType.DEPOSITE
+            # if the account is the same as the first entry, this was a
+            # deposite.
+            if accountA.backingAccount is account:
+                self._thisAccount = accountA
+                self._otherAccount = accountB
+                self._type = TransactionType.DEPOSITE
 
             else:
-                self.thisAccount = accountB
-                self.otherAccount = accountA
+                self._thisAccount = accountB
+                self._otherAccount = accountA
 
-                # the path is not the same as the first entry, we assume the
+                # the account is not the same as the first entry, we assume the
                 # second one is (as one has to be). So it was a withdrawal.
-                self.type = TransactionType.WITHDRAWAL
-
-            # take the positive value in the first entry
-            self.value = self.thisAccount.value
-
-            # use the second account's path to describe where it whent
-            self.account_path = self.otherAccount.account_path
+                self._type = TransactionType.WITHDRAWAL
 
     @override
     def __str__(self) -> str:
-        dateWidth = 11
-        amountWidth = 8
-        descriptionWidth = 135
-        formattedDate = self.date.strftime("%Y-%m-%d")
-        positiveValueIndented = (
-            (" " + self.value)
-            if not self.value.startswith("-")
-            else self.value
-        )
-        descriptionWithElipsis = (
-            (self.description[: (descriptionWidth - 4)] + "...")
-            if len(self.description) > descriptionWidth
-            else self.description
-        )
-        return "{} {} {} {}".format(
-            formattedDate.ljust(dateWidth),
-            positiveValueIndented.ljust(amountWidth),
-            descriptionWithElipsis.ljust(descriptionWidth),
+        return formatEntry(
+            self.date,
+            self.value,
+            self.description,
             self.otherAccount.account_path,
         )
@@ -0,0 +1,273 @@
+"""
+Resident mode, which keeps a book open and runs the commands of the CLI
+against it over a Unix socket.
+
+Starting the CLI, importing piecash and loading the book costs far more than
+most commands themselves. With `gnucsh BOOK --serve` running, every other
+`gnucsh BOOK ...` call only sends its options to the daemon and prints what
+comes back.
+
+Both sides exchange JSON objects, one per line. The client sends the
+options of the command. The daemon answers with any number of `output` and
+`prompt` messages, where every prompt is answered by the client, and ends
+with an `exit` message holding the exit code.
+
+This module only imports the standard library at the top, so running a
+command through the daemon stays cheap.
+"""
+
+import hashlib
+import json
+import os
+import signal
+import socket
+import socketserver
+import stat
+import sys
+import tempfile
+import traceback
+from typing import IO, TYPE_CHECKING, Any
+
+SUPPORTED = hasattr(socket, "AF_UNIX")
+""" Whether the platform has the Unix sockets the daemon listens on. """
+
+if TYPE_CHECKING or SUPPORTED:
+    _UnixStreamServer = socketserver.UnixStreamServer
+else:
+    # never instantiated, `serve` is refused without Unix sockets
+    _UnixStreamServer = socketserver.BaseServer
+
+
+def isUri(bookPath: str) -> bool:
+    """
+    Whether `bookPath` is the SQLAlchemy URI of a book (e.g. on a PostgreSQL
+    server) instead of the path of a sqlite file.
+    """
+    return "://" in bookPath
+
+
+def socketPath(bookPath: str) -> str:
+    """
+    Path of the socket a daemon serving `bookPath` listens on, in a directory
+    only the current user can access (see `socketDir`).
+    """
+    bookId = hashlib.sha1(
+        (bookPath if isUri(bookPath) else os.path.realpath(bookPath)).encode(
+            "utf8"
+        )
+    ).hexdigest()[:16]
+    return os.path.join(socketDir(), "gnucsh-{}.sock".format(bookId))
+
+
+def socketDir() -> str:
+    """
+    `$XDG_RUNTIME_DIR`, or else a directory of the current user in the temp
+    directory, created with mode 0700. Raises PermissionError if that
+    directory exists but belongs to another user or is open to others, as
+    anyone who can write to it could pose as the daemon.
+    """
+    runtimeDir = os.environ.get("XDG_RUNTIME_DIR")
+    if runtimeDir:
+        return runtimeDir
+    path = os.path.join(tempfile.gettempdir(), "gnucsh-{}".format(os.getuid()))
+    try:
+        os.mkdir(path, 0o700)
+    except FileExistsError:
+        pass
+    status = os.lstat(path)
+    if (
+        not stat.S_ISDIR(status.st_mode)
+        or status.st_uid != os.getuid()
+        or status.st_mode & 0o077
+    ):
+        raise PermissionError(
+            "'{}' is not a private directory of the current user".format(path)
+        )
+    return path
+
+
+def runRemote(bookPath: str, params: dict[str, Any]) -> int | None:
+    """
+    Run the command described by `params` (the options of `cli.runCommand`)
+    on the daemon serving `bookPath`, printing its output and answering its
+    prompts from stdin.
+
+    Returns the exit code of the command, or None if no daemon of the
+    current user serves the book.
+    """
+    if not SUPPORTED:
+        return None
+    try:
+        path = socketPath(bookPath)
+        if os.stat(path).st_uid != os.getuid():
+            return None
+    except OSError:
+        return None
+    connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        connection.connect(path)
+    except OSError:
+        connection.close()
+        return None
+
+    with connection, connection.makefile("rw", encoding="utf8") as stream:
+        _send(stream, params)
+        for line in stream:
+            message = json.loads(line)
+            if "output" in message:
+                print(message["output"], end="", flush=True)
+            elif "prompt" in message:
+                _send(stream, {"answer": input(message["prompt"])})
+            else:
+                return int(message["exit"])
+    raise ConnectionError("The gnucsh daemon closed the connection")
+
+
+def serve(bookPath: str):
+    """
+    Keep `bookPath` open and run the commands sent to `socketPath(bookPath)`
+    until interrupted or terminated. The book is opened again whenever the
+    file was changed by anything other than the daemon itself.
+
+    Changes to a book on a database server cannot be detected that way, so
+    it is opened again for every command. That still reuses the pooled
+    connection of the book, see `ledger.openLedger`.
+    """
+    server = _BookServer(bookPath)
+    _ = signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    print("Serving '{}' on {}".format(bookPath, server.server_address))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        server.closeLedger()
+        if isUri(bookPath):
+            from gnucsh.convenience_types.ledger import disposeEngines
+
+            disposeEngines()
+        os.remove(server.path)
+
+
+def _send(stream: IO[str], message: dict[str, Any]):
+    _ = stream.write(json.dumps(message) + "\n")
+    stream.flush()
+
+
+class _ClientOutput:
+    """Text stream that forwards everything written to it to the client."""
+
+    def __init__(self, stream: IO[str]):
+        self.stream = stream
+
+    def write(self, text: str) -> int:
+        if text:
+            _send(self.stream, {"output": text})
+        return len(text)
+
+    def flush(self):
+        self.stream.flush()
+
+
+class _BookServer(_UnixStreamServer):
+    # requests are handled one after the other in the serving thread, which
+    # is also the only thread touching the ledger
+    def __init__(self, bookPath: str):
+        from gnucsh.convenience_types.ledger import Ledger
+
+        self.bookPath = bookPath
+        self.ledger: Ledger | None = None
+        self.bookState: tuple[int, int] | None = None
+
+        self.path = path = socketPath(bookPath)
+        if os.path.exists(path):
+            # a daemon that is still running answers, a stale socket not
+            probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                probe.connect(path)
+                raise RuntimeError(
+                    "'{}' is already being served on {}".format(bookPath, path)
+                )
+            except ConnectionRefusedError:
+                os.remove(path)
+            finally:
+                probe.close()
+        super().__init__(path, _CommandHandler)
+
+    def getLedger(self):
+        from gnucsh.convenience_types.ledger import openLedger
+
+        if self.ledger is not None and (
+            self.bookState is None or self.bookState != self._readState()
+        ):
+            self.closeLedger()
+        if self.ledger is None:
+            self.ledger = openLedger(self.bookPath)
+            self.bookState = self._readState()
+        return self.ledger
+
+    def saveLedger(self):
+        if self.ledger is not None:
+            self.ledger.save()
+            self.bookState = self._readState()
+
+    def closeLedger(self):
+        if self.ledger is not None:
+            self.ledger.close()
+            self.ledger = None
+
+    def _readState(self) -> tuple[int, int] | None:
+        if isUri(self.bookPath):
+            return None
+        stat = os.stat(self.bookPath)
+        return stat.st_mtime_ns, stat.st_size
+
+
+class _CommandHandler(socketserver.StreamRequestHandler):
+    server: _BookServer
+
+    def handle(self):
+        import contextlib
+
+        import click
+
+        from gnucsh.cli import runCommand
+
+        stream = self.request.makefile("rw", encoding="utf8")
+        request = stream.readline()
+        if not request:
+            # connected without sending a command, e.g. to check whether the
+            # daemon is running
+            return
+        params = json.loads(request)
+
+        def ask(prompt: str) -> str:
+            _send(stream, {"prompt": prompt})
+            line = stream.readline()
+            if not line:
+                raise ConnectionResetError("The client went away")
+            return str(json.loads(line)["answer"])
+
+        exitCode = 0
+        try:
+            with contextlib.redirect_stdout(_ClientOutput(stream)):
+                try:
+                    if runCommand(self.server.getLedger(), **params, ask=ask):
+                        self.server.saveLedger()
+                except click.ClickException as e:
+                    print("Error: " + e.format_message())
+                    exitCode = e.exit_code
+                except ConnectionError:
+                    raise
+                except Exception:
+                    print(traceback.format_exc(), end="")
+                    exitCode = 1
+                    # drop whatever the failed command left in the session
+                    self.server.closeLedger()
+            _send(stream, {"exit": exitCode})
+            stream.close()
+        except ConnectionError:
+            # the client stopped reading, e.g. when piped into `head`. Treat
+            # the command as cancelled.
+            self.server.closeLedger()
@@ -0,0 +1,118 @@
+"""
+Search for duplicates between every pair of a set of accounts.
+
+Where `BaseAccount.findDuplicates` compares two accounts, this compares all
+accounts of a selection at once. The entries of all of them are indexed by
+(date, description) in a single pass over a `Snapshot`. Only the groups of
+entries sharing a key across more than one account are candidates, and
+these are verified in a process pool once there are enough of them.
+"""
+
+import concurrent.futures
+import os
+
+from gnucsh.snapshot import Snapshot
+
+PARALLEL_MIN_GROUPS = 20000
+""" Candidate groups needed before they are verified in a process pool. """
+
+CHUNK_SIZE = 5000
+""" Candidate groups sent to a worker process at once. """
+
+# row, account, other account and transaction of an entry
+_Candidate = tuple[int, int, int, int]
+
+
+def selectAccounts(snapshot: Snapshot, selection: str) -> list[int]:
+    """
+    The accounts of `selection`: an account and all its sub-accounts, or
+    all accounts of a type like BANK.
+    """
+    try:
+        return snapshot.subtree(snapshot.findAccount(selection))
+    except KeyError:
+        accounts = [
+            acc
+            for acc, (_, _, _, accountType) in enumerate(snapshot.accounts)
+            if accountType == selection.upper()
+        ]
+        if not accounts:
+            raise KeyError(
+                "Could not find account or account type '{}'".format(selection)
+            )
+        return accounts
+
+
+def scanDuplicates(
+    snapshot: Snapshot, accounts: list[int], workers: int | None = None
+) -> list[tuple[int, int]]:
+    """
+    Find the pairs of rows that `Snapshot.findDuplicates` would find for any
+    two of `accounts`. The main row of a pair is the one of the account that
+    comes first in the book.
+
+    Every transaction is part of at most one pair, so all pairs can be
+    unified together. Transactions with more than two splits are skipped.
+    Candidates are verified in `workers` processes (by default one per CPU,
+    if there are at least `PARALLEL_MIN_GROUPS`).
+    """
+    selected = set(accounts)
+    index: dict[tuple[int, str], list[_Candidate]] = {}
+    date = snapshot.column("date")
+    for account in sorted(selected):
+        for row in snapshot.rows(account):
+            other = snapshot.otherAccount(row)
+            # like the entries, only transactions of two splits are unified
+            if other < 0:
+                continue
+            index.setdefault(
+                (date[row], snapshot.description(row)), []
+            ).append((row, account, other, snapshot.transaction(row)))
+    groups = [
+        group
+        for group in index.values()
+        if len(group) > 1 and group[0][1] != group[-1][1]
+    ]
+
+    if workers is None:
+        workers = 1 if len(groups) < PARALLEL_MIN_GROUPS else os.cpu_count()
+    if workers is None or workers <= 1:
+        candidatePairs = _verify(groups)
+    else:
+        chunks: list[list[list[_Candidate]]] = []
+        for start in range(0, len(groups), CHUNK_SIZE):
+            end = start + CHUNK_SIZE
+            chunks.append(groups[start:end])
+        with concurrent.futures.ProcessPoolExecutor(workers) as executor:
+            candidatePairs = [
+                pair
+                for pairs in executor.map(_verify, chunks)
+                for pair in pairs
+            ]
+
+    foundPairs: list[tuple[int, int]] = []
+    pairedTransactions: set[int] = set()
+    for mainRow, otherRow in candidatePairs:
+        transactions = {
+            snapshot.transaction(mainRow),
+            snapshot.transaction(otherRow),
+        }
+        if pairedTransactions.isdisjoint(transactions):
+            pairedTransactions |= transactions
+            foundPairs.append((mainRow, otherRow))
+    return foundPairs
+
+
+def _verify(groups: list[list[_Candidate]]) -> list[tuple[int, int]]:
+    pairs: list[tuple[int, int]] = []
+    for group in groups:
+        # every candidate is paired with the ones after it
+        for rest, (mainRow, mainAccount, mainOther, _) in enumerate(group, 1):
+            for otherRow, otherAccount, otherOther, _ in group[rest:]:
+                if (
+                    mainAccount != otherAccount
+                    and mainOther != otherAccount
+                    and otherOther != mainAccount
+                ):
+                    pairs.append((mainRow, otherRow))
+    return pairs
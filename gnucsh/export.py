@@ -0,0 +1,72 @@
+"""
+Output of the listings.
+
+Rows are written one by one as they are produced, so a whole account can be
+exported without holding it in memory. `formatEntry` renders the lines of the
+human readable transaction listing.
+"""
+
+import csv
+import datetime
+import json
+from typing import Iterable, TextIO
+
+FORMATS = ["text", "csv", "tsv", "jsonl"]
+""" Formats accepted by `--format`. `text` is the human readable listing. """
+
+
+def writeRows(
+    out: TextIO,
+    format: str,
+    header: list[str],
+    rows: Iterable[tuple[object, ...]],
+):
+    """
+    Write `rows` to `out` as `csv`, `tsv` (both with a header line) or
+    `jsonl` (one object per row, keyed by `header`).
+    """
+    if format == "jsonl":
+        for row in rows:
+            _ = out.write(json.dumps(dict(zip(header, map(_toText, row)))))
+            _ = out.write("\n")
+        return
+
+    if format == "csv":
+        writer = csv.writer(out, lineterminator="\n")
+    elif format == "tsv":
+        writer = csv.writer(out, dialect=csv.excel_tab, lineterminator="\n")
+    else:
+        raise ValueError("Unsupported format '{}'".format(format))
+    writer.writerow(header)
+    for row in rows:
+        writer.writerow(map(_toText, row))
+
+
+def formatEntry(
+    date: datetime.date, value: str, description: str, accountPath: str
+) -> str:
+    """A line of the text listing of transactions, see `Entry.__str__`."""
+    dateWidth = 11
+    amountWidth = 8
+    descriptionWidth = 135
+    formattedDate = date.strftime("%Y-%m-%d")
+    positiveValueIndented = (
+        (" " + value) if not value.startswith("-") else value
+    )
+    descriptionWithElipsis = (
+        (description[: (descriptionWidth - 4)] + "...")
+        if len(description) > descriptionWidth
+        else description
+    )
+    return "{} {} {} {}".format(
+        formattedDate.ljust(dateWidth),
+        positiveValueIndented.ljust(amountWidth),
+        descriptionWithElipsis.ljust(descriptionWidth),
+        accountPath,
+    )
+
+
+def _toText(value: object) -> str:
+    if isinstance(value, datetime.date):
+        return value.strftime("%Y-%m-%d")
+    return str(value)
@@ -0,0 +1,156 @@
+"""
+Optional instrumentation of where the time of a command goes.
+
+Code marks its phases with `phase(name)` and counts the objects it creates
+with `count(name)`. Both do nothing until `enable()` is called, which the
+CLI does for `--profile` or `GNUCSH_PROFILE`. From then on, the SQL
+statements of all SQLAlchemy engines are counted and timed, and attributed
+to the phase running at the time.
+"""
+
+import contextlib
+import json
+import sys
+import time
+from typing import Any, Iterator, TextIO
+
+
+class Profiler:
+    phases: dict[str, dict[str, float]]
+    """ Wall time, SQL statements and SQL time per phase, by phase name. """
+
+    counts: dict[str, int]
+    """ Number of constructed objects, by kind. """
+
+    def __init__(self):
+        self.phases = {}
+        self.counts = {}
+        self._activePhases: list[str] = []
+        self._statementStart = 0.0
+        self._start = time.perf_counter()
+
+    @contextlib.contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        stats = self.phases.setdefault(
+            name, {"seconds": 0.0, "statements": 0, "sqlSeconds": 0.0}
+        )
+        self._activePhases.append(name)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            stats["seconds"] += time.perf_counter() - start
+            _ = self._activePhases.pop()
+
+    def count(self, name: str, amount: int = 1):
+        self.counts[name] = self.counts.get(name, 0) + amount
+
+    def watchSqlAlchemy(self, enable: bool = True):
+        from sqlalchemy import event
+        from sqlalchemy.engine import Engine
+        from sqlalchemy.orm import Session
+
+        change = event.listen if enable else event.remove
+        change(Engine, "before_cursor_execute", self._beforeStatement)
+        change(Engine, "after_cursor_execute", self._afterStatement)
+        change(Session, "loaded_as_persistent", self._onLoad)
+
+    def report(self) -> dict[str, Any]:
+        return {
+            "seconds": time.perf_counter() - self._start,
+            "phases": self.phases,
+            "counts": self.counts,
+            "peakRssKiB": _peakRssKiB(),
+        }
+
+    def _onLoad(self, *args: object):
+        self.count("ORM rows")
+
+    def _beforeStatement(self, *args: object):
+        self._statementStart = time.perf_counter()
+
+    def _afterStatement(self, *args: object):
+        stats = self.phases.setdefault(
+            self._activePhases[-1] if self._activePhases else "other",
+            {"seconds": 0.0, "statements": 0, "sqlSeconds": 0.0},
+        )
+        stats["statements"] += 1
+        stats["sqlSeconds"] += time.perf_counter() - self._statementStart
+
+
+_profiler: Profiler | None = None
+
+
+def enable() -> Profiler:
+    global _profiler
+    _profiler = Profiler()
+    with _profiler.phase("import"):
+        _profiler.watchSqlAlchemy()
+    return _profiler
+
+
+def disable():
+    global _profiler
+    if _profiler is not None:
+        _profiler.watchSqlAlchemy(False)
+        _profiler = None
+
+
+@contextlib.contextmanager
+def phase(name: str) -> Iterator[None]:
+    if _profiler is None:
+        yield
+    else:
+        with _profiler.phase(name):
+            yield
+
+
+def count(name: str, amount: int = 1):
+    if _profiler is not None:
+        _profiler.count(name, amount)
+
+
+def printReport(report: dict[str, Any], out: TextIO = sys.stderr):
+    """Print a report of `Profiler.report` as a table."""
+    print(
+        "{:<16} {:>9} {:>8} {:>12}".format(
+            "phase", "seconds", "sql", "sql seconds"
+        ),
+        file=out,
+    )
+    for name, stats in report["phases"].items():
+        print(
+            "{:<16} {:>9.3f} {:>8} {:>12.3f}".format(
+                name,
+                stats["seconds"],
+                stats["statements"],
+                stats["sqlSeconds"],
+            ),
+            file=out,
+        )
+    print("{:<16} {:>9.3f}".format("total", report["seconds"]), file=out)
+    for name, amount in report["counts"].items():
+        print("{:<16} {:>9}".format(name, amount), file=out)
+    if report["peakRssKiB"] is not None:
+        print(
+            "{:<16} {:>9.1f} MiB".format(
+                "peak RSS", report["peakRssKiB"] / 1024
+            ),
+            file=out,
+        )
+
+
+def _peakRssKiB() -> int | None:
+    """Peak resident memory of the process, None where it is unknown."""
+    if sys.platform == "win32":
+        return None
+    import resource
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # bytes on macOS, kilobytes elsewhere
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+
+def writeReport(report: dict[str, Any], file: str):
+    with open(file, "w") as f:
+        json.dump(report, f, indent=2)
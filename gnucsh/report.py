@@ -0,0 +1,160 @@
+"""
+Balances and period totals of the accounts, computed with NumPy.
+
+The dates, quantities and accounts of all splits are taken from a `Snapshot`
+as arrays without copying them. The quantity of a split is its amount in the
+commodity of its account, so the balances match GnuCash's even for accounts
+in another currency than their transactions. Quantities are summed as
+integers in the smallest unit shared by all splits (cents for most books), so
+the totals are exact. Sub-accounts are rolled up into their parents one level
+of the account tree at a time, instead of one account at a time, and only
+into parents of the same commodity.
+"""
+
+import datetime
+from decimal import Decimal
+from typing import Iterator
+
+import numpy as np
+import numpy.typing as npt
+
+from gnucsh.snapshot import Snapshot
+
+PERIODS = {"month": "datetime64[M]", "year": "datetime64[Y]"}
+""" Periods `periodTotals` can group by, and their NumPy date units. """
+
+_EPOCH_ORDINAL = datetime.date(1970, 1, 1).toordinal()
+
+
+class SplitArrays:
+    """The splits of a snapshot as NumPy arrays."""
+
+    def __init__(self, snapshot: Snapshot):
+        self.snapshot = snapshot
+        accountCount = len(snapshot.accounts)
+        self.accountIds = np.repeat(
+            np.arange(accountCount),
+            [len(snapshot.rows(acc)) for acc in range(accountCount)],
+        )
+        self.dates = (
+            np.frombuffer(snapshot.column("date"), dtype=np.int32)
+            - _EPOCH_ORDINAL
+        ).astype("datetime64[D]")
+
+        num = np.frombuffer(snapshot.column("quantityNum"), dtype=np.int64)
+        denom = np.frombuffer(snapshot.column("quantityDenom"), dtype=np.int64)
+        self.scale = int(np.lcm.reduce(np.unique(denom))) if len(denom) else 1
+        self.amounts = num * (self.scale // denom)
+        """ Quantity of every split, in units of 1/`scale`. """
+
+        self.parents = np.array(snapshot.parents, dtype=np.int64)
+        commodityNumbers: dict[str, int] = {}
+        commodityIds = np.array(
+            [
+                commodityNumbers.setdefault(guid, len(commodityNumbers))
+                for guid in snapshot.commodities
+            ],
+            dtype=np.int64,
+        )
+        hasParent = self.parents >= 0
+        self.rolledUp = np.zeros(accountCount, dtype=bool)
+        """ Whether an account is in the commodity of its parent. """
+        self.rolledUp[hasParent] = (
+            commodityIds[hasParent] == commodityIds[self.parents[hasParent]]
+        )
+        self.depths = np.zeros(accountCount, dtype=np.int64)
+        for acc in range(accountCount):
+            parent = snapshot.parents[acc]
+            while parent >= 0:
+                self.depths[acc] += 1
+                parent = snapshot.parents[parent]
+
+    def rollUp(self, totals: npt.NDArray[np.int64]) -> npt.NDArray[np.int64]:
+        """
+        Add the totals (one row per account) of every account to all of its
+        parents, up to the first one in another commodity.
+        """
+        totals = totals.copy()
+        for depth in range(int(self.depths.max(initial=0)), 0, -1):
+            children = np.flatnonzero((self.depths == depth) & self.rolledUp)
+            np.add.at(totals, self.parents[children], totals[children])
+        return totals
+
+    def formatAmount(self, amount: int) -> str:
+        digits = len(str(self.scale)) - 1
+        if self.scale == 10**digits:
+            return str(Decimal(int(amount)).scaleb(-digits))
+        return str(Decimal(int(amount)) / self.scale)
+
+
+def balances(
+    arrays: SplitArrays,
+) -> tuple[npt.NDArray[np.int64], npt.NDArray[np.int64]]:
+    """
+    The balance of every account by itself, and including all of its
+    sub-accounts.
+    """
+    own = np.zeros(len(arrays.parents), dtype=np.int64)
+    np.add.at(own, arrays.accountIds, arrays.amounts)
+    return own, arrays.rollUp(own)
+
+
+def periodTotals(
+    arrays: SplitArrays, period: str
+) -> tuple[
+    npt.NDArray[np.datetime64], npt.NDArray[np.int64], npt.NDArray[np.int64]
+]:
+    """
+    The periods containing splits, and per account (rows) and period
+    (columns) the total of the splits in the period and the balance at its
+    end, both including all sub-accounts.
+    """
+    # numbering the periods from the first one avoids sorting all splits
+    # like np.unique would
+    periodNumbers = arrays.dates.astype(PERIODS[period]).astype(np.int64)
+    first = int(periodNumbers.min(initial=0))
+    periodIds = periodNumbers - first
+    periodCount = int(periodIds.max(initial=-1)) + 1
+    totals = np.zeros(len(arrays.parents) * periodCount, dtype=np.int64)
+    np.add.at(
+        totals, arrays.accountIds * periodCount + periodIds, arrays.amounts
+    )
+    totals = arrays.rollUp(totals.reshape(len(arrays.parents), periodCount))
+
+    # only keep the periods containing splits
+    used = np.flatnonzero(np.bincount(periodIds, minlength=periodCount))
+    periods = (used + first).astype(PERIODS[period])
+    totals = totals[:, used]
+    return periods, totals, np.cumsum(totals, axis=1)
+
+
+def balanceRows(
+    arrays: SplitArrays, accounts: list[int]
+) -> Iterator[tuple[str, str, str]]:
+    """Account, balance and balance with sub-accounts of `accounts`."""
+    own, total = balances(arrays)
+    for acc in accounts:
+        yield (
+            arrays.snapshot.accounts[acc][1],
+            arrays.formatAmount(own[acc]),
+            arrays.formatAmount(total[acc]),
+        )
+
+
+def periodRows(
+    arrays: SplitArrays, accounts: list[int], period: str
+) -> Iterator[tuple[str, str, str, str]]:
+    """
+    Period, account, total and end balance of `accounts`, for every period
+    they changed in.
+    """
+    periods, totals, endBalances = periodTotals(arrays, period)
+    for periodId, periodName in enumerate(periods.astype(str)):
+        for acc in accounts:
+            if totals[acc, periodId] != 0:
+                yield (
+                    periodName,
+                    arrays.snapshot.accounts[acc][1],
+                    arrays.formatAmount(totals[acc, periodId]),
+                    arrays.formatAmount(endBalances[acc, periodId]),
+                )
@@ -0,0 +1,132 @@
+"""
+Rules assigning transfer accounts to entries by their description.
+
+A rules file is a YAML list of rules, tried in order:
+
+    - match: "^ALBERT HEIJN"
+      account: Expenses:Groceries
+    - match: Pharmacy
+      account: Expenses:Health
+
+Rules whose pattern is a plain string (most of them, in practice) are
+combined into one Aho-Corasick automaton, which finds all of them in a
+single pass over a description. Only the regex rules ordered before the
+first plain string match still have to be searched one by one.
+"""
+
+import re
+from typing import Any
+
+_PLAIN = re.compile(r"[^.^$*+?{}\[\]\\|()]*")
+""" Patterns matching only themselves. """
+
+
+class Rules:
+    """Ordered (pattern, account name) rules, the first match wins."""
+
+    patterns: list[str]
+    accounts: list[str]
+
+    def __init__(self, rules: list[tuple[str, str]]):
+        self.patterns = [pattern for pattern, _ in rules]
+        self.accounts = [account for _, account in rules]
+        self._literals = _LiteralMatcher(
+            [
+                (i, pattern)
+                for i, pattern in enumerate(self.patterns)
+                if _PLAIN.fullmatch(pattern)
+            ]
+        )
+        self._regexes = [
+            (i, re.compile(pattern))
+            for i, pattern in enumerate(self.patterns)
+            if not _PLAIN.fullmatch(pattern)
+        ]
+
+    def classify(self, description: str) -> int | None:
+        """Index of the first rule matching `description`, if any."""
+        first = self._literals.firstMatch(description)
+        for i, regex in self._regexes:
+            if first is not None and i > first:
+                break
+            if regex.search(description):
+                return i
+        return first
+
+
+class _LiteralMatcher:
+    """Aho-Corasick automaton for the first of many plain strings."""
+
+    def __init__(self, literals: list[tuple[int, str]]):
+        # per state: its transitions, its fail state, and the first rule of
+        # all strings ending in it or in any of its fail states
+        self._goto: list[dict[str, int]] = [{}]
+        self._fail: list[int] = [0]
+        self._first: list[int | None] = [None]
+        for index, literal in literals:
+            state = 0
+            for char in literal:
+                if char not in self._goto[state]:
+                    self._goto[state][char] = len(self._goto)
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._first.append(None)
+                state = self._goto[state][char]
+            self._first[state] = _earliest(self._first[state], index)
+
+        # breadth first, so the fail state of a state is always done before
+        queue = list(self._goto[0].values())
+        for state in queue:
+            for char, nextState in self._goto[state].items():
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[nextState] = self._goto[fail].get(char, 0)
+                self._first[nextState] = _earliest(
+                    self._first[nextState], self._first[self._fail[nextState]]
+                )
+                queue.append(nextState)
+
+    def firstMatch(self, text: str) -> int | None:
+        """First rule of the strings contained in `text`, if any."""
+        goto, fail, first = self._goto, self._fail, self._first
+        found = first[0]
+        state = 0
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if first[state] is not None:
+                found = _earliest(found, first[state])
+        return found
+
+
+def _earliest(a: int | None, b: int | None) -> int | None:
+    if a is None:
+        return b
+    if b is None:
+        return a
+    return min(a, b)
+
+
+def loadRules(file: str) -> Rules:
+    import yaml
+
+    with open(file) as f:
+        content: Any = yaml.safe_load(f)
+    if not isinstance(content, list):
+        raise ValueError("Rules file '{}' is not a list of rules".format(file))
+    rules: list[tuple[str, str]] = []
+    for i, rule in enumerate(content):
+        if (
+            not isinstance(rule, dict)
+            or not isinstance(rule.get("match"), str)
+            or not isinstance(rule.get("account"), str)
+        ):
+            raise ValueError(
+                "Rule {} of '{}' needs a 'match' and an 'account'".format(
+                    i + 1, file
+                )
+            )
+        rules.append((rule["match"], rule["account"]))
+    return Rules(rules)
@@ -0,0 +1,467 @@
+"""
+Columnar snapshot of a book, cached in a file next to it.
+
+The snapshot holds what the listings, the duplicate search and the reports
+need: the accounts and their commodities, and for every split its date,
+value, quantity, description, transfer account and guid. It is built with a
+single pass over the sqlite tables and stored as typed columns, which are
+memory mapped when read again. Commands answered from it neither import
+piecash nor touch the ORM.
+
+The cache is keyed by the modification time and size of the book (and of
+its write-ahead log, if any) and the change counter in the sqlite header, so
+it is rebuilt after anything, gnucsh or GnuCash, writes to the book.
+"""
+
+import array
+import bisect
+import datetime
+import json
+import mmap
+import os
+import re
+import sqlite3
+import struct
+import sys
+import tempfile
+from decimal import Decimal
+from typing import Any, Iterator
+
+MAGIC = b"GNUCSHS4"
+
+SUFFIX = ".gnucsh-snapshot"
+""" Appended to the path of the book to get the path of its snapshot. """
+
+COLUMNS = {
+    "transaction": "i",
+    "other": "i",
+    "date": "i",
+    "num": "q",
+    "denom": "q",
+    "quantityNum": "q",
+    "quantityDenom": "q",
+    "descStart": "q",
+    "descEnd": "q",
+}
+""" Typecodes of the columns holding one value per split. """
+
+GUID_LENGTH = 32
+
+_DATE_TIME = re.compile(
+    r"(\d{4})-?(\d{2})-?(\d{2}) ?(\d{2}):?(\d{2}):?(\d{2})"
+)
+""" Dates and times as piecash reads them, with or without separators. """
+
+
+def bookKey(bookPath: str) -> list[int]:
+    """Values that change whenever the book is written to."""
+    stat = os.stat(bookPath)
+    with open(bookPath, "rb") as f:
+        header = f.read(28)
+    changeCounter = struct.unpack(">I", header[24:28])[0]
+    key = [stat.st_mtime_ns, stat.st_size, changeCounter]
+    if os.path.exists(bookPath + "-wal"):
+        walStat = os.stat(bookPath + "-wal")
+        key += [walStat.st_mtime_ns, walStat.st_size]
+    return key
+
+
+class Snapshot:
+    """Read access to the columns of a snapshot."""
+
+    accounts: list[tuple[str, str, str, str]]
+    """ Guid, full name, name and type of every account but the roots. """
+
+    parents: list[int]
+    """ Index of the parent of every account, -1 for top level accounts. """
+
+    commodities: list[str]
+    """ Guid of the commodity of every account. """
+
+    def __init__(self, buffer: Any):
+        self._buffer = buffer
+        view = memoryview(buffer)
+        if bytes(view[: len(MAGIC)]) != MAGIC:
+            raise ValueError("Not a gnucsh snapshot")
+        headerLength = struct.unpack_from("<I", view, len(MAGIC))[0]
+        start = len(MAGIC) + 4
+        end = start + headerLength
+        header = json.loads(bytes(view[start:end]))
+
+        self.key: list[int] = header["key"]
+        self.accounts = [tuple(acc) for acc in header["accounts"]]
+        self.parents = header["parents"]
+        self.commodities = header["commodities"]
+        self._ranges: list[list[int]] = header["ranges"]
+        self._rowStarts = [start for start, _ in self._ranges]
+        self._columns: dict[str, memoryview] = {}
+        for name, (offset, typecode, length) in header["columns"].items():
+            end = offset + length
+            self._columns[name] = view[offset:end].cast(typecode)
+
+    @staticmethod
+    def open(bookPath: str, cache: bool = True) -> "Snapshot":
+        """
+        Return the snapshot of `bookPath`, from the cache next to it if that
+        is still up to date, otherwise newly built and cached. Without
+        `cache`, it is always built and only kept in memory.
+        """
+        key = bookKey(bookPath)
+        if not cache:
+            return Snapshot(build(bookPath, key))
+        cachePath = bookPath + SUFFIX
+        try:
+            with open(cachePath, "rb") as f:
+                snapshot = Snapshot(
+                    mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                )
+            if snapshot.key == key:
+                return snapshot
+        except (OSError, ValueError):
+            pass
+
+        data = build(bookPath, key)
+        try:
+            fd, tmpPath = tempfile.mkstemp(
+                dir=os.path.dirname(os.path.abspath(bookPath))
+            )
+            with os.fdopen(fd, "wb") as f:
+                _ = f.write(data)
+            os.replace(tmpPath, cachePath)
+        except OSError:
+            # not being able to cache it only makes the next call slower
+            pass
+        return Snapshot(data)
+
+    def findAccount(self, targetName: str) -> int:
+        """Index of the account, looked up like `Ledger.findAccountByName`."""
+        field = 1 if ":" in targetName else 2
+        for i, acc in enumerate(self.accounts):
+            if acc[field] == targetName:
+                return i
+        raise KeyError("Could not find account '{}'".format(targetName))
+
+    def subtree(self, account: int) -> list[int]:
+        """`account` and all its sub-accounts, in the order of the book."""
+        fullname = self.accounts[account][1]
+        return [
+            acc
+            for acc, (_, name, _, _) in enumerate(self.accounts)
+            if name == fullname or name.startswith(fullname + ":")
+        ]
+
+    def account(self, row: int) -> int:
+        """Index of the account `row` belongs to."""
+        return bisect.bisect_right(self._rowStarts, row) - 1
+
+    def rows(self, account: int) -> range:
+        """The rows of all splits of `account`, in the order of the book."""
+        return range(*self._ranges[account])
+
+    def rowsPosted(
+        self,
+        account: int,
+        postedFrom: datetime.date | None,
+        postedUntil: datetime.date | None,
+    ) -> Iterator[int]:
+        """The `rows` of `account` posted in the range, both days included."""
+        if postedFrom is None and postedUntil is None:
+            yield from self.rows(account)
+            return
+        first = postedFrom.toordinal() if postedFrom is not None else 0
+        last = (
+            postedUntil.toordinal() if postedUntil is not None else sys.maxsize
+        )
+        date = self._columns["date"]
+        for row in self.rows(account):
+            if first <= date[row] <= last:
+                yield row
+
+    def column(self, name: str) -> memoryview:
+        """
+        The typed values of column `name` (one of `COLUMNS`) of all rows.
+        """
+        return self._columns[name]
+
+    def description(self, row: int) -> str:
+        start = self._columns["descStart"][row]
+        end = self._columns["descEnd"][row]
+        return bytes(self._columns["descriptions"][start:end]).decode("utf8")
+
+    def date(self, row: int) -> datetime.date:
+        return datetime.date.fromordinal(self._columns["date"][row])
+
+    def value(self, row: int) -> str:
+        """The value like `str(Split.value)`."""
+        return str(
+            Decimal(self._columns["num"][row]) / self._columns["denom"][row]
+        )
+
+    def transaction(self, row: int) -> int:
+        """Number of the transaction of `row`, shared by all its splits."""
+        return self._columns["transaction"][row]
+
+    def otherAccount(self, row: int) -> int:
+        """
+        Index of the other account of the transaction, or -1 if the
+        transaction does not have exactly two splits.
+        """
+        return self._columns["other"][row]
+
+    def splitGuid(self, row: int) -> str:
+        start = row * GUID_LENGTH
+        end = start + GUID_LENGTH
+        return bytes(self._columns["guids"][start:end]).decode("ascii")
+
+    def entryRow(self, row: int) -> tuple[datetime.date, str, str, str]:
+        """The date, value, description and transfer account path of `row`."""
+        other = self.otherAccount(row)
+        if other < 0:
+            raise ValueError(
+                "Expected only 2 accounts. Please implement missing"
+                + " logic. Problematic entry:\n {}  {}".format(
+                    self.date(row), self.description(row)
+                )
+            )
+        return (
+            self.date(row),
+            self.value(row),
+            self.description(row),
+            self.accounts[other][1],
+        )
+
+    def iterEntryRows(
+        self,
+        account: int,
+        matcher: str | None,
+        postedFrom: datetime.date | None = None,
+        postedUntil: datetime.date | None = None,
+    ) -> Iterator[tuple[datetime.date, str, str, str]]:
+        """
+        The `entryRow` of every split of `account` posted in the range whose
+        description matches `matcher`.
+        """
+        pattern = re.compile(matcher) if matcher is not None else None
+        for row in self.rowsPosted(account, postedFrom, postedUntil):
+            if pattern is None or pattern.search(self.description(row)):
+                yield self.entryRow(row)
+
+    def findDuplicates(
+        self,
+        mainAccount: int,
+        otherAccount: int,
+        postedFrom: datetime.date | None = None,
+        postedUntil: datetime.date | None = None,
+    ) -> list[tuple[int, int]]:
+        """
+        Rows of the pairs `BaseAccount.findDuplicates` would return for the
+        two accounts.
+        """
+        otherRowsByKey: dict[tuple[int, str], list[int]] = {}
+        for row in self.rowsPosted(otherAccount, postedFrom, postedUntil):
+            otherRowsByKey.setdefault(
+                (self._columns["date"][row], self.description(row)), []
+            ).append(row)
+
+        foundPairs: list[tuple[int, int]] = []
+        for mainRow in self.rowsPosted(mainAccount, postedFrom, postedUntil):
+            candidates = otherRowsByKey.get(
+                (self._columns["date"][mainRow], self.description(mainRow))
+            )
+            if candidates is None:
+                continue
+            for otherRow in candidates:
+                if (
+                    self.otherAccount(mainRow) != otherAccount
+                    and self.otherAccount(otherRow) != mainAccount
+                ):
+                    foundPairs.append((mainRow, otherRow))
+        return foundPairs
+
+
+def build(bookPath: str, key: list[int]) -> bytes:
+    """Read the book at `bookPath` and return the snapshot as bytes."""
+    connection = sqlite3.connect(
+        "file:{}?mode=ro".format(
+            os.path.abspath(bookPath).replace("?", "%3f").replace("#", "%23")
+        ),
+        uri=True,
+    )
+    try:
+        allAccounts = connection.execute(
+            "SELECT guid, name, account_type, parent_guid, commodity_guid"
+            + " FROM accounts ORDER BY rowid"
+        ).fetchall()
+        splits = connection.execute(
+            "SELECT s.guid, s.tx_guid, s.account_guid, s.value_num,"
+            + " s.value_denom, s.quantity_num, s.quantity_denom,"
+            + " t.post_date, t.description FROM splits s"
+            + " JOIN transactions t ON t.guid = s.tx_guid ORDER BY s.rowid"
+        ).fetchall()
+    finally:
+        connection.close()
+
+    # the roots are not listed, but needed to build the full names
+    accountRows = [row for row in allAccounts if row[3] is not None]
+    accountIndex = {row[0]: i for i, row in enumerate(accountRows)}
+    fullnames = _fullnames(allAccounts)
+    accounts = [
+        [guid, fullnames[guid], name, accountType]
+        for guid, name, accountType, *_ in accountRows
+    ]
+    commodities = [row[4] for row in accountRows]
+
+    parents = [accountIndex.get(row[3], -1) for row in accountRows]
+
+    accountsByTransaction: dict[str, list[int]] = {}
+    for _, txGuid, accountGuid, *_ in splits:
+        accountsByTransaction.setdefault(txGuid, []).append(
+            accountIndex.get(accountGuid, -1)
+        )
+
+    transactionIds = {tx: i for i, tx in enumerate(accountsByTransaction)}
+
+    columns = {name: array.array(code) for name, code in COLUMNS.items()}
+    guids = bytearray()
+    descriptions = bytearray()
+    descriptionRanges: dict[str, tuple[int, int]] = {}
+    ranges: list[list[int]] = []
+    # books have far fewer distinct dates than splits
+    ordinals: dict[str, int] = {}
+    rowsByAccount: list[list[tuple[Any, ...]]] = [[] for _ in accountRows]
+    for split in splits:
+        account = accountIndex.get(split[2])
+        if account is not None:
+            rowsByAccount[account].append(split)
+    for account, accountSplits in enumerate(rowsByAccount):
+        start = len(columns["date"])
+        for (
+            guid,
+            txGuid,
+            _,
+            num,
+            denom,
+            quantityNum,
+            quantityDenom,
+            postDate,
+            description,
+        ) in accountSplits:
+            siblings = accountsByTransaction[txGuid]
+            if len(siblings) == 2:
+                # the first split of this account is this one, the other
+                # split is the one that remains
+                other = siblings[1] if siblings[0] == account else siblings[0]
+            else:
+                other = -1
+            if txGuid not in descriptionRanges:
+                encoded = (description or "").encode("utf8")
+                descriptionRanges[txGuid] = (
+                    len(descriptions),
+                    len(descriptions) + len(encoded),
+                )
+                descriptions += encoded
+            descStart, descEnd = descriptionRanges[txGuid]
+
+            columns["transaction"].append(transactionIds[txGuid])
+            columns["other"].append(other)
+            if postDate not in ordinals:
+                ordinals[postDate] = _postDate(postDate).toordinal()
+            columns["date"].append(ordinals[postDate])
+            columns["num"].append(num)
+            columns["denom"].append(denom)
+            columns["quantityNum"].append(quantityNum)
+            columns["quantityDenom"].append(quantityDenom)
+            columns["descStart"].append(descStart)
+            columns["descEnd"].append(descEnd)
+            guids += guid.encode("ascii")
+        ranges.append([start, len(columns["date"])])
+
+    blobs: dict[str, tuple[str, bytes]] = {
+        name: (code, columns[name].tobytes()) for name, code in COLUMNS.items()
+    }
+    blobs["guids"] = ("B", bytes(guids))
+    blobs["descriptions"] = ("B", bytes(descriptions))
+    return _pack(
+        {
+            "key": key,
+            "accounts": accounts,
+            "parents": parents,
+            "commodities": commodities,
+            "ranges": ranges,
+        },
+        blobs,
+    )
+
+
+def _pack(header: dict[str, Any], blobs: dict[str, tuple[str, bytes]]):
+    # the offsets depend on the header length, which depends on the offsets.
+    # Reserve enough room for the header first, then fill in the offsets.
+    header["columns"] = {
+        name: [0, code, len(data)] for name, (code, data) in blobs.items()
+    }
+    headerLength = len(json.dumps(header)) + 32 * len(blobs)
+    offset = _align(len(MAGIC) + 4 + headerLength)
+    layout: list[tuple[int, bytes]] = []
+    for name, (code, data) in blobs.items():
+        header["columns"][name] = [offset, code, len(data)]
+        layout.append((offset, data))
+        offset = _align(offset + len(data))
+
+    encodedHeader = json.dumps(header).encode("utf8")
+    assert len(encodedHeader) <= headerLength
+    out = bytearray(offset)
+    out[: len(MAGIC)] = MAGIC
+    struct.pack_into("<I", out, len(MAGIC), len(encodedHeader))
+    headerStart = len(MAGIC) + 4
+    headerEnd = headerStart + len(encodedHeader)
+    out[headerStart:headerEnd] = encodedHeader
+    for start, data in layout:
+        end = start + len(data)
+        out[start:end] = data
+    return bytes(out)
+
+
+def _align(offset: int) -> int:
+    return (offset + 7) // 8 * 8
+
+
+def _fullnames(allAccounts: list[tuple[Any, ...]]) -> dict[str, str]:
+    byGuid = {row[0]: row for row in allAccounts}
+    fullnames: dict[str, str] = {}
+
+    def fullname(guid: str) -> str:
+        if guid not in fullnames:
+            _, name, _, parentGuid, _ = byGuid[guid]
+            if parentGuid is None:
+                fullnames[guid] = ""
+            else:
+                parentName = fullname(parentGuid)
+                fullnames[guid] = (
+                    "{}:{}".format(parentName, name) if parentName else name
+                )
+        return fullnames[guid]
+
+    for row in allAccounts:
+        _ = fullname(row[0])
+    return fullnames
+
+
+def _postDate(value: str) -> datetime.date:
+    match = _DATE_TIME.match(value)
+    if match is None:
+        raise ValueError("Could not parse the post date '{}'".format(value))
+    year, month, day, hour, minute, second = map(int, match.groups())
+    # stored in UTC, piecash reads it as a date in the local time zone
+    return (
+        datetime.datetime(
+            year,
+            month,
+            day,
+            hour,
+            minute,
+            second,
+            tzinfo=datetime.timezone.utc,
+        )
+        .astimezone()
+        .date()
+    )
@@ -0,0 +1,225 @@
+"""
+Readers for bank statements, yielding their transactions one at a time.
+
+The format is taken from the extension of the file:
+
+- `.csv` needs a header row naming a date, an amount (or a debit and a
+  credit) and a description column, see `CSV_COLUMNS`.
+- `.ofx` and `.qfx` are read as SGML or XML, every STMTTRN is a row.
+- `.qif` is read record by record, with dates in the US order.
+
+Dates of CSV files are parsed with the first of `DATE_FORMATS` that fits all
+dates of the file, unless a format is given. The file is rejected if another
+format fitting all of them reads them differently.
+"""
+
+import csv
+import datetime
+import functools
+import html
+import os
+import re
+from decimal import Decimal, InvalidOperation
+from typing import Callable, Iterator, TextIO
+
+# date, value and description of a transaction
+StatementRow = tuple[datetime.date, Decimal, str]
+
+CSV_COLUMNS = {
+    "date": ["date", "booking date", "transaction date", "posting date"],
+    "amount": ["amount", "value"],
+    "debit": ["debit", "withdrawal"],
+    "credit": ["credit", "deposit"],
+    "description": ["description", "payee", "name", "memo", "details"],
+}
+""" Accepted header names (in lowercase) of the columns of a CSV file. """
+
+DATE_FORMATS = ("%Y-%m-%d", "%d.%m.%Y", "%d/%m/%Y", "%m/%d/%Y", "%Y%m%d")
+""" Date formats of CSV files, tried in order. """
+
+QIF_DATE_FORMATS = ("%m/%d/%Y", "%m/%d/%y", "%Y-%m-%d", "%d.%m.%Y")
+""" Date formats of QIF files, tried in order. """
+
+_OFX_TAG = re.compile(r"<(/?)([A-Za-z0-9.]+)>([^<]*)")
+
+
+def readStatement(
+    file: str, dateFormat: str | None = None
+) -> Iterator[StatementRow]:
+    """
+    Stream the rows of the statement at `file`. The dates of a CSV file are
+    read with `dateFormat`, if given.
+    """
+    extension = os.path.splitext(file)[1].lower()
+    reader = READERS.get(extension)
+    if reader is None:
+        raise ValueError(
+            "Unknown statement format '{}', expected one of {}".format(
+                extension, ", ".join(READERS)
+            )
+        )
+    with open(file, newline="", encoding="utf-8-sig", errors="replace") as f:
+        if reader is readCsv:
+            yield from readCsv(f, dateFormat)
+        else:
+            yield from reader(f)
+
+
+def readCsv(
+    lines: TextIO, dateFormat: str | None = None
+) -> Iterator[StatementRow]:
+    header = lines.readline()
+    start = lines.tell()
+    dialect = csv.Sniffer().sniff(header, delimiters=",;\t")
+    names = [
+        name.strip().lower() for name in next(csv.reader([header], dialect))
+    ]
+    columns = {
+        column: next((names.index(n) for n in accepted if n in names), None)
+        for column, accepted in CSV_COLUMNS.items()
+    }
+    date, description = columns["date"], columns["description"]
+    amount, debit, credit = (
+        columns["amount"],
+        columns["debit"],
+        columns["credit"],
+    )
+    if (
+        date is None
+        or description is None
+        or (amount is None and (debit is None or credit is None))
+    ):
+        raise ValueError(
+            "The CSV header needs a date, an amount (or a debit and a credit)"
+            + " and a description column"
+        )
+
+    if dateFormat is None:
+        # a first pass over the dates, the rows are still streamed after it
+        dateFormat = _dateFormat(
+            {
+                row[date].strip()
+                for row in csv.reader(lines, dialect)
+                if any(row)
+            }
+        )
+        _ = lines.seek(start)
+    for row in csv.reader(lines, dialect):
+        if not any(row):
+            continue
+        if amount is not None:
+            value = _parseAmount(row[amount])
+        else:
+            assert debit is not None and credit is not None
+            value = (
+                _parseAmount(row[credit] or "0")
+                - _parseAmount(row[debit] or "0").copy_abs()
+            )
+        yield (
+            _parseDate(row[date], (dateFormat,)),
+            value,
+            row[description].strip(),
+        )
+
+
+def readOfx(lines: TextIO) -> Iterator[StatementRow]:
+    transaction: dict[str, str] | None = None
+    for line in lines:
+        for closing, tag, text in _OFX_TAG.findall(line):
+            tag = tag.upper()
+            if tag == "STMTTRN":
+                if not closing:
+                    transaction = {}
+                elif transaction is not None:
+                    yield (
+                        _parseDate(transaction["DTPOSTED"][:8], ("%Y%m%d",)),
+                        _parseAmount(transaction["TRNAMT"]),
+                        transaction.get("NAME") or transaction.get("MEMO", ""),
+                    )
+                    transaction = None
+            elif transaction is not None and not closing:
+                transaction[tag] = html.unescape(text.strip())
+
+
+def readQif(lines: TextIO) -> Iterator[StatementRow]:
+    record: dict[str, str] = {}
+    for line in lines:
+        code, text = line[:1], line[1:].strip()
+        if code == "^":
+            if "D" in record:
+                yield (
+                    _parseDate(
+                        record["D"].replace("'", "/").replace(" ", ""),
+                        QIF_DATE_FORMATS,
+                    ),
+                    _parseAmount(record.get("T") or record.get("U", "0")),
+                    record.get("P") or record.get("M", ""),
+                )
+            record = {}
+        elif code in ("D", "T", "U", "P", "M"):
+            record[code] = text
+
+
+READERS: dict[str, Callable[[TextIO], Iterator[StatementRow]]] = {
+    ".csv": readCsv,
+    ".ofx": readOfx,
+    ".qfx": readOfx,
+    ".qif": readQif,
+}
+""" Reader of every supported file extension. """
+
+
+# statements repeat the same few dates, strptime is slow
+@functools.lru_cache(maxsize=4096)
+def _parseDate(text: str, formats: tuple[str, ...]) -> datetime.date:
+    for format in formats:
+        try:
+            return datetime.datetime.strptime(text.strip(), format).date()
+        except ValueError:
+            pass
+    raise ValueError("Could not parse the date '{}'".format(text))
+
+
+def _dateFormat(dates: set[str]) -> str:
+    """The first of `DATE_FORMATS` reading all `dates` unambiguously."""
+    fitting: list[tuple[str, dict[str, datetime.date]]] = []
+    for format in DATE_FORMATS:
+        try:
+            readings = {date: _parseDate(date, (format,)) for date in dates}
+        except ValueError:
+            continue
+        for other, otherReadings in fitting:
+            if otherReadings != readings:
+                raise ValueError(
+                    "The dates fit both '{}' and '{}',".format(other, format)
+                    + " pass the format of the statement"
+                )
+        fitting.append((format, readings))
+    if not fitting:
+        raise ValueError(
+            "No date format fits all dates of the statement, expected one"
+            + " of {}".format(", ".join(DATE_FORMATS))
+        )
+    return fitting[0][0]
+
+
+def _parseAmount(text: str) -> Decimal:
+    amount = re.sub(r"[^0-9,.()+-]", "", text)
+    negative = amount.startswith("(") and amount.endswith(")")
+    amount = amount.strip("()")
+    # the last separator is the decimal one, if it is followed by at most
+    # two digits or both are used. Otherwise all separators group thousands.
+    comma, dot = amount.rfind(","), amount.rfind(".")
+    last = max(comma, dot)
+    if last >= 0 and (min(comma, dot) >= 0 or len(amount) - last <= 3):
+        decimals = last + 1
+        amount = "{}.{}".format(
+            amount[:last].replace(",", "").replace(".", ""), amount[decimals:]
+        )
+    else:
+        amount = amount.replace(",", "").replace(".", "")
+    try:
+        value = Decimal(amount)
+    except InvalidOperation:
+        raise ValueError("Could not parse the amount '{}'".format(text))
+    return -value if negative else value
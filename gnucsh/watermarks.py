@@ -0,0 +1,68 @@
+"""
+Watermarks of the transactions earlier runs of a command have processed.
+
+With `--incremental`, a command only processes the transactions entered
+after the watermark of its last run, and then moves the watermark. They are
+kept per book and per command (the operation with its accounts and filter)
+in a JSON file next to the book.
+"""
+
+import datetime
+import json
+import os
+import tempfile
+from typing import Any, Sequence
+
+SUFFIX = ".gnucsh-state"
+""" Appended to the path of the book to get the path of its watermarks. """
+
+
+class Watermark:
+    """
+    Marks all transactions entered before `enterDate`, and those entered at
+    it whose guid is in `guids`.
+    """
+
+    enterDate: datetime.datetime
+    guids: list[str]
+
+    def __init__(self, enterDate: datetime.datetime, guids: list[str]):
+        self.enterDate = enterDate
+        self.guids = guids
+
+    def covers(self, enterDate: datetime.datetime, guid: str) -> bool:
+        """Whether the transaction was already processed."""
+        return enterDate < self.enterDate or (
+            enterDate == self.enterDate and guid in self.guids
+        )
+
+
+def load(bookPath: str, operation: Sequence[str | None]) -> Watermark | None:
+    """The watermark of `operation`, or None if it never completed."""
+    stored = _loadAll(bookPath).get(json.dumps(operation))
+    if stored is None:
+        return None
+    return Watermark(
+        datetime.datetime.fromisoformat(stored["enterDate"]), stored["guids"]
+    )
+
+
+def save(bookPath: str, operation: Sequence[str | None], watermark: Watermark):
+    state = _loadAll(bookPath)
+    state[json.dumps(operation)] = {
+        "enterDate": watermark.enterDate.isoformat(),
+        "guids": watermark.guids,
+    }
+    fd, tmpPath = tempfile.mkstemp(
+        dir=os.path.dirname(os.path.abspath(bookPath))
+    )
+    with os.fdopen(fd, "w") as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmpPath, bookPath + SUFFIX)
+
+
+def _loadAll(bookPath: str) -> dict[str, Any]:
+    if not os.path.exists(bookPath + SUFFIX):
+        return {}
+    with open(bookPath + SUFFIX) as f:
+        return json.load(f)
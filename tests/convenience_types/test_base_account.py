@@ -1,9 +1,17 @@
 # pyright: reportUnknownVariableType=false, reportUnknownMemberType=false, reportUnknownArgumentType=false, reportMissingTypeStubs=false
 
+import datetime
+import re
 import unittest
 import os
 import tempfile
+from unittest import mock
+from decimal import Decimal
 
+from piecash import GncValidationError
+from sqlalchemy import event
+
+from gnucsh.convenience_types import base_account
 from gnucsh.convenience_types.ledger import openLedger
 from tests.testhelpers import createTestLedger, createTestLedgerWithDuplicates
 
@@ -25,6 +33,30 @@ class TestBaseAccount(unittest.TestCase):
             self.assertEqual(1, len(entries))
             self.assertEqual("Groceries", entries[0].description)
 
+    def test__should_filter_entries_in_query_with_python_regex(self):
+        # given
+        testBookFile = os.path.join(tempfile.gettempdir(), "example.gnucash")
+        createTestLedger(testBookFile)
+        with openLedger(testBookFile) as book:
+            savingsAcct = book.findAccountByName("Savings")
+            statements: list[str] = []
+            engine = book.backingBook.session.bind
+
+            def listener(conn, cursor, statement, *args):
+                statements.append(statement)
+
+            event.listen(engine, "before_cursor_execute", listener)
+
+            # when
+            entries = savingsAcct.findEntriesWithDescription(r"^\w+cy$")
+
+            # then
+            event.remove(engine, "before_cursor_execute", listener)
+            self.assertEqual(["Pharmacy"], [e.description for e in entries])
+            self.assertTrue(any("REGEXP" in st for st in statements))
+            with self.assertRaises(re.error):
+                savingsAcct.findEntriesWithDescription("Gro(")
+
     def test__should_find_all_entries(self):
         # given
         testBookFile = os.path.join(tempfile.gettempdir(), "example.gnucash")
@@ -44,6 +76,144 @@ class TestBaseAccount(unittest.TestCase):
             self.assertEqual("Savings", entries[1].account_path)
             self.assertEqual("15", entries[1].value)
 
+    def test__should_list_entries_with_constant_number_of_queries(self):
+        # given
+        testBookFile = os.path.join(tempfile.gettempdir(), "example.gnucash")
+        createTestLedger(testBookFile)
+        with openLedger(testBookFile) as book:
+            expensesAcct = book.findAccountByName("Expenses")
+            foodAcct = expensesAcct.createExpencesAccount("Food")
+            savingsAcct = book.findAccountByName("Savings")
+            for i in range(20):
+                expensesAcct.addEntry(str(i), "Bakery {}".format(i), foodAcct)
+                savingsAcct.addEntry(str(i), "Bakery {}".format(i), foodAcct)
+            book.save()
+
+        def countListingQueries(accountName: str) -> int:
+            with openLedger(testBookFile) as book:
+                acct = book.findAccountByName(accountName)
+                statements: list[str] = []
+                engine = book.backingBook.session.bind
+
+                def listener(conn, cursor, statement, *args):
+                    statements.append(statement)
+
+                event.listen(engine, "before_cursor_execute", listener)
+                try:
+                    for entry in acct.getEntries():
+                        str(entry)
+                finally:
+                    event.remove(engine, "before_cursor_execute", listener)
+                return len(statements)
+
+        # when
+        fewEntries = countListingQueries("Opening Balance")
+        manyEntries = countListingQueries("Expenses")
+
+        # then
+        self.assertEqual(fewEntries, manyEntries)
+
+    def test__should_load_accounts_once_per_transaction(self):
+        # given
+        testBookFile = os.path.join(tempfile.gettempdir(), "example.gnucash")
+        createTestLedgerWithDuplicates(testBookFile)
+        with openLedger(testBookFile) as book:
+            expensesAcct = book.findAccountByName("Expenses")
+            savingsAcct = book.findAccountByName("Savings")
+            statements: list[str] = []
+            engine = book.backingBook.session.bind
+
+            def listener(conn, cursor, statement, *args):
+                statements.append(statement)
+
+            event.listen(engine, "before_cursor_execute", listener)
+            try:
+                # when
+                expensesAcct.getEntries()
+                expensesAcct.findDuplicates(savingsAcct)
+                list(expensesAcct.iterEntries(chunkSize=1))
+                loadedBeforeSave = len(
+                    [st for st in statements if "FROM accounts" in st]
+                )
+                book.save()
+                expensesAcct.getEntries()
+            finally:
+                event.remove(engine, "before_cursor_execute", listener)
+
+            # then
+            self.assertEqual(1, loadedBeforeSave)
+            self.assertEqual(
+                2, len([st for st in statements if "FROM accounts" in st])
+            )
+
+    def test__should_find_entries_added_in_same_session(self):
+        # given
+        testBookFile = os.path.join(tempfile.gettempdir(), "example.gnucash")
+        createTestLedger(testBookFile)
+        with openLedger(testBookFile) as book:
+            expensesAcct = book.findAccountByName("Expenses")
+            savingsAcct = book.findAccountByName("Savings")
+
+            # when
+            expensesAcct.addEntry("7", "Bakery", savingsAcct)
+
+            # then
+            self.assertEqual(
+                ["Groceries", "Pharmacy", "Bakery"],
+                [e.description for e in expensesAcct.getEntries()],
+            )
+
+    def test__should_change_transfer_account_of_entries(self):
+        # given
+        testBookFile = os.path.join(tempfile.gettempdir(), "example.gnucash")
+        createTestLedger(testBookFile)
+        with openLedger(testBookFile) as book:
+            expensesAcct = book.findAccountByName("Expenses")
+            openingAcct = book.findAccountByName("Opening Balance")
+            entries = expensesAcct.getEntries()
+
+            # when
+            changed = expensesAcct.changeTransferAccount(entries, openingAcct)
+
+            # then
+            self.assertEqual(2, changed)
+            self.assertEqual(
+                ["Opening Balance", "Opening Balance"],
+                [e.account_path for e in entries],
+            )
+            self.assertEqual(
+                ["Opening Savings Balance"],
+                [
+                    e.description
+                    for e in book.findAccountByName("Savings").getEntries()
+                ],
+            )
+            book.save()
+
+        with openLedger(testBookFile) as book:
+            self.assertEqual(
+                ["Opening Balance", "Opening Balance"],
+                [
+                    e.account_path
+                    for e in book.findAccountByName("Expenses").getEntries()
+                ],
+            )
+
+    def test__should_not_change_transfer_account_to_placeholder(self):
+        # given
+        testBookFile = os.path.join(tempfile.gettempdir(), "example.gnucash")
+        createTestLedger(testBookFile)
+        with openLedger(testBookFile) as book:
+            expensesAcct = book.findAccountByName("Expenses")
+            openingAcct = book.findAccountByName("Opening Balance")
+            openingAcct.backingAccount.placeholder = 1
+
+            # when/then
+            with self.assertRaises(GncValidationError):
+                expensesAcct.changeTransferAccount(
+                    expensesAcct.getEntries(), openingAcct
+                )
+
     def test__remove_entry(self):
         testBookFile = os.path.join(tempfile.gettempdir(), "example.gnucash")
         createTestLedger(testBookFile)
@@ -91,3 +261,324 @@ class TestBaseAccount(unittest.TestCase):
             # reverse value for each
             self.assertEqual("10", first.value)
             self.assertEqual("-10", second.value)
+
+    def test__should_not_find_duplicates_already_linked(self):
+        # given - Groceries and Pharmacy are shared between both accounts
+        testBookFile = os.path.join(tempfile.gettempdir(), "example.gnucash")
+        createTestLedger(testBookFile)
+        with openLedger(testBookFile) as ledger:
+            expensesAcc = ledger.findAccountByName("Expenses")
+            savingsAcc = ledger.findAccountByName("Savings")
+
+            # when
+            foundPairs = expensesAcc.findDuplicates(savingsAcc)
+
+            # then
+            self.assertEqual(0, len(foundPairs))
+
+    def test__should_unify_duplicates_with_constant_number_of_statements(
+        self,
+    ):
+        # given
+        testBookFile = os.path.join(tempfile.gettempdir(), "example.gnucash")
+
+        def countSaveStatements(pairs: int) -> int:
+            createTestLedgerWithDuplicates(testBookFile)
+            with openLedger(testBookFile) as book:
+                expensesAcc = book.findAccountByName("Expenses")
+                savingsAcc = book.findAccountByName("Savings")
+                imbalanceAcc = book.findAccountByName("Imbalance-EUR")
+                for i in range(1, pairs):
+                    expensesAcc.addEntry(
+                        "10", "dup {}".format(i), imbalanceAcc
+                    )
+                    savingsAcc.addEntry(
+                        "-10", "dup {}".format(i), imbalanceAcc
+                    )
+                book.save()
+
+            with openLedger(testBookFile) as book:
+                expensesAcc = book.findAccountByName("Expenses")
+                savingsAcc = book.findAccountByName("Savings")
+                duplicates = expensesAcc.findDuplicates(savingsAcc)
+                self.assertEqual(pairs, len(duplicates))
+                expensesAcc.unifyDuplicates(duplicates, savingsAcc)
+                del duplicates
+                statements: list[str] = []
+                engine = book.backingBook.session.bind
+
+                def listener(conn, cursor, statement, *args):
+                    statements.append(statement)
+
+                event.listen(engine, "before_cursor_execute", listener)
+                try:
+                    book.save()
+                finally:
+                    event.remove(engine, "before_cursor_execute", listener)
+                return len(statements)
+
+        # when
+        fewPairs = countSaveStatements(1)
+        manyPairs = countSaveStatements(10)
+
+        # then
+        self.assertEqual(fewPairs, manyPairs)
+
+    def test__should_pair_all_candidates_with_same_date_and_description(
+        self,
+    ):
+        # given
+        testBookFile = os.path.join(tempfile.gettempdir(), "example.gnucash")
+        createTestLedgerWithDuplicates(testBookFile)
+        with openLedger(testBookFile) as ledger:
+            expensesAcc = ledger.findAccountByName("Expenses")
+            savingsAcc = ledger.findAccountByName("Savings")
+            imbalanceAcc = ledger.findAccountByName("Imbalance-EUR")
+            expensesAcc.addEntry("20", "some description", imbalanceAcc)
+            savingsAcc.addEntry("-20", "other description", imbalanceAcc)
+            ledger.save()
+
+            # when
+            foundPairs = expensesAcc.findDuplicates(savingsAcc)
+
+            # then
+            self.assertEqual(
+                [("10", "-10"), ("20", "-10")],
+                [(first.value, second.value) for first, second in foundPairs],
+            )
+
+    def test__should_only_find_duplicates_with_entries_after_watermark(self):
+        # given
+        testBookFile = os.path.join(tempfile.gettempdir(), "example.gnucash")
+        createTestLedgerWithDuplicates(testBookFile)
+        with openLedger(testBookFile) as ledger:
+            expensesAcc = ledger.findAccountByName("Expenses")
+            savingsAcc = ledger.findAccountByName("Savings")
+            imbalanceAcc = ledger.findAccountByName("Imbalance-EUR")
+            watermark = ledger.getWatermark()
+            expensesAcc.addEntry("20", "new description", imbalanceAcc)
+            savingsAcc.addEntry("-20", "new description", imbalanceAcc)
+            ledger.save()
+
+            # when
+            foundPairs = expensesAcc.findDuplicates(savingsAcc, watermark)
+
+            # then
+            self.assertEqual(
+                [("20", "-20")],
+                [(first.value, second.value) for first, second in foundPairs],
+            )
+
+    def test__should_only_find_entries_after_watermark(self):
+        # given
+        testBookFile = os.path.join(tempfile.gettempdir(), "example.gnucash")
+        createTestLedger(testBookFile)
+        with openLedger(testBookFile) as ledger:
+            expensesAcc = ledger.findAccountByName("Expenses")
+            watermark = ledger.getWatermark()
+            expensesAcc.addEntry(
+                "3", "Groceries", ledger.findAccountByName("Savings")
+            )
+            ledger.save()
+
+            # when
+            entries = expensesAcc.findEntriesWithDescription(
+                "Groceries", watermark
+            )
+
+            # then
+            self.assertEqual(["3"], [e.value for e in entries])
+
+    def test__should_only_find_entries_posted_in_range(self):
+        # given
+        testBookFile = os.path.join(tempfile.gettempdir(), "example.gnucash")
+        createTestLedger(testBookFile)
+        with openLedger(testBookFile) as ledger:
+            expensesAcc = ledger.findAccountByName("Expenses")
+            groceries = expensesAcc.findEntriesWithDescription("Groceries")[0]
+            groceries.backingSplit.transaction.post_date = datetime.date(
+                2020, 1, 31
+            )
+            ledger.save()
+
+            for walkMinSplits in [1, 100]:
+                with mock.patch.object(
+                    base_account, "PAGE_WALK_MIN_SPLITS", walkMinSplits
+                ):
+                    # when
+                    january = expensesAcc.findEntriesWithDescription(
+                        None,
+                        None,
+                        datetime.date(2020, 1, 1),
+                        datetime.date(2020, 1, 31),
+                    )
+                    afterJanuary = expensesAcc.findEntriesWithDescription(
+                        None, None, datetime.date(2020, 2, 1)
+                    )
+
+                    # then
+                    self.assertEqual(
+                        ["Groceries"], [e.description for e in january]
+                    )
+                    self.assertEqual(
+                        ["Pharmacy"], [e.description for e in afterJanuary]
+                    )
+                    self.assertEqual(
+                        [(datetime.date(2020, 1, 31), "4", "Groceries")],
+                        [
+                            row[:3]
+                            for row in expensesAcc.iterEntryRows(
+                                None, postedUntil=datetime.date(2020, 1, 31)
+                            )
+                        ],
+                    )
+
+    def test__should_create_accounts_in_batches(self):
+        # given
+        testBookFile = os.path.join(tempfile.gettempdir(), "example.gnucash")
+        createTestLedger(testBookFile)
+        with openLedger(testBookFile) as ledger:
+            expensesAcc = ledger.findAccountByName("Expenses")
+
+            # when
+            accounts = expensesAcc.createAccounts(
+                [("Food", "EXPENSE"), ("Rent", "EXPENSE"), ("Fun", "EXPENSE")],
+                batchSize=2,
+            )
+            ledger.save()
+
+            # then
+            self.assertEqual(
+                ["Expenses:Food", "Expenses:Rent", "Expenses:Fun"],
+                [acc.fullname for acc in accounts],
+            )
+            self.assertEqual(
+                "Expenses:Rent", ledger.findAccountByName("Rent").fullname
+            )
+
+    def test__should_add_entries_in_batches(self):
+        # given
+        testBookFile = os.path.join(tempfile.gettempdir(), "example.gnucash")
+        createTestLedger(testBookFile)
+        with openLedger(testBookFile) as ledger:
+            expensesAcc = ledger.findAccountByName("Expenses")
+            savingsAcc = ledger.findAccountByName("Savings")
+            openingAcc = ledger.findAccountByName("Opening Balance")
+
+            # when
+            added = expensesAcc.addEntries(
+                [
+                    ("2.50", "Bakery", savingsAcc),
+                    ("7", "Cinema", openingAcc),
+                    ("1.25", "Bakery", savingsAcc),
+                ],
+                batchSize=2,
+            )
+            ledger.save()
+
+            # then
+            self.assertEqual(3, added)
+            self.assertEqual(
+                [
+                    ("Groceries", "4", "Savings"),
+                    ("Pharmacy", "15", "Savings"),
+                    ("Bakery", "2.5", "Savings"),
+                    ("Cinema", "7", "Opening Balance"),
+                    ("Bakery", "1.25", "Savings"),
+                ],
+                [
+                    (e.description, e.value, e.account_path)
+                    for e in expensesAcc.getEntries()
+                ],
+            )
+            self.assertEqual(
+                [str(datetime.date.today())] * 5,
+                [str(e.date) for e in expensesAcc.getEntries()],
+            )
+            with self.assertRaises(GncValidationError):
+                expensesAcc.addEntries([("0.001", "Too exact", savingsAcc)])
+
+    def test__should_not_add_entries_to_placeholder(self):
+        # given
+        testBookFile = os.path.join(tempfile.gettempdir(), "example.gnucash")
+        createTestLedger(testBookFile)
+        with openLedger(testBookFile) as ledger:
+            expensesAcc = ledger.findAccountByName("Expenses")
+            openingAcc = ledger.findAccountByName("Opening Balance")
+            openingAcc.backingAccount.placeholder = 1
+
+            # when/then
+            with self.assertRaises(GncValidationError):
+                expensesAcc.addEntries([("7", "Cinema", openingAcc)])
+            with self.assertRaises(GncValidationError):
+                expensesAcc.importEntries(
+                    [(datetime.date(2020, 1, 1), Decimal("7"), "Cinema")],
+                    openingAcc,
+                )
+            with self.assertRaises(GncValidationError):
+                openingAcc.addEntries([("7", "Cinema", expensesAcc)])
+
+    def test__should_page_through_entries_by_post_date(self):
+        # given
+        testBookFile = os.path.join(tempfile.gettempdir(), "example.gnucash")
+        createTestLedger(testBookFile)
+        with openLedger(testBookFile) as ledger:
+            savingsAcc = ledger.findAccountByName("Savings")
+            for day, e in zip([3, 1, 2], savingsAcc.getEntries()):
+                e.backingSplit.transaction.post_date = datetime.date(
+                    2020, 1, day
+                )
+            ledger.save()
+
+            for walkMinSplits in [1, 100]:
+                with mock.patch.object(
+                    base_account, "PAGE_WALK_MIN_SPLITS", walkMinSplits
+                ):
+                    # when
+                    first, cursor = savingsAcc.findEntriesPage(None, 2)
+                    last, lastCursor = savingsAcc.findEntriesPage(
+                        None, 2, cursor
+                    )
+                    newest, _ = savingsAcc.findEntriesPage(
+                        None, 2, reverse=True
+                    )
+
+                    # then
+                    self.assertEqual(
+                        ["Opening Savings Balance", "Pharmacy"],
+                        [e.description for e in first],
+                    )
+                    self.assertEqual(
+                        ["Groceries"], [e.description for e in last]
+                    )
+                    self.assertIsNone(lastCursor)
+                    self.assertEqual(
+                        ["Groceries", "Pharmacy"],
+                        [e.description for e in newest],
+                    )
+            with self.assertRaises(KeyError):
+                savingsAcc.findEntriesPage(None, 2, "unknown")
+
+    def test__should_iterate_entries_in_chunks(self):
+        # given
+        testBookFile = os.path.join(tempfile.gettempdir(), "example.gnucash")
+        createTestLedger(testBookFile)
+        with openLedger(testBookFile) as ledger:
+            expensesAcc = ledger.findAccountByName("Expenses")
+            entries = sorted(
+                expensesAcc.getEntries(),
+                key=lambda e: (e.date, e.backingSplit.guid),
+            )
+
+            # when
+            iterated = list(expensesAcc.iterEntries(chunkSize=1))
+            filtered = list(
+                expensesAcc.iterEntriesWithDescription("Groc", chunkSize=1)
+            )
+
+            # then
+            self.assertEqual(
+                [e.backingSplit.guid for e in entries],
+                [e.backingSplit.guid for e in iterated],
+            )
+            self.assertEqual(["Groceries"], [e.description for e in filtered])
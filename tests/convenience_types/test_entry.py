@@ -0,0 +1,61 @@
+# pyright: reportUnknownVariableType=false, reportUnknownMemberType=false, reportUnknownArgumentType=false, reportMissingTypeStubs=false
+
+import unittest
+import os
+import tempfile
+
+from gnucsh.convenience_types.entry import TransactionType
+from gnucsh.convenience_types.ledger import openLedger
+from tests.testhelpers import createTestLedger
+
+
+class TestEntry(unittest.TestCase):
+
+    def test__should_resolve_both_sides_of_the_entry(self):
+        # given
+        testBookFile = os.path.join(tempfile.gettempdir(), "example.gnucash")
+        createTestLedger(testBookFile)
+        with openLedger(testBookFile) as book:
+            # when
+            deposit = book.findAccountByName("Expenses").getEntries()[0]
+            withdrawal = book.findAccountByName("Savings").getEntries()[0]
+
+            # then
+            self.assertEqual("Groceries", deposit.description)
+            self.assertEqual(TransactionType.DEPOSITE, deposit.type)
+            self.assertEqual("Expenses", deposit.thisAccount.account_path)
+            self.assertEqual("Savings", deposit.otherAccount.account_path)
+            self.assertEqual("4", deposit.value)
+
+            self.assertEqual("Groceries", withdrawal.description)
+            self.assertEqual(TransactionType.WITHDRAWAL, withdrawal.type)
+            self.assertEqual("Savings", withdrawal.thisAccount.account_path)
+            self.assertEqual("Expenses", withdrawal.account_path)
+            self.assertEqual("-4", withdrawal.value)
+
+    def test__should_update_account_path_when_changing_account(self):
+        # given
+        testBookFile = os.path.join(tempfile.gettempdir(), "example.gnucash")
+        createTestLedger(testBookFile)
+        with openLedger(testBookFile) as book:
+            entry = book.findAccountByName("Expenses").getEntries()[0]
+            self.assertEqual("Savings", entry.account_path)
+            openingAcct = book.findAccountByName("Opening Balance")
+
+            # when
+            entry.otherAccount.setAccount(openingAcct.backingAccount)
+
+            # then
+            self.assertEqual("Opening Balance", entry.account_path)
+
+    def test__should_not_have_instance_dict(self):
+        # given
+        testBookFile = os.path.join(tempfile.gettempdir(), "example.gnucash")
+        createTestLedger(testBookFile)
+        with openLedger(testBookFile) as book:
+            # when
+            entry = book.findAccountByName("Expenses").getEntries()[0]
+
+            # then
+            self.assertFalse(hasattr(entry, "__dict__"))
+            self.assertFalse(hasattr(entry.thisAccount, "__dict__"))
@@ -1,11 +1,24 @@
 # pyright: reportUnknownVariableType=false, reportUnknownMemberType=false, reportUnknownArgumentType=false, reportMissingTypeStubs=false
 
 import os
+import sqlite3
 import unittest
 import warnings
 import tempfile
+from decimal import Decimal
 
-from gnucsh.convenience_types.ledger import openLedger
+from click.testing import CliRunner
+from piecash import GncImbalanceError, GnucashException, Split, Transaction
+from sqlalchemy.exc import OperationalError
+
+from gnucsh.cli import main
+from gnucsh.convenience_types.ledger import (
+    acceptsPoolSize,
+    disposeEngines,
+    ensurePostDateIndex,
+    openLedger,
+    setPool,
+)
 from tests.testhelpers import createTestLedger
 
 
@@ -36,6 +49,197 @@ class TestLedger(unittest.TestCase):
             # then
             self.assertEqual("Savings:Savings2", accSavings2.fullname)
 
+    def test__should_list_accounts_added_in_same_session(self):
+        # given
+        testBookFile = os.path.join(tempfile.gettempdir(), "example.gnucash")
+        createTestLedger(testBookFile)
+        with openLedger(testBookFile) as book:
+            self.assertEqual(
+                ["Expenses", "Savings", "Opening Balance"],
+                [acc.fullname for acc in book.getAllAccounts()],
+            )
+
+            # when
+            book.findAccountByName("Expenses").createExpencesAccount("Food")
+            book.flush()
+
+            # then
+            self.assertEqual(
+                ["Expenses", "Savings", "Opening Balance", "Expenses:Food"],
+                [acc.fullname for acc in book.getAllAccounts()],
+            )
+            self.assertEqual(
+                "Expenses:Food", book.findAccountByName("Food").fullname
+            )
+
+    def test__should_raise_for_unknown_account(self):
+        # given
+        testBookFile = os.path.join(tempfile.gettempdir(), "example.gnucash")
+        createTestLedger(testBookFile)
+        with openLedger(testBookFile) as book:
+            # when/then
+            with self.assertRaises(KeyError):
+                book.findAccountByName("Savings:Unknown")
+
+    def test__should_not_write_when_opened_readonly(self):
+        # given
+        testBookFile = os.path.join(tempfile.gettempdir(), "example.gnucash")
+        createTestLedger(testBookFile)
+        with openLedger(testBookFile, readonly=True) as book:
+            self.assertEqual(
+                ["Groceries", "Pharmacy"],
+                [
+                    e.description
+                    for e in book.findAccountByName("Expenses").getEntries()
+                ],
+            )
+
+            # when/then
+            with self.assertRaises(GnucashException):
+                book.save()
+            with self.assertRaises(OperationalError):
+                book.backingBook.session.execute("DELETE FROM transactions")
+
+    def test__should_create_missing_post_date_index(self):
+        # given
+        testBookFile = os.path.join(tempfile.gettempdir(), "example.gnucash")
+        createTestLedger(testBookFile)
+        connection = sqlite3.connect(testBookFile)
+        with connection:
+            connection.execute("DROP INDEX tx_post_date_index")
+
+        # when
+        ensurePostDateIndex(testBookFile)
+        ensurePostDateIndex(testBookFile)
+
+        # then
+        indexes = connection.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'index'"
+            + " AND tbl_name = 'transactions' AND sql LIKE '%post_date%'"
+        ).fetchall()
+        connection.close()
+        self.assertEqual([("tx_post_date_index",)], indexes)
+
+    def test__should_move_watermark_to_latest_transactions(self):
+        # given
+        testBookFile = os.path.join(tempfile.gettempdir(), "example.gnucash")
+        createTestLedger(testBookFile)
+        connection = sqlite3.connect(testBookFile)
+        with connection:
+            connection.execute(
+                "UPDATE transactions SET enter_date = '2020-01-01 10:00:00'"
+            )
+        connection.close()
+        with openLedger(testBookFile) as ledger:
+            watermark = ledger.getWatermark()
+            expensesAcc = ledger.findAccountByName("Expenses")
+            savingsAcc = ledger.findAccountByName("Savings")
+            expensesAcc.addEntries(
+                [("1", "Bakery", savingsAcc), ("2", "Cinema", savingsAcc)]
+            )
+            ledger.save()
+
+            # when
+            newer = ledger.getWatermark(watermark)
+
+            # then
+            assert watermark is not None and newer is not None
+            self.assertEqual(3, len(watermark.guids))
+            self.assertGreater(newer.enterDate, watermark.enterDate)
+            self.assertEqual(
+                sorted(
+                    e.backingSplit.transaction.guid
+                    for e in expensesAcc.getEntries()[2:]
+                ),
+                sorted(newer.guids),
+            )
+
+    def test__should_reuse_connection_pool_of_book_opened_by_uri(self):
+        # given
+        testBookFile = os.path.join(tempfile.gettempdir(), "example.gnucash")
+        createTestLedger(testBookFile)
+        connection = sqlite3.connect(testBookFile)
+        with connection:
+            connection.execute("DROP INDEX tx_post_date_index")
+        connection.close()
+        uri = "sqlite:///" + testBookFile
+        setPool(prePing=True)
+        self.addCleanup(disposeEngines)
+        self.addCleanup(setPool)
+
+        # when
+        with openLedger(uri) as book:
+            engine = book.backingBook.session.get_bind()
+            book.findAccountByName("Expenses").createExpencesAccount("Food")
+            book.save()
+        ensurePostDateIndex(uri)
+
+        # then
+        with openLedger(uri, readonly=True) as book:
+            self.assertIs(engine, book.backingBook.session.get_bind())
+            self.assertTrue(engine.pool._pre_ping)
+            self.assertEqual(
+                "Expenses:Food", book.findAccountByName("Food").fullname
+            )
+            with self.assertRaises(GnucashException):
+                book.save()
+        connection = sqlite3.connect(testBookFile)
+        indexes = connection.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'index'"
+            + " AND tbl_name = 'transactions' AND sql LIKE '%post_date%'"
+        ).fetchall()
+        connection.close()
+        self.assertEqual([("tx_post_date_index",)], indexes)
+
+    def test__should_only_size_pools_of_databases_pooling_connections(self):
+        # given
+        testBookFile = os.path.join(tempfile.gettempdir(), "example.gnucash")
+        createTestLedger(testBookFile)
+        uri = "sqlite:///" + testBookFile
+        setPool(size=3)
+        self.addCleanup(disposeEngines)
+        self.addCleanup(setPool)
+
+        # when
+        with openLedger(uri, readonly=True) as book:
+            fullname = book.findAccountByName("Expenses").fullname
+
+        # then
+        self.assertEqual("Expenses", fullname)
+        self.assertFalse(acceptsPoolSize(uri))
+        self.assertTrue(acceptsPoolSize("postgresql://user@host/books"))
+        result = CliRunner().invoke(
+            main, [uri, "Expenses", "--pool-size", "3"]
+        )
+        self.assertEqual(2, result.exit_code, result.output)
+        self.assertIn("--pool-size can not be used", result.output)
+
+    def test__should_validate_book_opened_again_by_uri(self):
+        # given
+        testBookFile = os.path.join(tempfile.gettempdir(), "example.gnucash")
+        createTestLedger(testBookFile)
+        uri = "sqlite:///" + testBookFile
+        self.addCleanup(disposeEngines)
+        with openLedger(uri):
+            pass
+
+        with openLedger(uri) as book:
+            self.assertFalse(book.backingBook.session.autoflush)
+            expenses = book.findAccountByName("Expenses").backingAccount
+            savings = book.findAccountByName("Savings").backingAccount
+            _ = Transaction(
+                currency=expenses.commodity,
+                description="Unbalanced",
+                splits=[
+                    Split(account=expenses, value=Decimal("5")),
+                    Split(account=savings, value=Decimal("-3")),
+                ],
+            )
+
+            # when/then
+            with self.assertRaises(GncImbalanceError):
+                book.save()
+
     # ------------------------------------------------------------
 
 
@@ -0,0 +1,172 @@
+# pyright: reportUnknownVariableType=false, reportUnknownMemberType=false, reportUnknownArgumentType=false, reportMissingTypeStubs=false
+
+import builtins
+import contextlib
+import io
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+from gnucsh.convenience_types.ledger import openLedger
+from gnucsh.daemon import SUPPORTED, runRemote, socketDir, socketPath
+from tests.testhelpers import createTestLedger
+
+
+def command(account=None, transfer=None, filter=None, format="text"):
+    return {
+        "account": account,
+        "transfer": transfer,
+        "filter": filter,
+        "duplicates": None,
+        "format": format,
+    }
+
+
+@unittest.skipUnless(SUPPORTED, "needs Unix sockets")
+class TestDaemon(unittest.TestCase):
+    def setUp(self):
+        self.testBookFile = os.path.join(
+            tempfile.gettempdir(), "example.gnucash"
+        )
+        createTestLedger(self.testBookFile)
+        self.daemon = subprocess.Popen(
+            [sys.executable, "-m", "gnucsh", self.testBookFile, "--serve"],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        )
+        deadline = time.monotonic() + 30
+        while not self.isServing():
+            self.assertLess(time.monotonic(), deadline, "daemon not started")
+            time.sleep(0.05)
+
+    def tearDown(self):
+        self.daemon.terminate()
+        self.assertEqual(0, self.daemon.wait())
+        self.assertFalse(os.path.exists(socketPath(self.testBookFile)))
+
+    def isServing(self) -> bool:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+            try:
+                probe.connect(socketPath(self.testBookFile))
+                return True
+            except OSError:
+                return False
+
+    def runRemote(self, params) -> tuple[int | None, str]:
+        f = io.StringIO()
+        with contextlib.redirect_stdout(f):
+            exitCode = runRemote(self.testBookFile, params)
+        return exitCode, f.getvalue()
+
+    def test__should_not_run_remote_without_daemon(self):
+        otherBook = os.path.join(tempfile.gettempdir(), "other.gnucash")
+        self.assertIsNone(runRemote(otherBook, command()))
+
+    def test__should_list_accounts_through_daemon(self):
+        # when
+        exitCode, output = self.runRemote(command(filter="pen"))
+
+        # then
+        self.assertEqual(0, exitCode)
+        self.assertEqual(
+            "### Listing Accounts matching 'pen' ###\n"
+            + "Expenses\nOpening Balance\n",
+            output,
+        )
+
+    def test__should_change_transfer_account_through_daemon(self):
+        # given
+        original_raw_input = builtins.input
+        builtins.input = lambda _: "y"
+
+        # when
+        exitCode, output = self.runRemote(
+            command("Expenses", "Opening Balance", "Groceries")
+        )
+
+        # then
+        builtins.input = original_raw_input
+        self.assertEqual(0, exitCode)
+        self.assertIn("Changed 1 entries", output)
+        with openLedger(self.testBookFile) as book:
+            self.assertEqual(
+                ["Opening Balance", "Savings"],
+                [
+                    e.account_path
+                    for e in book.findAccountByName("Expenses").getEntries()
+                ],
+            )
+
+    def test__should_reload_book_changed_on_disk(self):
+        # given
+        self.runRemote(command("Expenses", format="csv"))
+        with openLedger(self.testBookFile) as book:
+            book.findAccountByName("Expenses").addEntry(
+                "3", "Bakery", book.findAccountByName("Savings")
+            )
+            book.save()
+
+        # when
+        _, output = self.runRemote(command("Expenses", format="csv"))
+
+        # then
+        self.assertIn("Bakery", output)
+
+    def test__should_report_failing_commands(self):
+        # when
+        exitCode, output = self.runRemote(command("Unknown"))
+
+        # then
+        self.assertEqual(1, exitCode)
+        self.assertIn("KeyError", output)
+
+
+@unittest.skipUnless(SUPPORTED, "needs Unix sockets")
+class TestSocketPath(unittest.TestCase):
+    def test__should_not_run_remote_on_socket_of_other_user(self):
+        # given
+        runtimeDir = tempfile.mkdtemp()
+        bookFile = os.path.join(tempfile.gettempdir(), "example.gnucash")
+        with mock.patch.dict(os.environ, {"XDG_RUNTIME_DIR": runtimeDir}):
+            listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            listener.bind(socketPath(bookFile))
+            listener.listen()
+
+            def fakeDaemon():
+                connection, _ = listener.accept()
+                with connection, connection.makefile("rw") as stream:
+                    stream.readline()
+                    stream.write('{"exit": 7}\n')
+
+            thread = threading.Thread(target=fakeDaemon, daemon=True)
+            thread.start()
+
+            # when
+            with mock.patch("os.getuid", return_value=os.getuid() + 1):
+                foreignExitCode = runRemote(bookFile, command())
+            ownExitCode = runRemote(bookFile, command())
+
+        # then
+        listener.close()
+        self.assertIsNone(foreignExitCode)
+        self.assertEqual(7, ownExitCode)
+
+    def test__should_refuse_socket_dir_open_to_others(self):
+        # given
+        with mock.patch.dict(os.environ, {"XDG_RUNTIME_DIR": ""}):
+            path = socketDir()
+            self.assertEqual(0o700, os.stat(path).st_mode & 0o777)
+            os.chmod(path, 0o777)
+            try:
+                # when/then
+                with self.assertRaises(PermissionError):
+                    socketDir()
+            finally:
+                os.chmod(path, 0o700)
@@ -0,0 +1,131 @@
+# pyright: reportUnknownVariableType=false, reportUnknownMemberType=false, reportUnknownArgumentType=false, reportMissingTypeStubs=false
+
+import builtins
+import os
+import tempfile
+import unittest
+import warnings
+from decimal import Decimal
+
+from click.testing import CliRunner
+from piecash import Split, Transaction
+
+from gnucsh.cli import main
+from gnucsh.convenience_types.ledger import createLedger, openLedger
+from gnucsh.duplicates import scanDuplicates, selectAccounts
+from gnucsh.snapshot import Snapshot
+
+
+class TestDuplicates(unittest.TestCase):
+    def setUp(self):
+        self.testBookFile = os.path.join(
+            tempfile.gettempdir(), "example.gnucash"
+        )
+        if os.path.isfile(self.testBookFile):
+            os.remove(self.testBookFile)
+        with createLedger(self.testBookFile) as ledger:
+            rootAcct = ledger.getRootAccount()
+            checkingAcct = rootAcct.createBankAccount("Checking")
+            savingsAcct = rootAcct.createBankAccount("Savings")
+            cardAcct = rootAcct.createBankAccount("Card")
+            imbalanceAcct = rootAcct.createAccount("Imbalance", "EQUITY")
+
+            checkingAcct.addEntry("-10", "Transfer A", imbalanceAcct)
+            savingsAcct.addEntry("10", "Transfer A", imbalanceAcct)
+            cardAcct.addEntry("-5", "Payment B", imbalanceAcct)
+            checkingAcct.addEntry("5", "Payment B", imbalanceAcct)
+            savingsAcct.addEntry("3", "Interest", imbalanceAcct)
+            ledger.save()
+
+    def scan(self, selection: str, workers: int) -> list[tuple[str, str]]:
+        snapshot = Snapshot.open(self.testBookFile, cache=False)
+        return [
+            (
+                snapshot.accounts[snapshot.account(mainRow)][1],
+                snapshot.accounts[snapshot.account(otherRow)][1],
+            )
+            for mainRow, otherRow in scanDuplicates(
+                snapshot, selectAccounts(snapshot, selection), workers
+            )
+        ]
+
+    def test__should_find_duplicates_between_all_accounts_of_a_type(self):
+        # when
+        duplicates = self.scan("bank", workers=1)
+
+        # then
+        self.assertEqual(
+            [("Checking", "Savings"), ("Checking", "Card")], duplicates
+        )
+
+    def test__should_find_same_duplicates_in_process_pool(self):
+        # when
+        duplicates = self.scan("BANK", workers=2)
+
+        # then
+        self.assertEqual(self.scan("BANK", workers=1), duplicates)
+
+    def test__should_unify_all_duplicates_at_once(self):
+        # given
+        original_raw_input = builtins.input
+        builtins.input = lambda _: "y"
+
+        # when
+        result = CliRunner().invoke(
+            main, [self.testBookFile, "--scan-duplicates", "BANK"]
+        )
+
+        # then
+        builtins.input = original_raw_input
+        self.assertEqual(0, result.exit_code, result.output)
+        with openLedger(self.testBookFile) as ledger:
+            self.assertEqual(
+                ["Savings", "Card"],
+                [
+                    e.account_path
+                    for e in ledger.findAccountByName("Checking").getEntries()
+                ],
+            )
+            self.assertEqual(
+                ["Interest"],
+                [
+                    e.description
+                    for e in ledger.findAccountByName("Imbalance").getEntries()
+                ],
+            )
+
+    def test__should_skip_transactions_with_more_than_two_splits(self):
+        # given
+        with openLedger(self.testBookFile) as ledger:
+            ledger.findAccountByName("Card").addEntry(
+                "10", "Payment C", ledger.findAccountByName("Imbalance")
+            )
+            checking = ledger.findAccountByName("Checking").backingAccount
+            imbalance = ledger.findAccountByName("Imbalance").backingAccount
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore")
+                _ = Transaction(
+                    currency=checking.commodity,
+                    description="Payment C",
+                    splits=[
+                        Split(value=Decimal("-10"), account=checking),
+                        Split(value=Decimal("4"), account=imbalance),
+                        Split(value=Decimal("6"), account=imbalance),
+                    ],
+                )
+            ledger.save()
+        original_raw_input = builtins.input
+        builtins.input = lambda _: "n"
+
+        # when
+        duplicates = self.scan("BANK", workers=1)
+        result = CliRunner().invoke(
+            main, [self.testBookFile, "--scan-duplicates", "BANK"]
+        )
+
+        # then
+        builtins.input = original_raw_input
+        self.assertEqual(
+            [("Checking", "Savings"), ("Checking", "Card")], duplicates
+        )
+        self.assertEqual(0, result.exit_code, result.output)
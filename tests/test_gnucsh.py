@@ -6,19 +6,58 @@ import tempfile
 import io
 import contextlib
 import builtins
+import json
+import sqlite3
+import subprocess
+import sys
+from unittest import mock
 
+from click.testing import CliRunner
 from datetime import datetime
-from gnucsh.convenience_types.ledger import openLedger
+from gnucsh.convenience_types.ledger import Ledger, openLedger
 from gnucsh.cli import (
     changeTransferAccount,
     unifyDuplicates,
     listAccounts,
     listTransactions,
+    runScript,
+    main,
 )
 from tests.testhelpers import createTestLedger, createTestLedgerWithDuplicates
 
+CLI_IMPORT_BUDGET_US = 300_000
+""" Maximum time importing the cli may take, in microseconds. """
+
 
 class TestGnucsh(unittest.TestCase):
+    def test__should_start_without_importing_the_ledger(self):
+        # when
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", "import gnucsh.cli"],
+            capture_output=True,
+            text=True,
+            check=True,
+            env={
+                **os.environ,
+                "PYTHONPATH": os.path.dirname(
+                    os.path.dirname(os.path.abspath(__file__))
+                ),
+            },
+        )
+
+        # then
+        cumulativeByModule = {
+            columns[2].strip(): int(columns[1])
+            for columns in (
+                line.split("|")
+                for line in result.stderr.splitlines()
+                if line.startswith("import time:") and "cumulative" not in line
+            )
+        }
+        self.assertNotIn("piecash", cumulativeByModule)
+        self.assertNotIn("sqlalchemy", cumulativeByModule)
+        self.assertLess(cumulativeByModule["gnucsh.cli"], CLI_IMPORT_BUDGET_US)
+
     def test__find_duplicates(self):
         testBookFile = os.path.join(tempfile.gettempdir(), "example.gnucash")
         createTestLedgerWithDuplicates(testBookFile)
@@ -86,9 +125,135 @@ class TestGnucsh(unittest.TestCase):
             """###  Account:'Expenses'  filter:'None'  ###
 {}   4       Groceries                                                                                                                               Savings
 {}   15      Pharmacy                                                                                                                                Savings
-""".format(
-                today, today
-            ),
+""".format(today, today),
+        )
+
+    def test__list_transactions_as_csv(self):
+        testBookFile = os.path.join(tempfile.gettempdir(), "example.gnucash")
+        createTestLedger(testBookFile)
+
+        f = io.StringIO()
+        with contextlib.redirect_stdout(f):
+            listTransactions(testBookFile, "Savings", None, "csv")
+
+        today = datetime.today().strftime("%Y-%m-%d")
+        self.assertMultiLineEqual(
+            f.getvalue(),
+            """date,value,description,account
+{0},-4,Groceries,Expenses
+{0},100,Opening Savings Balance,Opening Balance
+{0},-15,Pharmacy,Expenses
+""".format(today),
+        )
+
+    def test__list_transactions_as_jsonl_with_filter(self):
+        testBookFile = os.path.join(tempfile.gettempdir(), "example.gnucash")
+        createTestLedger(testBookFile)
+
+        f = io.StringIO()
+        with contextlib.redirect_stdout(f):
+            listTransactions(testBookFile, "Expenses", "Pharm", "jsonl")
+
+        today = datetime.today().strftime("%Y-%m-%d")
+        self.assertEqual(
+            [
+                {
+                    "date": today,
+                    "value": "15",
+                    "description": "Pharmacy",
+                    "account": "Savings",
+                }
+            ],
+            [json.loads(line) for line in f.getvalue().splitlines()],
+        )
+
+    def test__list_newest_transactions_page(self):
+        testBookFile = os.path.join(tempfile.gettempdir(), "example.gnucash")
+        createTestLedger(testBookFile)
+
+        result = CliRunner().invoke(
+            main,
+            [testBookFile, "Savings", "--limit", "2", "--reverse"]
+            + ["--format", "csv"],
+        )
+
+        self.assertEqual(0, result.exit_code, result.output)
+        self.assertEqual(3, len(result.stdout.splitlines()))
+        self.assertIn("Next page: --after ", result.stderr)
+        cursor = result.stderr.split("--after ")[1].strip()
+        nextPage = CliRunner().invoke(
+            main,
+            [testBookFile, "Savings", "--limit", "2", "--reverse"]
+            + ["--after", cursor, "--format", "csv"],
+        )
+        self.assertEqual(0, nextPage.exit_code, nextPage.output)
+        self.assertEqual(2, len(nextPage.stdout.splitlines()))
+        self.assertEqual("", nextPage.stderr)
+
+    def test__should_only_page_listings(self):
+        testBookFile = os.path.join(tempfile.gettempdir(), "example.gnucash")
+        createTestLedger(testBookFile)
+
+        result = CliRunner().invoke(
+            main,
+            [testBookFile, "Expenses", "-t", "Opening Balance"]
+            + ["--limit", "1"],
+            input="y\n",
+        )
+
+        self.assertEqual(2, result.exit_code, result.output)
+        self.assertIn("not --transfer", result.output)
+        with openLedger(testBookFile) as book:
+            self.assertEqual(
+                ["Savings", "Savings"],
+                [
+                    e.account_path
+                    for e in book.findAccountByName("Expenses").getEntries()
+                ],
+            )
+
+    def test__list_transactions_in_range_without_writing_to_book(self):
+        testBookFile = os.path.join(tempfile.gettempdir(), "example.gnucash")
+        createTestLedger(testBookFile)
+        connection = sqlite3.connect(testBookFile)
+        with connection:
+            connection.execute("DROP INDEX tx_post_date_index")
+        missingBookFile = os.path.join(tempfile.gettempdir(), "nope.gnucash")
+        if os.path.exists(missingBookFile):
+            os.remove(missingBookFile)
+
+        result = CliRunner().invoke(
+            main, [testBookFile, "Expenses", "--since", "2000-01-01"]
+        )
+        missing = CliRunner().invoke(
+            main, [missingBookFile, "Expenses", "--since", "2000-01-01"]
+        )
+
+        self.assertEqual(0, result.exit_code, result.output)
+        self.assertIn("Groceries", result.output)
+        self.assertEqual(
+            [],
+            connection.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'index'"
+                + " AND sql LIKE '%post_date%'"
+            ).fetchall(),
+        )
+        connection.close()
+        self.assertNotEqual(0, missing.exit_code)
+        self.assertFalse(os.path.exists(missingBookFile))
+
+    def test__list_accounts_as_tsv(self):
+        testBookFile = os.path.join(tempfile.gettempdir(), "example.gnucash")
+        createTestLedger(testBookFile)
+
+        f = io.StringIO()
+        with contextlib.redirect_stdout(f):
+            listAccounts(testBookFile, "pen", "tsv")
+        self.assertMultiLineEqual(
+            f.getvalue(),
+            "account\tname\ttype\n"
+            + "Expenses\tExpenses\tEXPENSE\n"
+            + "Opening Balance\tOpening Balance\tEQUITY\n",
         )
 
     def test__should_change_transfer_account(self):
@@ -122,3 +287,126 @@ class TestGnucsh(unittest.TestCase):
             )
         # teardown
         builtins.input = original_raw_input
+
+    def test__should_not_take_watermark_without_incremental(self):
+        # given
+        testBookFile = os.path.join(tempfile.gettempdir(), "example.gnucash")
+        createTestLedgerWithDuplicates(testBookFile)
+        original_raw_input = builtins.input
+        builtins.input = lambda _: "n"
+
+        # when
+        with mock.patch.object(Ledger, "getWatermark") as getWatermark:
+            changeTransferAccount(testBookFile, "Expenses", "Savings", None)
+            unifyDuplicates(testBookFile, "Expenses", "Savings")
+
+        # then
+        builtins.input = original_raw_input
+        getWatermark.assert_not_called()
+
+    def test__should_only_change_new_entries_incrementally(self):
+        # given
+        testBookFile = os.path.join(tempfile.gettempdir(), "example.gnucash")
+        createTestLedger(testBookFile)
+        if os.path.exists(testBookFile + ".gnucsh-state"):
+            os.remove(testBookFile + ".gnucsh-state")
+        original_raw_input = builtins.input
+        builtins.input = lambda _: "y"
+        changeTransferAccount(
+            testBookFile, "Expenses", "Opening Balance", "Groceries", True
+        )
+        with openLedger(testBookFile) as book:
+            book.findAccountByName("Expenses").addEntry(
+                "3", "Groceries", book.findAccountByName("Savings")
+            )
+            book.save()
+
+        # when
+        incremental = io.StringIO()
+        with contextlib.redirect_stdout(incremental):
+            changeTransferAccount(
+                testBookFile, "Expenses", "Opening Balance", "Groceries", True
+            )
+        full = io.StringIO()
+        with contextlib.redirect_stdout(full):
+            changeTransferAccount(
+                testBookFile,
+                "Expenses",
+                "Opening Balance",
+                "Groceries",
+                True,
+                True,
+            )
+
+        # then
+        builtins.input = original_raw_input
+        self.assertIn("Changed 1 entries", incremental.getvalue())
+        self.assertEqual(1, incremental.getvalue().count("Groceries"))
+        # all entries are listed again, but already changed
+        self.assertEqual(2, full.getvalue().count("Groceries"))
+        with openLedger(testBookFile) as book:
+            self.assertEqual(
+                ["Opening Balance", "Savings", "Opening Balance"],
+                [
+                    e.account_path
+                    for e in book.findAccountByName("Expenses").getEntries()
+                ],
+            )
+
+    def test__should_run_script_in_one_session(self):
+        # given
+        testBookFile = os.path.join(tempfile.gettempdir(), "example.gnucash")
+        createTestLedger(testBookFile)
+        script = io.StringIO("""# move the groceries, then list what is left
+Expenses -f Groceries -t "Opening Balance"
+
+Savings --format csv -f Pharm
+""")
+
+        # when
+        f = io.StringIO()
+        with contextlib.redirect_stdout(f):
+            runScript(testBookFile, script)
+
+        # then
+        today = datetime.today().strftime("%Y-%m-%d")
+        output = f.getvalue().splitlines()
+        self.assertEqual("## Account:Expenses", output[0])
+        self.assertTrue(output[2].startswith("Changed 1 entries in "))
+        self.assertEqual(
+            [
+                "date,value,description,account",
+                today + ",-15,Pharmacy,Expenses",
+            ],
+            output[3:],
+        )
+        with openLedger(testBookFile) as book:
+            self.assertEqual(
+                ["Opening Balance", "Savings"],
+                [
+                    e.account_path
+                    for e in book.findAccountByName("Expenses").getEntries()
+                ],
+            )
+
+    def test__should_write_profile_report(self):
+        # given
+        testBookFile = os.path.join(tempfile.gettempdir(), "example.gnucash")
+        createTestLedger(testBookFile)
+        reportFile = os.path.join(tempfile.gettempdir(), "profile.json")
+
+        # when
+        result = CliRunner().invoke(
+            main,
+            [testBookFile, "Expenses"],
+            env={"GNUCSH_PROFILE_REPORT": reportFile},
+        )
+
+        # then
+        self.assertEqual(0, result.exit_code, result.output)
+        with open(reportFile) as f:
+            report = json.load(f)
+        self.assertEqual(2, report["counts"]["Entry"])
+        self.assertGreater(report["phases"]["load entries"]["statements"], 0)
+        if sys.platform != "win32":
+            self.assertGreater(report["peakRssKiB"], 0)
@@ -0,0 +1,136 @@
+# pyright: reportUnknownVariableType=false, reportUnknownMemberType=false, reportUnknownArgumentType=false, reportMissingTypeStubs=false
+
+import datetime
+import os
+import tempfile
+import unittest
+import warnings
+from decimal import Decimal
+
+from click.testing import CliRunner
+from piecash import Account, Commodity, Split, Transaction
+
+from gnucsh.cli import main
+from gnucsh.convenience_types.ledger import openLedger
+from gnucsh.report import SplitArrays, balanceRows, periodRows
+from gnucsh.snapshot import Snapshot
+from tests.testhelpers import createTestLedger
+
+
+class TestReport(unittest.TestCase):
+    def setUp(self):
+        self.testBookFile = os.path.join(
+            tempfile.gettempdir(), "example.gnucash"
+        )
+        createTestLedger(self.testBookFile)
+        with openLedger(self.testBookFile) as ledger:
+            expensesAcct = ledger.findAccountByName("Expenses")
+            foodAcct = expensesAcct.createExpencesAccount("Food")
+            foodAcct.addEntry(
+                "2.50", "Bakery", ledger.findAccountByName("Savings")
+            )
+            ledger.save()
+
+    def test__should_roll_up_balances_of_sub_accounts(self):
+        # given
+        arrays = SplitArrays(Snapshot.open(self.testBookFile, cache=False))
+
+        # when
+        rows = list(balanceRows(arrays, list(range(4))))
+
+        # then
+        self.assertEqual(
+            [
+                ("Expenses", "19.00", "21.50"),
+                ("Savings", "78.50", "78.50"),
+                ("Opening Balance", "-100.00", "-100.00"),
+                ("Expenses:Food", "2.50", "2.50"),
+            ],
+            rows,
+        )
+
+    def test__should_sum_quantities_per_commodity(self):
+        # given
+        with openLedger(
+            self.testBookFile
+        ) as ledger, warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            book = ledger.backingBook
+            dollar = Commodity(
+                namespace="CURRENCY",
+                mnemonic="USD",
+                fullname="US Dollar",
+                fraction=100,
+            )
+            expenses = ledger.findAccountByName("Expenses").backingAccount
+            savings = ledger.findAccountByName("Savings").backingAccount
+            travel = Account(
+                name="Travel",
+                type="EXPENSE",
+                parent=expenses,
+                commodity=dollar,
+            )
+            _ = Transaction(
+                currency=book.default_currency,
+                description="Hotel",
+                splits=[
+                    Split(
+                        value=Decimal("10"),
+                        quantity=Decimal("11"),
+                        account=travel,
+                    ),
+                    Split(value=Decimal("-10"), account=savings),
+                ],
+            )
+            ledger.save()
+        arrays = SplitArrays(Snapshot.open(self.testBookFile, cache=False))
+
+        # when
+        rows = list(balanceRows(arrays, list(range(5))))
+
+        # then
+        self.assertEqual(
+            [
+                ("Expenses", "19.00", "21.50"),
+                ("Savings", "68.50", "68.50"),
+                ("Opening Balance", "-100.00", "-100.00"),
+                ("Expenses:Food", "2.50", "2.50"),
+                ("Expenses:Travel", "11.00", "11.00"),
+            ],
+            rows,
+        )
+
+    def test__should_total_per_period(self):
+        # given
+        arrays = SplitArrays(Snapshot.open(self.testBookFile, cache=False))
+        with openLedger(self.testBookFile, readonly=True) as ledger:
+            month = ledger.findAccountByName("Expenses").getEntries()[0].date
+
+        # when
+        rows = list(periodRows(arrays, [0, 1], "month"))
+
+        # then
+        self.assertEqual(
+            [
+                (month.strftime("%Y-%m"), "Expenses", "21.50", "21.50"),
+                (month.strftime("%Y-%m"), "Savings", "78.50", "78.50"),
+            ],
+            rows,
+        )
+
+    def test__should_report_account_and_sub_accounts_as_csv(self):
+        # when
+        result = CliRunner().invoke(
+            main,
+            [self.testBookFile, "Expenses", "-r", "year", "--format", "csv"],
+        )
+
+        # then
+        year = datetime.date.today().year
+        self.assertEqual(0, result.exit_code, result.output)
+        self.assertEqual(
+            "year,account,total,balance\n"
+            + "{},Expenses,21.50,21.50\n".format(year)
+            + "{},Expenses:Food,2.50,2.50\n".format(year),
+            result.output,
+        )
@@ -0,0 +1,100 @@
+# pyright: reportUnknownVariableType=false, reportUnknownMemberType=false, reportUnknownArgumentType=false, reportMissingTypeStubs=false
+
+import builtins
+import os
+import tempfile
+import unittest
+
+from click.testing import CliRunner
+
+from gnucsh.cli import main
+from gnucsh.convenience_types.ledger import openLedger
+from gnucsh.rules import Rules
+from tests.testhelpers import createTestLedger
+
+
+class TestRules(unittest.TestCase):
+    def setUp(self):
+        self.testBookFile = os.path.join(
+            tempfile.gettempdir(), "example.gnucash"
+        )
+        createTestLedger(self.testBookFile)
+        with openLedger(self.testBookFile) as ledger:
+            rootAcct = ledger.getRootAccount()
+            rootAcct.createExpencesAccount("Food")
+            rootAcct.createExpencesAccount("Health")
+            ledger.save()
+        self.rulesFile = os.path.join(tempfile.gettempdir(), "rules.yaml")
+        with open(self.rulesFile, "w") as f:
+            _ = f.write(
+                "- match: '^Groc'\n"
+                + "  account: Food\n"
+                + "- match: Pharmacy\n"
+                + "  account: Health\n"
+            )
+
+    def test__should_classify_by_first_matching_rule(self):
+        # given
+        rules = Rules(
+            [
+                ("ABAB", "first"),
+                ("(?i)^shop", "second"),
+                ("BA", "third"),
+                ("Shop", "fourth"),
+            ]
+        )
+
+        # when
+        classes = [
+            rules.classify(description)
+            for description in [
+                "xABABx",
+                "xBABx",
+                "Shop BA",
+                "the Shop",
+                "other",
+            ]
+        ]
+
+        # then
+        self.assertEqual([0, 2, 1, 3, None], classes)
+
+    def test__should_change_transfer_accounts_by_rules(self):
+        # given
+        original_raw_input = builtins.input
+        builtins.input = lambda _: "y"
+
+        # when
+        result = CliRunner().invoke(
+            main, [self.testBookFile, "Expenses", "--rules", self.rulesFile]
+        )
+
+        # then
+        builtins.input = original_raw_input
+        self.assertEqual(0, result.exit_code, result.output)
+        self.assertIn("Changed 2 entries", result.output)
+        with openLedger(self.testBookFile) as ledger:
+            self.assertEqual(
+                [("Groceries", "Food"), ("Pharmacy", "Health")],
+                [
+                    (e.description, e.account_path)
+                    for e in ledger.findAccountByName("Expenses").getEntries()
+                ],
+            )
+
+    def test__should_reject_rules_without_account_or_with_transfer(self):
+        # when
+        withoutAccount = CliRunner().invoke(
+            main, [self.testBookFile, "--rules", self.rulesFile]
+        )
+        withTransfer = CliRunner().invoke(
+            main,
+            [self.testBookFile, "Expenses", "--rules", self.rulesFile]
+            + ["-t", "Savings"],
+        )
+
+        # then
+        self.assertEqual(2, withoutAccount.exit_code, withoutAccount.output)
+        self.assertIn("needs the account", withoutAccount.output)
+        self.assertEqual(2, withTransfer.exit_code, withTransfer.output)
+        self.assertIn("not from -t", withTransfer.output)
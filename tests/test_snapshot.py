@@ -0,0 +1,186 @@
+# pyright: reportUnknownVariableType=false, reportUnknownMemberType=false, reportUnknownArgumentType=false, reportMissingTypeStubs=false
+
+import builtins
+import os
+import sqlite3
+import tempfile
+import unittest
+
+from click.testing import CliRunner
+
+from gnucsh.cli import main
+from gnucsh.convenience_types.ledger import openLedger
+from gnucsh.snapshot import SUFFIX, Snapshot
+from tests.testhelpers import createTestLedger, createTestLedgerWithDuplicates
+
+
+class TestSnapshot(unittest.TestCase):
+    def setUp(self):
+        self.testBookFile = os.path.join(
+            tempfile.gettempdir(), "example.gnucash"
+        )
+        createTestLedger(self.testBookFile)
+        if os.path.exists(self.testBookFile + SUFFIX):
+            os.remove(self.testBookFile + SUFFIX)
+
+    def test__should_list_entries_like_the_ledger(self):
+        # when
+        snapshot = Snapshot.open(self.testBookFile)
+
+        # then
+        with openLedger(self.testBookFile, readonly=True) as ledger:
+            for name in ["Expenses", "Savings", "Opening Balance"]:
+                self.assertEqual(
+                    [
+                        (e.date, e.value, e.description, e.account_path)
+                        for e in ledger.findAccountByName(name).getEntries()
+                    ],
+                    list(
+                        snapshot.iterEntryRows(
+                            snapshot.findAccount(name), None
+                        )
+                    ),
+                )
+            self.assertEqual(
+                [
+                    (acc.fullname, acc.name, acc.backingAccount.type)
+                    for acc in ledger.getAllAccounts()
+                ],
+                [acc[1:] for acc in snapshot.accounts],
+            )
+
+    def test__should_read_post_dates_without_separators(self):
+        # given
+        connection = sqlite3.connect(self.testBookFile)
+        with connection:
+            connection.execute(
+                "UPDATE transactions SET post_date = replace(replace("
+                + "replace(post_date, '-', ''), ' ', ''), ':', '')"
+            )
+        connection.close()
+
+        # when
+        snapshot = Snapshot.open(self.testBookFile)
+
+        # then
+        with openLedger(self.testBookFile, readonly=True) as ledger:
+            self.assertEqual(
+                [
+                    e.date
+                    for e in ledger.findAccountByName("Savings").getEntries()
+                ],
+                [
+                    row[0]
+                    for row in snapshot.iterEntryRows(
+                        snapshot.findAccount("Savings"), None
+                    )
+                ],
+            )
+
+    def test__should_filter_entries_by_description(self):
+        # given
+        snapshot = Snapshot.open(self.testBookFile)
+
+        # when
+        rows = snapshot.iterEntryRows(snapshot.findAccount("Savings"), "^Gro")
+
+        # then
+        self.assertEqual(["Groceries"], [row[2] for row in rows])
+
+    def test__should_reuse_cached_snapshot(self):
+        # given
+        _ = Snapshot.open(self.testBookFile)
+        cacheStat = os.stat(self.testBookFile + SUFFIX)
+
+        # when
+        snapshot = Snapshot.open(self.testBookFile)
+
+        # then
+        self.assertEqual(
+            cacheStat.st_mtime_ns,
+            os.stat(self.testBookFile + SUFFIX).st_mtime_ns,
+        )
+        self.assertEqual(3, len(snapshot.accounts))
+
+    def test__should_rebuild_snapshot_after_the_book_changed(self):
+        # given
+        _ = Snapshot.open(self.testBookFile)
+        with openLedger(self.testBookFile) as book:
+            book.findAccountByName("Expenses").addEntry(
+                "3", "Bakery", book.findAccountByName("Savings")
+            )
+            book.save()
+
+        # when
+        snapshot = Snapshot.open(self.testBookFile)
+
+        # then
+        self.assertEqual(
+            ["Groceries", "Pharmacy", "Bakery"],
+            [
+                row[2]
+                for row in snapshot.iterEntryRows(
+                    snapshot.findAccount("Expenses"), None
+                )
+            ],
+        )
+
+    def test__should_find_duplicates_like_the_ledger(self):
+        # given
+        createTestLedgerWithDuplicates(self.testBookFile)
+
+        # when
+        snapshot = Snapshot.open(self.testBookFile)
+        duplicates = snapshot.findDuplicates(
+            snapshot.findAccount("Expenses"), snapshot.findAccount("Savings")
+        )
+
+        # then
+        with openLedger(self.testBookFile, readonly=True) as ledger:
+            expected = ledger.findAccountByName("Expenses").findDuplicates(
+                ledger.findAccountByName("Savings")
+            )
+            self.assertEqual(
+                [
+                    (m.backingSplit.guid, o.backingSplit.guid)
+                    for m, o in expected
+                ],
+                [
+                    (snapshot.splitGuid(m), snapshot.splitGuid(o))
+                    for m, o in duplicates
+                ],
+            )
+
+    def test__should_list_transactions_from_cache(self):
+        # when
+        cached = CliRunner().invoke(
+            main, [self.testBookFile, "Expenses", "--cache"]
+        )
+        uncached = CliRunner().invoke(main, [self.testBookFile, "Expenses"])
+
+        # then
+        self.assertEqual(0, cached.exit_code, cached.output)
+        self.assertEqual(uncached.output, cached.output)
+        self.assertTrue(os.path.exists(self.testBookFile + SUFFIX))
+
+    def test__should_unify_duplicates_from_cache(self):
+        # given
+        createTestLedgerWithDuplicates(self.testBookFile)
+        original_raw_input = builtins.input
+        builtins.input = lambda _: "y"
+
+        # when
+        result = CliRunner().invoke(
+            main, [self.testBookFile, "Expenses", "-d", "Savings", "--cache"]
+        )
+
+        # then
+        builtins.input = original_raw_input
+        self.assertEqual(0, result.exit_code, result.output)
+        with openLedger(self.testBookFile) as book:
+            entries = book.findAccountByName(
+                "Expenses"
+            ).findEntriesWithDescription("some description")
+            self.assertEqual(
+                ["Savings"], [e.otherAccount.account_path for e in entries]
+            )
@@ -0,0 +1,217 @@
+# pyright: reportUnknownVariableType=false, reportUnknownMemberType=false, reportUnknownArgumentType=false, reportMissingTypeStubs=false
+
+import datetime
+import os
+import tempfile
+import unittest
+from decimal import Decimal
+
+from click.testing import CliRunner
+
+from gnucsh.cli import main
+from gnucsh.convenience_types.ledger import openLedger
+from gnucsh.statements import readStatement
+from tests.testhelpers import createTestLedger
+
+
+class TestStatements(unittest.TestCase):
+    def setUp(self):
+        self.testBookFile = os.path.join(
+            tempfile.gettempdir(), "example.gnucash"
+        )
+        createTestLedger(self.testBookFile)
+
+    def writeStatement(self, name: str, content: str) -> str:
+        file = os.path.join(tempfile.gettempdir(), name)
+        with open(file, "w") as f:
+            _ = f.write(content)
+        return file
+
+    def test__should_read_csv_with_debit_and_credit_columns(self):
+        # given
+        file = self.writeStatement(
+            "statement.csv",
+            "Booking Date;Payee;Debit;Credit\n"
+            + "31.01.2024;Bakery;2,50;\n"
+            + "01.02.2024;Salary;;1.234,00\n",
+        )
+
+        # when
+        rows = list(readStatement(file))
+
+        # then
+        self.assertEqual(
+            [
+                (datetime.date(2024, 1, 31), Decimal("-2.50"), "Bakery"),
+                (datetime.date(2024, 2, 1), Decimal("1234.00"), "Salary"),
+            ],
+            rows,
+        )
+
+    def test__should_read_both_separators_by_the_same_rule(self):
+        # given
+        file = self.writeStatement(
+            "statement.csv",
+            "Date,Description,Amount\n"
+            + "2024-01-31,Dot thousands,1.234\n"
+            + '2024-01-31,Comma thousands,"1,234"\n'
+            + "2024-01-31,Dot decimals,12.5\n"
+            + '2024-01-31,Both,"1.234.567,89"\n',
+        )
+
+        # when
+        rows = list(readStatement(file))
+
+        # then
+        self.assertEqual(
+            [
+                Decimal("1234"),
+                Decimal("1234"),
+                Decimal("12.5"),
+                Decimal("1234567.89"),
+            ],
+            [value for _, value, _ in rows],
+        )
+
+    def test__should_read_all_dates_of_csv_in_one_format(self):
+        # given
+        file = self.writeStatement(
+            "statement.csv",
+            "Date,Description,Amount\n"
+            + "01/02/2024,Bakery,-2.50\n"
+            + "01/13/2024,Cinema,-7.00\n",
+        )
+
+        # when
+        rows = list(readStatement(file))
+
+        # then
+        self.assertEqual(
+            [datetime.date(2024, 1, 2), datetime.date(2024, 1, 13)],
+            [date for date, _, _ in rows],
+        )
+
+    def test__should_reject_csv_with_ambiguous_dates(self):
+        # given
+        file = self.writeStatement(
+            "statement.csv",
+            "Date,Description,Amount\n"
+            + "01/02/2024,Bakery,-2.50\n"
+            + "03/04/2024,Cinema,-7.00\n",
+        )
+
+        # when/then
+        with self.assertRaises(ValueError):
+            list(readStatement(file))
+        self.assertEqual(
+            [datetime.date(2024, 1, 2), datetime.date(2024, 3, 4)],
+            [date for date, _, _ in readStatement(file, "%m/%d/%Y")],
+        )
+
+    def test__should_read_ofx(self):
+        # given
+        file = self.writeStatement(
+            "statement.ofx",
+            "OFXHEADER:100\n<OFX><BANKMSGSRSV1><STMTTRNRS><STMTRS>"
+            + "<BANKTRANLIST>\n<STMTTRN>\n<TRNTYPE>DEBIT\n"
+            + "<DTPOSTED>20240131120000[-5:EST]\n<TRNAMT>-2.50\n"
+            + "<NAME>Bakery &amp; Co\n</STMTTRN>\n"
+            + "</BANKTRANLIST></STMTRS></STMTTRNRS></BANKMSGSRSV1></OFX>\n",
+        )
+
+        # when
+        rows = list(readStatement(file))
+
+        # then
+        self.assertEqual(
+            [(datetime.date(2024, 1, 31), Decimal("-2.50"), "Bakery & Co")],
+            rows,
+        )
+
+    def test__should_read_qif(self):
+        # given
+        file = self.writeStatement(
+            "statement.qif",
+            "!Type:Bank\nD1/31'24\nT-2.50\nPBakery\n^\n"
+            + "D02/01/2024\nT1,234.00\nMSalary\n^\n",
+        )
+
+        # when
+        rows = list(readStatement(file))
+
+        # then
+        self.assertEqual(
+            [
+                (datetime.date(2024, 1, 31), Decimal("-2.50"), "Bakery"),
+                (datetime.date(2024, 2, 1), Decimal("1234.00"), "Salary"),
+            ],
+            rows,
+        )
+
+    def test__should_import_only_rows_not_in_the_account(self):
+        # given
+        with openLedger(self.testBookFile, readonly=True) as ledger:
+            date = ledger.findAccountByName("Expenses").getEntries()[0].date
+        file = self.writeStatement(
+            "statement.csv",
+            "Date,Amount,Description\n"
+            + "{},4.00,Groceries\n".format(date)
+            + "{},4.00,Groceries\n".format(date)
+            + "2024-01-31,7.25,Bakery\n",
+        )
+
+        # when
+        result = CliRunner().invoke(
+            main, [self.testBookFile, "Expenses", "--import", file]
+        )
+
+        # then
+        self.assertEqual(0, result.exit_code, result.output)
+        self.assertIn(
+            "Imported 2 entries (1 already in the book)", result.output
+        )
+        with openLedger(self.testBookFile) as ledger:
+            self.assertEqual(
+                [
+                    ("Groceries", "Savings"),
+                    ("Pharmacy", "Savings"),
+                    ("Groceries", "Imbalance-EUR"),
+                    ("Bakery", "Imbalance-EUR"),
+                ],
+                [
+                    (e.description, e.account_path)
+                    for e in ledger.findAccountByName("Expenses").getEntries()
+                ],
+            )
+            self.assertEqual(
+                ["7.25"],
+                [
+                    e.value
+                    for e in ledger.findAccountByName("Expenses").getEntries()
+                    if e.description == "Bakery"
+                ],
+            )
+
+    def test__should_reject_import_without_account_or_with_other_options(
+        self,
+    ):
+        # given
+        file = self.writeStatement(
+            "statement.csv", "Date,Amount,Description\n2024-01-31,7,Bakery\n"
+        )
+        rulesFile = self.writeStatement("rules.yaml", "[]\n")
+
+        for args, message in [
+            (["--import", file], "needs the account"),
+            (["Expenses", "--import", file, "-f", "Bak"], "takes no -f"),
+            (
+                ["Expenses", "--import", file, "--rules", rulesFile],
+                "can not be combined",
+            ),
+        ]:
+            # when
+            result = CliRunner().invoke(main, [self.testBookFile, *args])
+
+            # then
+            self.assertEqual(2, result.exit_code, result.output)
+            self.assertIn(message, result.output)